@@ -14,7 +14,7 @@ from __draw import BPMN_Draw
 from __edit import BPMN_Edit
 from __simulate import BPMN_Simulate
 import __simulate as sim
-from .. log import EnhancedLog
+from .. log import EnhancedLog, log_from_csv
 
 _root_graphics = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'graphics')
 
@@ -118,7 +118,9 @@ class BPMN:
         [start_key] is the key-string of the field in which the start time is stored
         [end_key] is the key-string of the field in which the end time is stored
         [time_format] is a regular expression defining the format of the time. Look at
-        https://docs.python.org/2/library/datetime.html#strftime-strptime-behavior for more information"""
+        https://docs.python.org/2/library/datetime.html#strftime-strptime-behavior for more information.
+        It is only used for times that were not parsed when the log was loaded
+        (see pmlab.log.EnhancedLog.get_timestamps)."""
         if not isinstance(log, EnhancedLog):
             print "Error: The log must be an EnhancedLog to be able to simulate it"
             return
@@ -140,7 +142,9 @@ class BPMN:
         [time_key] is the key-string of the field in which the time is stored
         [state_key] is the key-string of the field in which the state of the event is stored (state meaning if the event starts or ends)
         [time_format] is a regular expression defining the format of the time. Look at
-        https://docs.python.org/2/library/datetime.html#strftime-strptime-behavior for more information
+        https://docs.python.org/2/library/datetime.html#strftime-strptime-behavior for more information.
+        It is only used for times that were not parsed when the log was loaded
+        (see pmlab.log.EnhancedLog.get_timestamps).
         [start_w] is the word found in the state field defining an starting event
         [end_w] is the word found in the state field defining a finishing event"""
         if not isinstance(log, EnhancedLog):
@@ -315,42 +319,36 @@ class Process:
         self.edge_info = collections.defaultdict(dict)
         self.node_info = collections.defaultdict(dict)
 
-    def add_duration_info(self, log,cols_to_read=None):
-        """ Adds the mean duration found in the log. """
-        if not('.csv' in log.filename):
-            raise ValueError, 'Log is not in .csv format'
-        orig_alp = list(log.get_alphabet())
+    def add_duration_info(self, log, cols_to_read=None, 
+                            time_format="%d.%m.%y %H:%M"):
+        """ Adds the mean duration found in the log.
+        
+        [log] an EnhancedLog with 'start_time' and 'end_time' attributes, or 
+        a log loaded from a CSV file, which is then reloaded with all the 
+        information (see pmlab.log.log_from_csv, with [cols_to_read] and 
+        [time_format]). Times are parsed once and reused from the log."""
+        if isinstance(log, EnhancedLog):
+            enhanced_log = log
+        else:
+            if not('.csv' in log.filename):
+                raise ValueError, 'Log is not in .csv format'
+            enhanced_log = log_from_csv(log.filename, cols_to_read, 
+                                    all_info=True, time_format=time_format)
         stp_enc = StpReencoder()
-        enc_alp = map(stp_enc.reencode, orig_alp)
-        same_alphabet = (orig_alp==enc_alp)
-
-        reader = csv.reader(log.filename)
-        # restricted format for the time being
-        date_format = "%d.%m.%y %H:%M"
-        if not cols_to_read:
-            cols_to_read = [0,1,2,3]
-        durations = {}
-        with open(log.filename, 'r') as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if (re.search("#",row[cols_to_read[0]]) or row[cols_to_read[1]] not in log.alphabet):
-                    continue
-                duration = datetime.strptime(row[cols_to_read[3]],date_format) - datetime.strptime(row[cols_to_read[2]],date_format)
-                if (row[cols_to_read[1]] in durations):
-                    durations[row[cols_to_read[1]]]['rep'] =  durations[row[cols_to_read[1]]]['rep'] + 1
-                    durations[row[cols_to_read[1]]]['sum'] =  durations[row[cols_to_read[1]]]['sum'] + duration.total_seconds()
-                else:
-                    durations[row[cols_to_read[1]]] = {'rep':1,'sum':duration.total_seconds()}
-
-            for act in durations.iterkeys():
-                print act,':',durations[act]['sum']/durations[act]['rep'], ' seconds'
-
-            d = collections.defaultdict(dict)
-            for act,dact in durations.iteritems():
-                dd = collections.defaultdict(float)
-                dd['avg_duration'] = dact['sum']/dact['rep']
-                d[stp_enc.reencode(act)] = dd
-            self.add_activity_info(d)
+        alphabet = log.get_alphabet()
+        durations = dict((act, dact) for act, dact in 
+                        enhanced_log.activity_durations().iteritems()
+                        if act in alphabet)
+
+        for act in durations.iterkeys():
+            print act,':',durations[act]['sum']/durations[act]['rep'], ' seconds'
+
+        d = collections.defaultdict(dict)
+        for act,dact in durations.iteritems():
+            dd = collections.defaultdict(float)
+            dd['avg_duration'] = dact['sum']/dact['rep']
+            d[stp_enc.reencode(act)] = dd
+        self.add_activity_info(d)
 
     def add_frequency_info(self, log, bind_freq, case_level=True):
         """ Adds frequency information to the edges of the BPMN based on the
@@ -1,6 +1,7 @@
 from __bpmn import *
 from __bpmn_diagram import read_bpmndi_diagram_from_xml, bpmndiDiagramTag
 from .. import cnet
+from .. log import sampling
 from lxml import etree
 
 _xsd_file   = "http://www.omg.org/spec/BPMN/20100501/BPMN20.xsd"
@@ -94,12 +95,30 @@ def bpmn_from_cnet(net):
         pass
     return bp
 
-def bpmn_from_log(log,log_percentage=None,minimal_case_length=None,add_frequency=None):
+def bpmn_from_log(log,log_percentage=None,minimal_case_length=None,add_frequency=None,smt=True,sampler=None):
+	"""Discovers a BPMN from [log] through a C-net. If [smt] is True the C-net
+	is obtained by SMT search (see pmlab.cnet.cnet_from_log) restricted to the
+	arcs of the Flexible Heuristics Miner, otherwise the C-net of the Flexible
+	Heuristics Miner is used directly (see pmlab.cnet.flexible_heuristic_cnet),
+	which is much faster but does not provide frequency information.
+	If a [sampler] is given (see pmlab.log.sampling), the discovery uses 
+	the sample of the cases instead of the whole log. In this case [log] can
+	also be the name of a log file, which is streamed through the sampler 
+	without loading it."""
+	if (sampler):
+		if isinstance(log,basestring):
+			log = sampling.sample_file(log,sampler)
+		else:
+			log = sampling.sample_log(log,sampler)
 	if (minimal_case_length):
 		log = pmlab.log.filters.filter_log(log,pmlab.log.filters.CaseLengthFilter(above=minimal_case_length))
 	if (log_percentage):
 		log = pmlab.log.filters.filter_log(log,pmlab.log.filters.FrequencyFilter(log,log_min_freq=log_percentage))
 	clog = cnet.condition_log_for_cnet(log)
+	if not smt:
+		if (add_frequency):
+			print 'Frequency information is only available with SMT discovery'
+		return bpmn_from_cnet(cnet.flexible_heuristic_cnet(clog))
 	skeleton = cnet.flexible_heuristic_miner(clog)
 	cn,bf = cnet.cnet_from_log(clog,skeleton=skeleton)
 	bp = bpmn_from_cnet(cn)
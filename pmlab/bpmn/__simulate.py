@@ -1,5 +1,6 @@
 from __draw import BPMN_Draw
 from datetime import datetime, timedelta
+from .. log.timestamps import to_datetimes
 from Tkinter import *
 from sys import maxint
 import os.path
@@ -403,15 +404,23 @@ class BPMN_Simulate(BPMN_Draw):
         return length
 
 
+def _event_times(log, key, time_format):
+    # times of [key] of each event as datetime objects (None if missing),
+    # using the times parsed once and cached by the log
+    return to_datetimes(log.get_timestamps(key, time_format))
+
+
 def format_data(bpmn, log, start_key, end_key, time_format):
     valid_cases = []
-    for case in log.cases:
+    start_times = _event_times(log, start_key, time_format)
+    end_times   = _event_times(log, end_key, time_format)
+    offsets = log.columns.offsets.tolist()
+    for c, case in enumerate(log.get_cases()):
         ccase = []
         valid_case = True
-        for event in case:
-            event_name = event.get("name")
-            start_time = event.get(start_key)
-            end_time   = event.get(end_key)
+        for i, event_name in enumerate(case, offsets[c]):
+            start_time = start_times[i]
+            end_time   = end_times[i]
             # check that the needed data is present
             if event_name is None or start_time is None or end_time is None:
                 valid_case = False
@@ -431,9 +440,6 @@ def format_data(bpmn, log, start_key, end_key, time_format):
             if event_elem is None:
                 valid_case = False
                 break  # break event-case for
-            # time converted from string to a python class
-            start_time = datetime.strptime(start_time, time_format)
-            end_time   = datetime.strptime(end_time, time_format)
             ccase.append((event_elem, start_time, end_time))
         if valid_case:
             ccase.sort(key=lambda ev: ev[1])  # sort by start time
@@ -445,19 +451,19 @@ def format_data(bpmn, log, start_key, end_key, time_format):
 
 def format_data2(bpmn, log, time_key, state_key, time_format, start_w, end_w):
     valid_cases = []
-    for case in log.cases:
+    times = _event_times(log, time_key, time_format)
+    offsets = log.columns.offsets.tolist()
+    for c, case in enumerate(log.get_cases(full_info=True)):
         ccase = []
         valid_case = True
-        for event in case:
+        for i, event in enumerate(case, offsets[c]):
             event_name  = event.get("name")
-            event_time  = event.get(time_key)
+            event_time  = times[i]
             event_state = event.get(state_key)
             # check that the needed data is present
             if event_name is None or event_time is None or event_state is None:
                 valid_case = False
                 break  # break the event-case for
-            # time converted from string to a python class
-            event_time = datetime.strptime(event_time, time_format)
             if event_state == start_w:
                 # if event = start, search the corresponding bpmn_element
                 event_elem = None
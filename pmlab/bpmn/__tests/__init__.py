@@ -3,3 +3,4 @@ from test_process import Test_Process
 from test_pool import Test_Pool
 from test_lane import Test_Lane
 from test_grid import Test_Grid_Module
+from test_discovery import Test_Discovery
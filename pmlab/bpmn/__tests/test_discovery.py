@@ -0,0 +1,23 @@
+from .. __other import bpmn_from_log
+from ... log import Log
+import unittest
+
+class Test_Discovery(unittest.TestCase):
+    def gateways(self, bp):
+        return sorted(e.subtype for e in bp.processes[0].elements 
+                    if e.type == 'gateway')
+
+    def test_parallel_without_smt(self):
+        """Test that the FHM C-net is used directly if smt is False"""
+        log = Log(uniq_cases={('A','B','C'):10, ('A','C','B'):10})
+        bp = bpmn_from_log(log, smt=False)
+        names = set(e.name for e in bp.processes[0].elements 
+                    if e.type == 'activity')
+        self.assertEqual(names, set(['A','B','C','E']))
+        self.assertEqual(self.gateways(bp), ['parallel', 'parallel'])
+
+    def test_exclusive_without_smt(self):
+        """Test that exclusive choices become exclusive gateways"""
+        log = Log(uniq_cases={('A','B','D'):10, ('A','C','D'):10})
+        bp = bpmn_from_log(log, smt=False)
+        self.assertEqual(self.gateways(bp), ['exclusive', 'exclusive'])
@@ -1,6 +1,6 @@
-from copy import deepcopy
 from collections import defaultdict, Counter, deque
 import sys
+import numpy
 import simplejson as json
 
 import force_graph
@@ -39,7 +39,7 @@ def condition_log_for_cnet(log):
     uniq_end = log.has_unique_end_activity()
     if (uniq_start and uniq_end and same_alphabet):
         return log
-    condl = Log(cases=deepcopy(log.get_cases()))
+    condl = Log(uniq_cases=defaultdict(int, log.get_weighted_variants()))
     if not same_alphabet:
         condl.reencode( stp_enc )
     if not uniq_start:
@@ -446,15 +446,13 @@ def immediately_follows_cnet_from_raw( filename ):
 def immediately_follows_cnet_from_log( log ):
     """Returns the immediately follows Cnet from the log [log]."""
     cnet = Cnet()
-    cases = log.get_uniq_cases()
-    for case in cases:
-        prev = None
-        for act in case:
-            cnet.add_activity( act )
-            if prev is not None:
-                cnet.add_outset( prev, [act] )
-                cnet.add_inset( act, [prev] )
-            prev = act
+    relations = log.get_relations()
+    acts = relations.activities
+    for code in numpy.flatnonzero(relations.present):
+        cnet.add_activity( acts[code] )
+    for prev, act in zip(*numpy.nonzero(relations.directly_follows)):
+        cnet.add_outset( acts[prev], [acts[act]] )
+        cnet.add_inset( acts[act], [acts[prev]] )
     return cnet
 
 def arc_similarity(cnets, verbose=False):
@@ -604,43 +602,170 @@ def cnet_from_log(log, method='stp', activity_window=1, skeleton=None,
         return net, bind_freq
     return net
 
+def _dependency_measures(relations):
+    """Returns the codes of the activities that appear in the log of 
+    [relations] (see pmlab.log.relations), and the matrices (indexed as the
+    codes) of the FHM dependency measure, with the length-one loop measure
+    in the diagonal, and of the length-two loop measure."""
+    codes = numpy.flatnonzero(relations.present)
+    rows = numpy.ix_(codes, codes)
+    directsucc = relations.directly_follows[rows].astype(float)
+    deprel = (directsucc - directsucc.T) / (directsucc + directsucc.T + 1)
+    numpy.fill_diagonal(deprel, 
+                        directsucc.diagonal()/(directsucc.diagonal()+1))
+    twoloop = relations.two_loops[rows].astype(float)
+    l2l = (twoloop + twoloop.T) / (twoloop + twoloop.T + 1)
+    numpy.fill_diagonal(l2l, 0)
+    return codes, deprel, l2l
+
 def flexible_heuristic_miner(log, l1loop=0.9, l2loop=0.9, gen_th=0.9):
     """Computes the C-net using the FHM strategy of :
     Flexible Heuristics Miner (FHM)
     A.J.M.M. Weijters, J.T.S. Ribeiro
     Beta Working Paper series 334
-    """
-    directsucc = defaultdict(int)
-    twoloop = defaultdict(int)
-    succ = defaultdict(int)
-    alph = list(log.get_alphabet())
-    cases = log.get_uniq_cases()
-    for case, occ in cases.iteritems():
-        for i, act in enumerate(case[:-1]):
-            directsucc[(act,case[i+1])] += occ
-            if i < len(case)-2 and case[i+2]==act:
-                twoloop[(act,case[i+1])] += occ
-            for act2 in case[i+1:]:
-                succ[(act,act2)] += occ
-    print 'direct succ:', directsucc
-    print 'two length loop:', twoloop
-    print 'succ:', succ
-    deprel = {}
-    l2l = {}
-    for act1 in alph:
-        for act2 in alph:
-            if act1 != act2:
-                deprel[(act1,act2)] = ((directsucc[(act1,act2)]-directsucc[(act2,act1)])/
-                        (1.0*directsucc[(act1,act2)]+directsucc[(act2,act1)]+1))
-                l2l[(act1,act2)] = ((twoloop[(act1,act2)]+twoloop[(act2,act1)])/
-                        (1.0*twoloop[(act1,act2)]+twoloop[(act2,act1)]+1))
-            else:
-                deprel[(act1,act2)] = 1.0*directsucc[(act1,act2)]/(directsucc[(act1,act2)]+1)
-    print 'deprel:', deprel
-    dr_th = 0.9
-    selected_deprel = [rel for rel, freq in deprel.iteritems() if 
-        rel[0]==rel[1] and freq >= l1loop or
-        rel[0]!=rel[1] and freq >= gen_th]
+    
+    Returns the list of pairs of activities whose dependency measure is 
+    above the thresholds (to be used as the skeleton of cnet_from_log). See
+    flexible_heuristic_cnet to obtain the C-net itself."""
+    relations = log.get_relations()
+    codes, deprel, l2l = _dependency_measures(relations)
+    acts = [relations.activities[code] for code in codes]
+    threshold = numpy.empty_like(deprel)
+    threshold.fill(gen_th)
+    numpy.fill_diagonal(threshold, l1loop)
+    selected_deprel = [(acts[i],acts[j]) 
+                        for i, j in zip(*numpy.nonzero(deprel >= threshold))]
     print 'relevant relation:', selected_deprel
     return selected_deprel
 
+def _maximal_cliques(adjacent):
+    """Returns the list of maximal cliques (sorted lists of vertices) of the
+    graph of the symmetric boolean matrix [adjacent] (Bron-Kerbosch)."""
+    neighbours = [set(numpy.flatnonzero(row).tolist()) for row in adjacent]
+    cliques = []
+    def expand(clique, candidates, excluded):
+        if not candidates and not excluded:
+            cliques.append(sorted(clique))
+            return
+        for v in sorted(candidates):
+            expand(clique | set([v]), candidates & neighbours[v], 
+                    excluded & neighbours[v])
+            candidates.discard(v)
+            excluded.add(v)
+    expand(set(), set(range(len(adjacent))), set())
+    return cliques
+
+def _fhm_bindings(directsucc, act, others, and_th, outputs=True):
+    """Returns the output (or input if not [outputs]) bindings of activity 
+    [act] connected to the activities [others] (all of them indexes of the
+    directly follows matrix [directsucc]). Two activities are in parallel 
+    if their AND measure is above [and_th], and the bindings are the 
+    maximal sets of activities in parallel."""
+    if len(others) < 2:
+        return [others.tolist()]
+    between = directsucc[numpy.ix_(others, others)].astype(float)
+    to_act = directsucc[act, others] if outputs else directsucc[others, act]
+    measure = (between + between.T) / (to_act[:,None] + to_act[None,:] + 1)
+    #activities are in parallel if they follow each other in both orders
+    parallel = (measure >= and_th) & (between > 0) & (between.T > 0)
+    numpy.fill_diagonal(parallel, False)
+    #a self loop is always an exclusive choice
+    parallel[others == act] = False
+    parallel[:, others == act] = False
+    return [others[clique].tolist() for clique in _maximal_cliques(parallel)]
+
+def _escapes(arcs, source, avoided):
+    """Returns True if, in the graph of the boolean adjacency matrix [arcs],
+    some activity without outputs can be reached from [source] without 
+    visiting [avoided] (i.e., a long distance dependency from [source] to 
+    [avoided] is not already implied by the graph)."""
+    final = ~(arcs & ~numpy.eye(len(arcs), dtype=bool)).any(axis=1)
+    visited = numpy.zeros(len(arcs), dtype=bool)
+    visited[[source, avoided]] = True
+    pending = [source]
+    while pending:
+        node = pending.pop()
+        if final[node] and node != source:
+            return True
+        successors = numpy.flatnonzero(arcs[node] & ~visited)
+        visited[successors] = True
+        pending.extend(successors.tolist())
+    return False
+
+def flexible_heuristic_cnet(log, dependency_th=0.9, l1loop=0.9, l2loop=0.9, 
+                            relative_to_best=0.05, and_th=0.1, 
+                            long_distance=None):
+    """Returns the C-net discovered with the Flexible Heuristics Miner (see
+    flexible_heuristic_miner), computing all the measures as matrix 
+    operations on the relations of the log (see Log.get_relations).
+    
+    The dependency graph contains:
+        - length-one loops with a measure above [l1loop].
+        - length-two loops with a measure above [l2loop], between 
+            activities without length-one loops.
+        - the best output and input of each activity (so that all the 
+            activities are connected).
+        - the arcs with a dependency measure above [dependency_th] that 
+            differ less than [relative_to_best] from the best output of 
+            their source or the best input of their target.
+        - if [long_distance] is not None, the arcs not yet in the graph whose
+            long distance dependency measure is above [long_distance], 
+            provided that the target can be avoided when the graph is 
+            traversed from the source.
+    The output (input) bindings of each activity are the maximal sets of 
+    outputs (inputs) whose AND measure is above [and_th] for every pair.
+    
+    Since no SMT search is involved, it can be used on logs for which 
+    cnet_from_log is too expensive, but the C-net is not guaranteed to 
+    replay the log. The log should have unique start and end activities 
+    (see condition_log_for_cnet)."""
+    relations = log.get_relations()
+    codes, deprel, l2l = _dependency_measures(relations)
+    acts = [relations.activities[code] for code in codes]
+    directsucc = relations.directly_follows[numpy.ix_(codes, codes)]
+    n = len(codes)
+    loops = deprel.diagonal() >= l1loop
+    arcs = numpy.diag(loops)
+    arcs |= (l2l >= l2loop) & ~loops[:,None] & ~loops[None,:]
+    others = deprel.copy()
+    numpy.fill_diagonal(others, -numpy.inf)
+    succ = directsucc.copy()
+    numpy.fill_diagonal(succ, 0)
+    has_output = succ.any(axis=1)
+    has_input = succ.any(axis=0)
+    rows = numpy.arange(n)
+    if n:
+        arcs[rows[has_output], others.argmax(axis=1)[has_output]] = True
+        arcs[others.argmax(axis=0)[has_input], rows[has_input]] = True
+        best_out = others.max(axis=1)
+        best_in = others.max(axis=0)
+        arcs |= ((others >= dependency_th) & 
+                ((best_out[:,None] - others < relative_to_best) |
+                (best_in[None,:] - others < relative_to_best)))
+    if long_distance is not None:
+        followed = relations.followed_events()[numpy.ix_(codes, codes)]
+        counts = relations.activity_counts[codes].astype(float)
+        total = counts[:,None] + counts[None,:] + 1
+        measure = (2*followed - 2*numpy.abs(counts[:,None]-counts[None,:])
+                    ) / total
+        numpy.fill_diagonal(measure, -numpy.inf)
+        candidates = zip(*numpy.nonzero((measure >= long_distance) & ~arcs))
+        graph = arcs.copy()
+        for a, b in candidates:
+            if _escapes(graph, a, b):
+                arcs[a, b] = True
+    cnet = Cnet()
+    for act in acts:
+        cnet.add_activity( act )
+    for i in xrange(n):
+        outputs = numpy.flatnonzero(arcs[i])
+        if len(outputs):
+            for binding in _fhm_bindings(directsucc, i, outputs, and_th):
+                cnet.add_outset( acts[i], [acts[j] for j in binding] )
+        inputs = numpy.flatnonzero(arcs[:,i])
+        if len(inputs):
+            for binding in _fhm_bindings(directsucc, i, inputs, and_th, 
+                                        outputs=False):
+                cnet.add_inset( acts[i], [acts[j] for j in binding] )
+    return cnet
+
@@ -0,0 +1 @@
+from test_fhm import Test_Flexible_Heuristic_Cnet
@@ -0,0 +1,45 @@
+from .. import flexible_heuristic_cnet
+from ... log import Log
+import unittest
+
+def _log(variants, occ=10):
+    return Log(uniq_cases=dict((tuple(case.split()), occ) 
+                            for case in variants))
+
+def _bindings(bindings):
+    return set(tuple(sorted(b)) for b in bindings)
+
+class Test_Flexible_Heuristic_Cnet(unittest.TestCase):
+    def test_and_split(self):
+        """Test that activities that follow each other in both orders are
+        bound together"""
+        cn = flexible_heuristic_cnet(_log(['S A B C E', 'S A C B E']))
+        self.assertEqual(_bindings(cn.outset['A']), set([('B','C')]))
+        self.assertEqual(_bindings(cn.inset['E']), set([('B','C')]))
+        self.assertEqual(_bindings(cn.inset['B']), set([('A',)]))
+        self.assertEqual(_bindings(cn.outset['C']), set([('E',)]))
+        self.assertEqual(_bindings(cn.outset['S']), set([('A',)]))
+
+    def test_xor_split(self):
+        """Test that exclusive activities are in different bindings"""
+        cn = flexible_heuristic_cnet(_log(['S X Y E', 'S X Z E']))
+        self.assertEqual(_bindings(cn.outset['X']), set([('Y',), ('Z',)]))
+        self.assertEqual(_bindings(cn.inset['E']), set([('Y',), ('Z',)]))
+        self.assertEqual(cn.outset['E'], set())
+
+    def test_long_distance(self):
+        """Test that long distance dependencies are only added when asked,
+        and not when they are implied by the graph"""
+        log = _log(['S A C D E', 'S B C F E'])
+        outputs = lambda cn, act: set(a for b in cn.outset[act] for a in b)
+        inputs = lambda cn, act: set(a for b in cn.inset[act] for a in b)
+        cn = flexible_heuristic_cnet(log)
+        self.assertEqual(outputs(cn, 'A'), set(['C']))
+        self.assertEqual(outputs(cn, 'C'), set(['D','F']))
+        cn = flexible_heuristic_cnet(log, long_distance=0.9)
+        self.assertEqual(outputs(cn, 'A'), set(['C','D']))
+        self.assertEqual(outputs(cn, 'B'), set(['C','F']))
+        self.assertEqual(inputs(cn, 'D'), set(['A','C']))
+        self.assertEqual(inputs(cn, 'F'), set(['B','C']))
+        #S is always followed by C and E, but they cannot be avoided
+        self.assertEqual(outputs(cn, 'S'), set(['A','B']))
@@ -394,15 +394,22 @@ def fitting_cases_in_skeleton(log, skeleton):
 #    (s,a) would pass the check, but will not be really fitting. However,
     cases = log.get_uniq_cases()
     set_skeleton = set(skeleton)
+    #cases whose immediately follows relation is inside the skeleton, 
+    #checking each prefix shared by several cases only once
+    tree = log.get_prefix_tree()
+    def step(last_act, act):
+        if last_act is None or (last_act, act) in set_skeleton:
+            return act
+        return None
+    imm_follows_cases = set(tree.case(node) for node, last_act in 
+                            tree.walk(None, step) 
+                            if tree.ends[node] and 
+                            (node == 0 or last_act is not None))
     new_cases = defaultdict(int)
     old_stdout = sys.stdout
     stpfile = 'simulate.stp'
     for case_num, (case, occ) in enumerate(cases.iteritems()):
-        imm_follows = True
-        for i, act in enumerate(case[:-1]):
-            if (act,case[i+1]) not in set_skeleton:
-                imm_follows = False
-                break
+        imm_follows = tuple(case) in imm_follows_cases
         if not imm_follows:
             #see if it is directly non-fitting
             possible = True
@@ -4,11 +4,22 @@ import os.path
 from collections import defaultdict
 #from xml.dom.minidom import parse
 import xml.etree.ElementTree as xmltree
+try:
+    from xml.etree.cElementTree import iterparse
+except ImportError:
+    from xml.etree.ElementTree import iterparse
 from copy import deepcopy
 import gzip
 import reencoders
+import timestamps
+import bitsets
 import csv
+import json
 import re
+import zlib
+import multiprocessing
+import numpy
+from datetime import datetime
 #import projectors
 #import filters
 #import clustering
@@ -16,15 +27,19 @@ import re
 #import subprocess
 #import pmlab.ts
 
-__all__=['reencoders','projectors','filters','clustering']
+__all__=['reencoders','projectors','filters','clustering','encoded','columns',
+        'timestamps','prefix_tree','bitsets','statistics','relations',
+        'sampling']
 
 def log_from_file(filename, format=None, universal_newline=False, 
-                    uniq_cases=False, reencoder=None, comment_marks=None):
+                    uniq_cases=False, reencoder=None, comment_marks=None,
+                    cache=False, spec=None):
     """Loads a log from the file [filename]. 
     
     [filename] can be either a filename or directly a file.
-    [format] format of the file. Valid values: 'raw', 'xes', None. If None, the
-        filename extension is used to try to infer the format.
+    [format] format of the file. Valid values: 'raw', 'xes', 'csv', 'xes_all',
+        'pmbin', None. If None, the filename extension is used to try to infer 
+        the format.
         'raw': The file is in 'raw' format. i.e. each line contains a case, and 
             each activity is separated by means of a space from the next.
         'xes': XML standard format. In this case the rest of the parameters is
@@ -33,12 +48,38 @@ def log_from_file(filename, format=None, universal_newline=False,
         'xes_all': XML standard format. In this case the rest of the parameters 
             is ignored (no reencodings, comments, etc.). Extracts ALL activity 
             information, returning an enhanced log.
+        'pmbin': binary format written by Log.save (see 
+            pmlab.log.encoded.log_from_pmbin). Returns an EncodedLog.
     [universal_newline]: if cross-platform universal newline must be used when
         opening the filename.
+    [cache]: if True and [filename] is a filename, the log is stored in a 
+        sidecar 'pmbin' file ([filename] + '.pmbin') that is reused (memory 
+        mapped) in later loads as long as the file (path, size and 
+        modification time) and the loading parameters do not change. Ignored
+        for the 'xes_all' format and when a [reencoder] or a [spec] is given.
+        The cached log is returned as an EncodedLog.
+    [spec]: CaseSpec (see pmlab.log.projectors) applied while the file is 
+        parsed. Ignored for the 'pmbin' format.
     See function 'log_from_iterable' for the rest of the parameters.
     """
     own_fid = False
     name = None
+    if isinstance(filename, basestring): #a filename
+        name = filename
+    else:
+        name = filename.name
+    if format==None:
+        format = _file_format(name)
+    if format=='pmbin':
+        return log_from_pmbin(name)
+    use_cache = (cache and isinstance(filename, basestring) and 
+                reencoder is None and spec is None and 
+                format in ('raw','xes','csv'))
+    if use_cache:
+        cache_params = {'format':format, 'comment_marks':comment_marks}
+        log = cached_log_from_pmbin(filename, **cache_params)
+        if log is not None:
+            return log
     if isinstance(filename, basestring): #a filename
         open_mode = 'rU' if universal_newline else 'r'
         if filename.endswith('.gz'):
@@ -46,38 +87,107 @@ def log_from_file(filename, format=None, universal_newline=False,
         else:
             file = open(filename, open_mode)
         own_fid = True #we own this file and we must close it
-        name = filename
     else:
         file = filename # a file
-        name = file.name
-    if format==None:
-        base, ext = os.path.splitext(name)
-        if ext == '.gz':
-            base, ext = os.path.splitext(base)
-        if ext == '.tr':
-            format = 'raw'
-        elif ext == '.xes':
-            format = 'xes'
-        else:
-            raise TypeError, ('Could not determine the format of the file. '
-                                'Specify manually')
     if format=='raw':
         log = log_from_iterable(file, name, 'raw', uniq_cases, 
-                                reencoder, comment_marks)
+                                reencoder, comment_marks, spec)
     elif format=='xes':
-        log = log_from_xes(file, all_info=False, only_uniq_cases=uniq_cases)
+        log = log_from_xes(file, all_info=False, only_uniq_cases=uniq_cases,
+                            spec=spec)
     elif format=='csv':
-        log = log_from_csv(file, all_info=False, only_uniq_cases=uniq_cases)
+        log = log_from_csv(file, all_info=False, only_uniq_cases=uniq_cases,
+                            spec=spec)
     elif format=='xes_all':
-        log = log_from_xes(file, all_info=True, only_uniq_cases=uniq_cases)
+        log = log_from_xes(file, all_info=True, only_uniq_cases=uniq_cases,
+                            spec=spec)
     else:
         raise ValueError, 'Unknown log format.'
     if own_fid:
         file.close()
+    if use_cache:
+        save_pmbin_sidecar(log, filename, **cache_params)
+        log = cached_log_from_pmbin(filename, **cache_params) or log
     return log
 
+def _file_format(name):
+    """Returns the format of the log file [name] inferred from its extension
+    (see 'log_from_file')."""
+    base, ext = os.path.splitext(name)
+    if ext == '.gz':
+        base, ext = os.path.splitext(base)
+    if ext == '.tr':
+        return 'raw'
+    elif ext == '.xes':
+        return 'xes'
+    elif ext == '.csv':
+        return 'csv'
+    elif ext == '.pmbin':
+        return 'pmbin'
+    raise TypeError, ('Could not determine the format of the file. '
+                        'Specify manually')
+
+def iter_cases(filename, format=None, comment_marks=None, spec=None):
+    """Iterates over the cases (lists of activities) of the log file 
+    [filename] without loading the whole log, so that huge logs can be 
+    sampled (see pmlab.log.sampling) or processed with constant memory.
+    
+    [filename] can be either a filename or directly a file. Filenames ending
+    in '.gz' are decompressed on the fly.
+    [format] 'raw', 'xes' or 'csv'. If None, it is inferred from the 
+        extension of the file (see 'log_from_file').
+    [comment_marks] comment marks of the 'raw' format (see 
+        'log_from_iterable').
+    [spec] CaseSpec (see pmlab.log.projectors) applied to each case as it is
+        read.
+    The cases of a CSV file are read with 'iter_csv_cases', so the rows of 
+    each case must be contiguous in the file.
+    
+    Example:
+    >>> lengths = [len(case) for case in pmlab.log.iter_cases('big.xes.gz')]
+    """
+    name = filename if isinstance(filename, basestring) else filename.name
+    if format==None:
+        format = _file_format(name)
+    if format not in ('raw','xes','csv'):
+        raise ValueError, 'Cannot iterate over the cases of the format.'
+    own_fid = isinstance(filename, basestring)
+    if not own_fid:
+        file = filename
+    elif filename.endswith('.gz'):
+        file = gzip.open(filename, 'rb')
+    else:
+        file = open(filename, 'rb' if format=='xes' else 'rU')
+    try:
+        if format=='xes':
+            cases = iter_xes_cases(file, spec=spec)
+        elif format=='csv':
+            cases = iter_csv_cases(file, spec=spec)
+        else:
+            cases = _iter_raw_cases(file, comment_marks, spec)
+        for case in cases:
+            yield case
+    finally:
+        if own_fid:
+            file.close()
+
+def _iter_raw_cases(lines, comment_marks=None, spec=None):
+    """Iterates over the cases of the [lines] of a log in the 'raw' format
+    (see 'log_from_iterable')."""
+    for line in lines:
+        words = line.split()
+        if len(words) == 0:
+            continue
+        if comment_marks and words[0][0] in comment_marks:
+            continue
+        if spec:
+            words = spec.project(words)
+            if words is None:
+                continue
+        yield words
+
 def log_from_iterable( file, filename=None, format=None, uniq_cases=False, 
-                        reencoder=None, comment_marks=None):
+                        reencoder=None, comment_marks=None, spec=None):
     """Loads a log from an iterable (i.e. an opened file, a list, etc.)
     
     [filename] file name if the log was obtained from a file.
@@ -90,6 +200,8 @@ def log_from_iterable( file, filename=None, format=None, uniq_cases=False,
         reencoder_on_load field of the log (a DictionaryReencoder).
     [comment_marks] is the iterable containing the characters or strings that 
     identify comments (at the begining of a line).
+    [spec] CaseSpec (see pmlab.log.projectors) applied to each (reencoded)
+    case as it is read.
     
     Example:
     >>> test2 = ['# Reading file: a12f0n00_1.filter.tr', '.state graph', 's0 S s1']
@@ -120,6 +232,10 @@ def log_from_iterable( file, filename=None, format=None, uniq_cases=False,
         #ignore if it is a comment
         if comment_marks and words[0][0] in comment_marks:
             continue
+        if spec:
+            words = spec.project(words)
+            if words is None:
+                continue
         if uniq_cases:
             log.uniq_cases[tuple(words)] += 1
         else:
@@ -129,7 +245,7 @@ def log_from_iterable( file, filename=None, format=None, uniq_cases=False,
     log.reencoder_on_load = reencoders.DictionaryReencoder(encoded_act)
     return log
 
-def log_from_xes(file, all_info=False, only_uniq_cases=False):
+def log_from_xes(file, all_info=False, only_uniq_cases=False, spec=None):
     """Load a log in the XES format.
     
     [filename] can be a file or a filename.
@@ -137,36 +253,22 @@ def log_from_xes(file, all_info=False, only_uniq_cases=False):
     dictionary. This option is incompatible with [only_uniq_cases], and returns
     an EnhancedLog.
     If [only_uniq_cases] is True, then we discard all other information and we
-    keep only the unique cases."""
+    keep only the unique cases.
+    [spec] CaseSpec (see pmlab.log.projectors) applied while parsing (see 
+    'iter_xes_cases').
+    
+    The file is parsed incrementally (see 'iter_xes_cases'), so when 
+    [only_uniq_cases] is True the memory used does not depend on the size of
+    the file, only on the number of unique cases."""
     if isinstance(file, basestring): #a filename
         filename=file
-        if filename.endswith('.gz'):
-            file=gzip.open(filename, 'rb')
-        else:
-            pass # Just send the filename to xmltree.parse
     else:
         filename=file.name
     if all_info and only_uniq_cases:
         raise ValueError, 'Incompatible arguments in log_from_xes'
-    tr = {'concept:name':'name', 'lifecycle:transition':'transition',
-            'time:timestamp':'timestamp'}
-    tree = xmltree.parse(file)
-    root = tree.getroot()
-    traces = root.findall('{http://www.xes-standard.org/}trace')
     cases = []
     uniq_cases = defaultdict(int)
-    for t in traces:
-        case = []
-        for c in t:
-            if c.tag == '{http://www.xes-standard.org/}event':
-                if all_info:
-                    dict = {tr.get(s.attrib['key'],s.attrib['key']):s.attrib['value'] 
-                            for s in c}
-                    case.append(dict)
-                else:
-                    for s in c:
-                        if s.attrib['key'] == 'concept:name':
-                            case.append(s.attrib['value'])
+    for case in iter_xes_cases(file, all_info=all_info, spec=spec):
         if only_uniq_cases:
             uniq_cases[ tuple(case) ] += 1
         else:
@@ -178,15 +280,101 @@ def log_from_xes(file, all_info=False, only_uniq_cases=False):
                 uniq_cases=uniq_cases)
     return log
 
-def log_from_csv(filename, cols_to_read=None,all_info=False, only_uniq_cases=False,delimiter=None):
+xes_trace_tag = '{http://www.xes-standard.org/}trace'
+xes_event_tag = '{http://www.xes-standard.org/}event'
+xes_keys = {'concept:name':'name', 'lifecycle:transition':'transition',
+            'time:timestamp':'timestamp'}
+
+def iter_xes_cases(file, all_info=False, spec=None):
+    """Iterates over the cases of a log in the XES format, yielding one case
+    per trace.
+    
+    [file] can be a file or a filename. Filenames ending in '.gz' are 
+    decompressed on the fly.
+    If [all_info] then each case is a list of dictionaries containing all the
+    XES information of the events, otherwise it is the list of activity names.
+    If a CaseSpec [spec] (see pmlab.log.projectors) is given, the events of
+    the activities removed by its projection are skipped as they are read, 
+    and the cases it discards are not yielded.
+    
+    The file is parsed incrementally: the XML elements of each trace are 
+    discarded as soon as its case has been yielded, so that huge logs can be
+    processed with constant memory.
+    
+    Example:
+    >>> for case in pmlab.log.iter_xes_cases('nightly.xes.gz'):
+            print len(case)
+    """
+    own_fid = False
+    if isinstance(file, basestring) and file.endswith('.gz'):
+        file = gzip.open(file, 'rb')
+        own_fid = True
+    try:
+        root = None
+        for event, elem in iterparse(file, events=('start','end')):
+            if event == 'start':
+                if root is None:
+                    root = elem
+                continue
+            if elem.tag != xes_trace_tag:
+                continue
+            case = []
+            for c in elem:
+                if c.tag == xes_event_tag:
+                    if all_info:
+                        dict = {xes_keys.get(s.attrib['key'],s.attrib['key']):
+                                s.attrib['value'] for s in c}
+                        if spec and not spec.keeps_activity(dict.get('name')):
+                            continue
+                        case.append(dict)
+                    else:
+                        for s in c:
+                            if s.attrib['key'] == 'concept:name':
+                                name = s.attrib['value']
+                                if spec and not spec.keeps_activity(name):
+                                    continue
+                                case.append(name)
+            #free the trace (and all previous siblings) before going on
+            elem.clear()
+            root.clear()
+            if spec:
+                names = ([event.get('name') for event in case] if all_info 
+                        else case)
+                positions = spec.select(names)
+                if positions is None:
+                    continue
+                if len(positions) < len(case):
+                    case = [case[i] for i in positions]
+            yield case
+    finally:
+        if own_fid:
+            file.close()
+
+def log_from_csv(filename, cols_to_read=None,all_info=False, only_uniq_cases=False,delimiter=None,
+                processes=None, time_format=None, spec=None):
     """Load a log in the CSV format.
     
     [filename] can be a file or a filename.
-    If [all_info] then all CSV information for the events is stored in a 
-    dictionary. This option is incompatible with [only_uniq_cases], and returns
-    an EnhancedLog.
+    If [all_info] then the activity, the initial time ('start_time') and the
+    final time ('end_time') of each event are stored, and an EnhancedLog is
+    returned. This option is incompatible with [only_uniq_cases].
     If [only_uniq_cases] is True, then we discard all other information and we
-    keep only the unique cases."""
+    keep only the unique cases.
+    [cols_to_read] columns of the case id, the activity and the initial (and 
+        optionally final) time of each event. Default: [0,1,2,3].
+    [processes] if greater than 1, the file is split in byte ranges that are
+        parsed by a pool of [processes] processes (see 
+        'parallel_csv_cases'). Fields containing line breaks are not 
+        supported in this mode.
+    [time_format] datetime.strptime format of the times. If None, times are
+        parsed as ISO-8601 timestamps (see pmlab.log.timestamps).
+    [spec] CaseSpec (see pmlab.log.projectors). The rows of the activities 
+        removed by its projection are skipped as they are read, and the 
+        cases it discards are dropped before building the log.
+    
+    Times are parsed once, and the events of each case are ordered by their
+    initial time. Events whose time cannot be parsed are ordered comparing 
+    the time strings."""
     
     if isinstance(filename, basestring): #a filename
         name=filename
@@ -194,52 +382,275 @@ def log_from_csv(filename, cols_to_read=None,all_info=False, only_uniq_cases=Fal
         name=filename.name
     if all_info and only_uniq_cases:
         raise ValueError, 'Incompatible arguments in log_from_csv'
-    with open(name, 'r') as f:        
-        cases = []
-        #uniq_cases = defaultdict(int)
-        dict_csv = {}
-        if delimiter:
-            reader = csv.reader(f,delimiter=delimiter)
-        else: 
-            reader = csv.reader(f)
-        if not cols_to_read:
-            cols_to_read = [0,1,2,3]
-        for row in reader:
-            if (re.search("#",row[cols_to_read[0]])):
-                continue
-            #assuming row[0] is the case id, and row[1:4] is [activity,time_ini, time_end]
-            if (len(cols_to_read) == 4):
-                if (row[cols_to_read[0]] in dict_csv):
-                    dict_csv[row[cols_to_read[0]]].append(tuple([row[cols_to_read[1]],row[cols_to_read[2]],row[cols_to_read[3]]]))
-                else:
-                    dict_csv[row[cols_to_read[0]]] = [tuple([row[cols_to_read[1]],row[cols_to_read[2]],row[cols_to_read[3]]])]
-            elif (len(cols_to_read) == 3):
-                if (row[cols_to_read[0]] in dict_csv):
-                    dict_csv[row[cols_to_read[0]]].append(tuple([row[cols_to_read[1]],row[cols_to_read[2]]]))
-                else:
-                    dict_csv[row[cols_to_read[0]]] = [tuple([row[cols_to_read[1]],row[cols_to_read[2]]])]
-            else:
-                raise ValueError, 'Wrong columns to read'
-                
-                
-        #sorting the activities of each case by the timestamps and create a case in cases var
-        for mykey in dict_csv:
-            if (len(cols_to_read) == 4):
-                dict_csv[mykey].sort(key=lambda tup: tup[1:2])
-            elif (len(cols_to_read) == 3):
-                dict_csv[mykey].sort(key=lambda tup: tup[1])
-            cases.append(map(lambda x: x[0],dict_csv[mykey]))
+    if not cols_to_read:
+        cols_to_read = [0,1,2,3]
+    if len(cols_to_read) not in (3,4):
+        raise ValueError, 'Wrong columns to read'
+    keys = ['name', 'start_time', 'end_time'][:len(cols_to_read)-1]
+    if all_info:
+        time_formats = (dict.fromkeys(keys[1:], time_format) if time_format
+                        else None)
+        columns = EventColumns(time_formats)
+    if processes > 1:
+        cases = parallel_csv_cases(name, cols_to_read, delimiter, processes,
+                                    time_format, all_info, spec)
+        if spec:
+            cases = _csv_select_cases(cases, spec, all_info)
+        if all_info:
+            columns.extend([dict(zip(keys, event)) for event in case] 
+                            for case in cases)
+    else:
+        with open(name, 'r') as f:        
+            case_numbers = {}
+            event_cases = []
+            fields = [[] for key in keys]
+            if delimiter:
+                reader = csv.reader(f,delimiter=delimiter)
+            else: 
+                reader = csv.reader(f)
+            for row in reader:
+                case_id = row[cols_to_read[0]]
+                if '#' in case_id:
+                    continue
+                #assuming row[0] is the case id, and row[1:4] is [activity,time_ini, time_end]
+                case_number = case_numbers.setdefault(case_id, 
+                                                    len(case_numbers))
+                if spec and not spec.keeps_activity(row[cols_to_read[1]]):
+                    #the case keeps its number (its position in the log) 
+                    #even if all its events are skipped
+                    continue
+                event_cases.append(case_number)
+                for field, col in zip(fields, cols_to_read[1:]):
+                    field.append(row[col])
+        lengths = numpy.bincount(event_cases, minlength=len(case_numbers))
+        if all_info:
+            columns.extend([(dict(zip(keys, event)) 
+                            for event in zip(*fields))])
+            times = columns.timestamps.get('start_time', 
+                                        numpy.zeros(0, dtype=numpy.int64))
+        else:
+            times = timestamps.parse_timestamps(fields[1], time_format)[0]
+        #sorting the activities of each case by the initial times
+        order = _csv_event_order(event_cases, times, fields[1])
+        if all_info:
+            columns = columns.take(order, lengths)
+            if spec:
+                columns = columns.select([i for i, names 
+                                        in enumerate(columns.names()) 
+                                        if spec.select(names) is not None])
+        else:
+            acts = [fields[0][i] for i in order]
+            bounds = numpy.concatenate(([0], numpy.cumsum(lengths))).tolist()
+            cases = [acts[start:end] 
+                    for start, end in zip(bounds[:-1], bounds[1:])]
+            if spec:
+                cases = _csv_select_cases(cases, spec, all_info)
             
-    if (only_uniq_cases):
+    if all_info:
+        log = EnhancedLog(filename=name, format='csv', columns=columns)
+    elif (only_uniq_cases):
          uniq_cases = defaultdict(int)
          for case in cases:
             uniq_cases[ tuple(case) ] += 1
-         log = Log(filename=name, format='csv', cases=cases, 
-                uniq_cases=uniq_cases)  
+         log = Log(filename=name, format='csv', uniq_cases=uniq_cases)  
     else:
          log = Log(filename=name, format='csv', cases=cases)
     return log   
 
+def iter_csv_cases(file, cols_to_read=None, delimiter=None, time_format=None,
+                    spec=None):
+    """Iterates over the cases (lists of activities) of a log in the CSV 
+    format, reading the file incrementally.
+    
+    Unlike 'log_from_csv', the rows of each case must be contiguous in the 
+    file (as in the logs exported sorted by case): a case is complete when a
+    row of another case is read. The events of each case are ordered by their
+    initial time as in 'log_from_csv'. To parse the times with few numpy 
+    calls, the complete cases are buffered until they have 
+    [csv_stream_buffer] events.
+    [file] can be a file or a filename. See 'log_from_csv' for the rest of 
+    the parameters."""
+    own_fid = isinstance(file, basestring)
+    if own_fid:
+        file = open(file, 'r')
+    if not cols_to_read:
+        cols_to_read = [0,1,2,3]
+    case_col, act_col, time_col = cols_to_read[0:3]
+    try:
+        if delimiter:
+            reader = csv.reader(file, delimiter=delimiter)
+        else:
+            reader = csv.reader(file)
+        current = None
+        event_cases = []
+        acts = []
+        times = []
+        lengths = []
+        for row in reader:
+            case_id = row[case_col]
+            if '#' in case_id:
+                continue
+            if case_id != current:
+                if len(acts) >= csv_stream_buffer:
+                    for case in _csv_buffered_cases(event_cases, acts, times,
+                                                    lengths, time_format, 
+                                                    spec):
+                        yield case
+                    event_cases, acts, times, lengths = [], [], [], []
+                current = case_id
+                lengths.append(0)
+            if spec and not spec.keeps_activity(row[act_col]):
+                continue
+            event_cases.append(len(lengths)-1)
+            acts.append(row[act_col])
+            times.append(row[time_col])
+            lengths[-1] += 1
+        for case in _csv_buffered_cases(event_cases, acts, times, lengths, 
+                                        time_format, spec):
+            yield case
+    finally:
+        if own_fid:
+            file.close()
+
+csv_stream_buffer = 1 << 16
+
+def _csv_buffered_cases(event_cases, acts, times, lengths, time_format, spec):
+    """Returns the cases (ordered by time and selected by [spec]) of the 
+    events buffered by 'iter_csv_cases'."""
+    parsed = timestamps.parse_timestamps(times, time_format)[0]
+    order = _csv_event_order(event_cases, parsed, times)
+    acts = [acts[i] for i in order]
+    bounds = numpy.concatenate(([0], numpy.cumsum(lengths))).tolist()
+    cases = [acts[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+    if spec:
+        cases = _csv_select_cases(cases, spec, False)
+    return cases
+
+def _csv_select_cases(cases, spec, all_info):
+    """Returns the list of [cases] kept by the CaseSpec [spec], projected. If
+    [all_info], the events are tuples whose first field is the activity."""
+    selected = []
+    for case in cases:
+        positions = spec.select([event[0] for event in case] if all_info 
+                                else case)
+        if positions is not None:
+            selected.append([case[i] for i in positions])
+    return selected
+
+def _csv_event_order(event_cases, times, time_strings):
+    """Returns the permutation of the events that groups them by case 
+    ([event_cases] has the case number of each event) and orders each case by
+    the parsed [times]. Events with the same (or no parsed) time are ordered 
+    by their [time_strings], and then by their position in the file."""
+    keys = (numpy.asarray(times), numpy.asarray(event_cases))
+    if (keys[0] == timestamps.NAT).any():
+        ranks = numpy.unique(numpy.array(time_strings), return_inverse=True)[1]
+        keys = (ranks,) + keys
+    return numpy.lexsort(keys)
+
+def _csv_chunk_events(args):
+    """Parses the rows of a CSV file starting in a byte range (executed by the
+    processes of 'parallel_csv_cases').
+    
+    [args] is the tuple (filename, start, end, cols_to_read, delimiter, 
+    partitions, time_format, all_info, spec). Returns a list with [partitions] 
+    dictionaries. Each case id is assigned to a partition by hashing, and 
+    each dictionary maps its case ids to the list of events (time, time 
+    string, position, fields) found in the range. The time string is only 
+    kept if the time could not be parsed, and the position (start, row) 
+    preserves the order of the file for events with the same time. The 
+    fields are the activity, or the tuple of activity and times if 
+    [all_info]."""
+    (name, start, end, cols_to_read, delimiter, partitions, time_format, 
+    all_info, spec) = args
+    case_col, act_col, time_col = cols_to_read[0:3]
+    rows = []
+    with open(name, 'rb') as f:
+        if start > 0:
+            #skip the row started in the previous range
+            f.seek(start-1)
+            if f.read(1) != '\n':
+                f.readline()
+        def lines():
+            while f.tell() < end:
+                line = f.readline()
+                if not line:
+                    break
+                yield line
+        if delimiter:
+            reader = csv.reader(lines(), delimiter=delimiter)
+        else:
+            reader = csv.reader(lines())
+        for i, row in enumerate(reader):
+            case_id = row[case_col]
+            if '#' in case_id:
+                continue
+            if spec and not spec.keeps_activity(row[act_col]):
+                continue
+            fields = (tuple([row[col] for col in cols_to_read[1:]]) 
+                        if all_info else row[act_col])
+            rows.append((case_id, row[time_col], (start, i), fields))
+    times = timestamps.parse_timestamps([row[1] for row in rows], 
+                                        time_format)[0].tolist()
+    parts = [defaultdict(list) for p in xrange(partitions)]
+    for (case_id, time_string, position, fields), time in zip(rows, times):
+        parts[zlib.crc32(case_id) % partitions][case_id].append(
+            (time, time_string if time == timestamps.NAT else '', position,
+            fields))
+    return parts
+
+def _csv_merge_partition(chunk_parts):
+    """Merges the events of the same partition found in all the byte ranges 
+    (executed by the processes of 'parallel_csv_cases'). Returns the list of
+    cases of the partition, each one ordered by time."""
+    merged = chunk_parts[0]
+    for part in chunk_parts[1:]:
+        for case_id, events in part.iteritems():
+            merged[case_id].extend(events)
+    cases = []
+    for events in merged.itervalues():
+        events.sort()
+        cases.append([event[-1] for event in events])
+    return cases
+
+def parallel_csv_cases(filename, cols_to_read=[0,1,2,3], delimiter=None,
+                        processes=None, time_format=None, all_info=False,
+                        spec=None):
+    """Returns the list of cases of the CSV log [filename] parsing it with a 
+    pool of [processes] processes (all the available CPUs if None).
+    
+    The file is split in byte ranges (aligned to rows) that are parsed in 
+    parallel. The events are hash-partitioned by case id, and then each 
+    partition is merged and each case is ordered by time in parallel too.
+    If [all_info], each event is the tuple with the activity and its times,
+    otherwise it is just the activity. The rows of the activities removed by
+    the projection of [spec] are skipped (the cases are not filtered).
+    See 'log_from_csv' for the rest of the parameters."""
+    size = os.path.getsize(filename)
+    processes = processes or multiprocessing.cpu_count()
+    chunks = max(1, min(4*processes, size // csv_min_chunk_size))
+    bounds = [size*i // chunks for i in xrange(chunks+1)]
+    partitions = processes
+    pool = multiprocessing.Pool(processes)
+    try:
+        chunk_parts = pool.map(_csv_chunk_events, 
+                                [(filename, bounds[i], bounds[i+1], 
+                                cols_to_read, delimiter, partitions, 
+                                time_format, all_info, spec) 
+                                for i in xrange(chunks)])
+        partition_cases = pool.map(_csv_merge_partition, 
+                                    [[parts[p] for parts in chunk_parts]
+                                    for p in xrange(partitions)])
+    finally:
+        pool.close()
+        pool.join()
+    cases = []
+    for part in partition_cases:
+        cases.extend(part)
+    return cases
+
+csv_min_chunk_size = 1 << 20
+
 def activity_positions(log):
     """Computes the activity positions of each unique case in [log]. Returns a
     list of dictionaries (one per unique case). Each dictionary maps each 
@@ -251,12 +662,31 @@ def activity_positions(log):
     # Each entry contains an ordered list of position
     cases = log.get_uniq_cases()
     for case in cases:
-        position_dictionary = defaultdict(list)
-        for i, act in enumerate(case):
-            position_dictionary[act].append(i)
-        activity_positions.append( position_dictionary )
+        activity_positions.append( case_activity_positions(case) )
     return activity_positions
 
+def case_activity_positions(case):
+    """Returns a dictionary that maps each activity of [case] to the ordered
+    list of positions in which it appears."""
+    position_dictionary = defaultdict(list)
+    for i, act in enumerate(case):
+        position_dictionary[act].append(i)
+    return position_dictionary
+
+def log_from_weighted(weighted_cases, uniq_cases=False):
+    """Returns a Log with the iterable of pairs (case, occurrences) 
+    [weighted_cases] (see Log.iter_weighted). If [uniq_cases], the log is 
+    only stored as unique cases, otherwise each case is repeated its 
+    occurrences in the list of cases. Use uniq_cases=log.only_uniq_cases() 
+    to store a log derived from [log] like it."""
+    if not uniq_cases:
+        return Log(cases=[list(case) for case, occ in weighted_cases 
+                        for i in xrange(occ)])
+    counts = defaultdict(int)
+    for case, occ in weighted_cases:
+        counts[tuple(case)] += occ
+    return Log(uniq_cases=counts)
+
 class Log:
     """Class representing a basic log"""
     def __init__(self, filename=None, format=None, cases=None, uniq_cases=None):
@@ -282,10 +712,24 @@ class Log:
         self.uniq_cases = uniq_cases if uniq_cases else defaultdict(int)
         #self.uniq_cases = defaultdict(int)
         self.activity_positions = None
+        #dictionary that maps each unique case to its activity positions 
+        #(see get_activity_positions)
+        self.encoded_log = None
+        #EncodedLog with the unique cases of this log (see get_encoded_log)
+        self.prefix_tree = None
+        #PrefixTree of the unique cases of this log (see get_prefix_tree)
         
     def get_cases(self):
         """Returns the list of cases of the log. If the log was stored
-        as a set of unique cases, then the log is 'rehydratated' """
+        as a set of unique cases, then the log is 'rehydratated' (see
+        rehydrate). Use iter_weighted if the cases are only iterated."""
+        return self.rehydrate()
+    
+    def rehydrate(self):
+        """Returns the list with one entry per case of the log. If the log 
+        was only stored as unique cases, each unique case is replicated its
+        occurrence times and the list is permanently stored, so only 
+        algorithms that really need a list of cases should call it."""
         if not self.cases and self.uniq_cases:
             #compute non unique cases by replicating each unique case its 
             # occurrence times
@@ -293,6 +737,33 @@ class Log:
                 self.cases += [ucase]*occ
         return self.cases
     
+    def iter_weighted(self):
+        """Iterates over pairs (case, occurrences) that give the cases of the
+        log (see get_cases) when each case is repeated its occurrences, 
+        without replicating them: the cases of a log stored as a list of 
+        cases are yielded once each (in order), and the unique cases of a log
+        only stored as unique cases are yielded with their occurrences.
+        
+        Example:
+        >>> total_length = sum(len(case)*occ for case, occ in 
+                                log.iter_weighted())"""
+        if self.cases or not self.uniq_cases:
+            for case in self.cases:
+                yield case, 1
+        else:
+            for case, occ in self.uniq_cases.iteritems():
+                yield case, occ
+    
+    def only_uniq_cases(self):
+        """Returns True if the log is only stored as unique cases, so that 
+        iter_weighted yields its unique cases."""
+        return not self.cases and bool(self.uniq_cases)
+    
+    def get_weighted_variants(self):
+        """Returns the list of pairs (unique case, occurrences) of the log 
+        (see get_uniq_cases)."""
+        return self.get_uniq_cases().items()
+    
     def get_uniq_cases(self):
         """Returns the list of unique cases of the log. If the log was 
         stored as a list of cases, then the log is 'compressed' and unique cases
@@ -317,10 +788,56 @@ class Log:
         return self.alphabet
     
     def get_activity_positions(self):
-        """Returns the positions of each activity in each case."""
-        if not self.activity_positions:
-            self.activity_positions = activity_positions(self)
-        return self.activity_positions
+        """Returns the list with the positions of each activity in each unique
+        case (see case_activity_positions), in the order of get_uniq_cases. 
+        The positions of each unique case are computed only once, and kept 
+        by case so that extending the log only computes those of its new
+        unique cases."""
+        uniq_cases = self.get_uniq_cases()
+        if self.activity_positions is None:
+            self.activity_positions = {}
+        positions = self.activity_positions
+        for case in uniq_cases:
+            if case not in positions:
+                positions[case] = case_activity_positions(case)
+        return [positions[case] for case in uniq_cases]
+    
+    def get_encoded_log(self):
+        """Returns an EncodedLog (see pmlab.log.encoded) with the unique cases
+        of the log stored as integer arrays. The encoded log is computed once 
+        and kept until the log is modified."""
+        if self.encoded_log is None:
+            self.encoded_log = encode_log(self)
+        return self.encoded_log
+    
+    def get_activity_signatures(self):
+        """Returns the activity bitset of each unique case of the encoded log
+        (see get_encoded_log and pmlab.log.bitsets). The signatures are 
+        cached with the encoded log."""
+        elog = self.get_encoded_log()
+        if 'signatures' not in elog.cache:
+            elog.cache['signatures'] = bitsets.activity_signatures(elog)
+        return elog.cache['signatures']
+
+    def parikh_matrix(self):
+        """Returns the pair (matrix, weights) with the Parikh vectors of the
+        unique cases of the encoded log (see get_encoded_log): [matrix] is a
+        scipy CSR matrix with a row per unique case and a column per 
+        activity code (see pmlab.log.encoded.parikh_matrix), and [weights] 
+        is the array with the occurrences of each unique case. The pair is
+        cached with the encoded log."""
+        elog = self.get_encoded_log()
+        if 'parikh' not in elog.cache:
+            elog.cache['parikh'] = (parikh_matrix(elog), elog.counts)
+        return elog.cache['parikh']
+
+    def get_prefix_tree(self):
+        """Returns the PrefixTree (see pmlab.log.prefix_tree) of the unique 
+        cases of the log, with the number of cases of each prefix. The tree is
+        computed once and kept until the log is modified."""
+        if self.prefix_tree is None:
+            self.prefix_tree = PrefixTree(self.get_uniq_cases())
+        return self.prefix_tree
     
     def mark_as_modified(self, modified=True):
         """Marks the log as modified (so that operations on this log that 
@@ -328,7 +845,67 @@ class Log:
         instead they will create a new suitable file.
         """
         self.modified_since_last_write = modified
+        if modified:
+            self.encoded_log = None #to force recomputation
+            self.prefix_tree = None
         
+    def _case_key(self, case):
+        """Returns the unique case (tuple of activity names) of [case]."""
+        return tuple(case)
+    
+    def add_case(self, case):
+        """Adds [case] to the log (see extend)."""
+        self.extend([case])
+    
+    def extend(self, cases):
+        """Adds the iterable of [cases] to the log.
+        
+        The derived information already computed (unique cases, alphabet, 
+        activity positions, encoded log and prefix tree) is updated in place, 
+        so that the cost is proportional to the new cases, not to the size of
+        the log. 
+        Cases are appended to the list of cases unless the log is only stored
+        as unique cases.
+        
+        Example:
+        >>> log.extend(pmlab.log.log_from_file('delta.tr').get_cases())
+        """
+        new_uniq_cases = self._append_cases(cases)
+        if not new_uniq_cases:
+            return
+        encoded_log = self.encoded_log
+        prefix_tree = self.prefix_tree
+        if self.uniq_cases:
+            positions = self.activity_positions
+            for case, occ in new_uniq_cases.iteritems():
+                if positions is not None and case not in positions:
+                    positions[case] = case_activity_positions(case)
+                self.uniq_cases[case] = self.uniq_cases.get(case, 0) + occ
+        else:
+            self.activity_positions = None
+        if self.alphabet:
+            for case in new_uniq_cases:
+                self.alphabet.update(case)
+        self.mark_as_modified()
+        if encoded_log is not None:
+            encoded_log.extend_uniq_cases(new_uniq_cases)
+            self.encoded_log = encoded_log
+        if prefix_tree is not None:
+            for case, occ in new_uniq_cases.iteritems():
+                prefix_tree.add(case, occ)
+            self.prefix_tree = prefix_tree
+    
+    def _append_cases(self, cases):
+        """Stores [cases] (see extend) and returns a dictionary with the 
+        number of occurrences of their unique cases."""
+        store_cases = bool(self.cases) or not self.uniq_cases
+        new_uniq_cases = defaultdict(int)
+        for case in cases:
+            if store_cases:
+                self.cases.append(list(case))
+            new_uniq_cases[self._case_key(case)] += 1
+        return new_uniq_cases
+    
     def __add__(self, log):
         """Returns the log obtained by merging the two logs."""
         return Log(cases=deepcopy(self.get_cases()+log.get_cases()))
@@ -443,50 +1020,61 @@ class Log:
         self.activity_positions = None #to force recomputation
         self.mark_as_modified()
         if write_dict:
-            own_fid = False
-            if not dict_file:
-                if self.filename:
-                    dict_file = self.filename+'.dict'
-                else:
-                    dict_file = 'reencode.dict'
-            if isinstance(dict_file, basestring): #a filename
-                file = open(dict_file,'w')
-                own_fid = True
+            self._save_reencoder(reencoder, dict_file)
+    
+    def _save_reencoder(self, reencoder, dict_file=None):
+        """Writes the dictionary of [reencoder] to [dict_file] (a file or a 
+        filename). If None, the name of the log will be used to store the 
+        dictionary, appending '.dict'."""
+        own_fid = False
+        if not dict_file:
+            if self.filename:
+                dict_file = self.filename+'.dict'
             else:
-                file = filename
-            print 'Saving dictionary to', file.name
-            reencoder.save(file)
-            if own_fid:
-                file.close()
+                dict_file = 'reencode.dict'
+        if isinstance(dict_file, basestring): #a filename
+            file = open(dict_file,'w')
+            own_fid = True
+        else:
+            file = dict_file
+        print 'Saving dictionary to', file.name
+        reencoder.save(file)
+        if own_fid:
+            file.close()
     
+    def get_statistics(self):
+        """Returns the LogStatistics (see pmlab.log.statistics) of the log, 
+        computed in a single pass over the encoded log (see get_encoded_log).
+        The statistics are cached with the encoded log."""
+        elog = self.get_encoded_log()
+        if 'statistics' not in elog.cache:
+            elog.cache['statistics'] = LogStatistics(elog)
+        return elog.cache['statistics']
+
+    def get_relations(self):
+        """Returns the LogRelations (see pmlab.log.relations) with the 
+        directly follows, length-two loop, eventually follows and start/end
+        counts of the activities of the log. The relations are cached with 
+        the encoded log (see get_encoded_log)."""
+        elog = self.get_encoded_log()
+        if 'relations' not in elog.cache:
+            elog.cache['relations'] = LogRelations(elog, 
+                                                    self.get_statistics())
+        return elog.cache['relations']
+
     def case_length_histogram(self):
         """Returns a sorted list of tuples (x,y) where x is the case length and
         y is the number of cases with that length"""
-        cases = self.get_uniq_cases()
-        histo = defaultdict(int)
-        for case, occ in cases.iteritems():
-            histo[len(case)] += occ
-        return sorted(histo.items(), key=lambda x: x[0])
+        return self.get_statistics().length_histogram()
     
     def case_frequency_histogram(self):
         """Returns a sorted list of tuples (x,y) where x is the case frequency and
         y is the number of unique cases with that frequency"""
-        cases = self.get_uniq_cases()
-        histo = defaultdict(int)
-        for case, occ in cases.iteritems():
-            histo[occ] += 1
-        return sorted(histo.items(), key=lambda x: x[0])
+        return self.get_statistics().frequency_histogram()
     
     def statistics(self):
-        print 'Alphabet size:', len(self.get_alphabet())
-        all_cases = len(self.get_cases())
-        print 'Number of cases:', all_cases
-        print 'Number of unique cases:', len(self.get_uniq_cases())
-        case_histo = self.case_length_histogram()
-        print 'Length of shortest case:',case_histo[0][0]
-        print 'Length of largest case:',case_histo[-1][0]
-        total_length = sum([length*numcases for length, numcases in case_histo])
-        print 'Average case length: {0:.1f}'.format(1.0*total_length/all_cases)
+        """Prints a summary of the log (see get_statistics)."""
+        self.get_statistics().show()
         
     def activity_frequencies(self, case_count=False):
         """Returns a dictionary maping each activity to the number of total
@@ -496,14 +1084,7 @@ class Log:
             appears, not the total occurrences (each activity can appear more 
             than once per case).
         """
-        uniq_cases = self.get_uniq_cases()
-        act_freq = defaultdict(int)
-        for case,occ in uniq_cases.iteritems():
-            if case_count:
-                case = set(case)
-            for act in case:
-                act_freq[act] += occ
-        return act_freq
+        return self.get_statistics().activity_frequencies(case_count)
         
     def cases_per_activity(self, uniq_cases=False):
         """Returns a dictionary that maps each activity to a list of the 
@@ -525,8 +1106,18 @@ class Log:
             'raw': print all cases (with or without repetitions according to the
                 [uniq_cases] parameter), just the activity names.
             'xes': use the XES format, just the activity names.
+            'pmbin': binary format with the unique cases encoded as integer 
+                arrays, that can be memory-mapped when loaded (see 
+                pmlab.log.encoded.save_pmbin).
         [uniq_cases]: If True, then only the unique cases are written.
         """
+        if format=='pmbin':
+            save_pmbin(self.get_encoded_log(), filename)
+            self.filename = (filename if isinstance(filename, basestring) 
+                            else filename.name)
+            self.last_write_format = format
+            self.mark_as_modified(False)
+            return
         own_fid = False
         if isinstance(filename, basestring): #a filename
             file = open(filename,'w')
@@ -588,91 +1179,208 @@ class EnhancedLog(Log):
         start_time: initial time of the activity
         end_time: end time of the activity
     
+    The attributes are stored as columns (see pmlab.log.columns), and the 
+    events are accessed through read-only dictionary-like views.
+    
     Since additional information is present, the support for unique cases in 
     this class is more limited than in plain logs."""
-    def __init__(self, filename=None, format=None, cases=None):
+    def __init__(self, filename=None, format=None, cases=None, columns=None):
         """ Constructs an enhanced log.
         
         [filename] file name if the log was obtained from a file.
         [format] only meaningful if filename is not None, since it is the format
         of the original file. Valid values: 'raw', 'raw_uniq', 'xes'.
-        If [cases] are given, constructs a log with those cases. Otherwise 
-        return an empty log."""
-        Log.__init__(self, filename=filename, format=format, cases=cases)
+        If [cases] (a list of sequences of dictionaries) or [columns] (an 
+        EventColumns object) are given, constructs a log with those cases. 
+        Otherwise return an empty log."""
+        Log.__init__(self, filename=filename, format=format)
+        if columns is None:
+            columns = EventColumns()
+            if cases:
+                columns.extend(cases)
+        self.columns = columns
+        self.case_view = None
+        #CasesView given by get_cases(True)
+        self.plain_cases = None
+        #tuples with only the activity names of the cases (see get_cases)
+        self.times = {}
+        #cache of get_timestamps
+    
+    def __getattr__(self, name):
+        """Gives the columns once the cases replaced through get_cases(True)
+        are stored in them (see CasesView.commit)."""
+        if name == 'columns' and self.__dict__.get('case_view') is not None:
+            self.columns = self.case_view.commit()
+            return self.columns
+        raise AttributeError, name
+    
+    def __getstate__(self):
+        #the views are not copied (nor pickled), only the columns
+        return dict(self.__dict__, columns=self.columns, case_view=None)
     
     def get_cases(self, full_info=False):
         """Returns the list of cases of the log. 
         
         If [full_info] is True, then the cases with the full information are 
-        returned (i.e., a list of sequences of dictionaries). Otherwise, only
-        a plain log is returned (so that an enhanced log can be used without 
-        any change with the available algorithms).
+        returned (i.e., a sequence of sequences of dictionary-like views, see 
+        pmlab.log.columns.CasesView). Cases and event attributes written 
+        through the views are written to the log, e.g.:
+        >>> random.shuffle(log.get_cases(True))
+        Otherwise, only a plain log is returned (so that an enhanced log can 
+        be used without any change with the available algorithms). The 
+        activity names are decoded once and kept until the log is modified,
+        each call returns a new list.
         """
         if full_info:
-            return self.cases
-        else:
-            return [[act['name'] for act in case] for case in self.cases]
+            if self.case_view is None:
+                self.case_view = CasesView(self.columns, self._cases_changed)
+            return self.case_view
+        return [list(case) for case in self._plain_cases()]
+    
+    def _plain_cases(self):
+        if self.plain_cases is None:
+            self.plain_cases = [tuple(case) for case in self.columns.names()]
+        return self.plain_cases
+    
+    def _cases_changed(self):
+        """Called after the cases are written through the views."""
+        if self.case_view.order is not None:
+            #the columns are rebuilt when next needed (see __getattr__)
+            self.__dict__.pop('columns', None)
+        self.uniq_cases = defaultdict(int)
+        self.alphabet = set()
+        self.activity_positions = None
+        self.mark_as_modified()
+    
+    def rehydrate(self):
+        """Returns the list of cases of the log (see get_cases), enhanced 
+        logs always store all their cases."""
+        return self.get_cases()
+    
+    def iter_weighted(self):
+        """Iterates over the cases of the log (as tuples of activity names),
+        each one with 1 occurrence (see Log.iter_weighted)."""
+        for case in self._plain_cases():
+            yield case, 1
+    
+    def only_uniq_cases(self):
+        """Returns False: the cases of enhanced logs are always stored."""
+        return False
+    
+    def get_timestamps(self, key='timestamp', time_format=None):
+        """Returns an int64 array with the time of attribute [key] of each 
+        event (in the order of the cases), in microseconds since the epoch, 
+        with NAT for missing times (see pmlab.log.timestamps). 
+        
+        The standard time attributes (timestamp, start_time and end_time) are
+        parsed once when the log is built. Values that could not be parsed 
+        then, and other attributes, are parsed using [time_format] (or as 
+        ISO-8601 timestamps if None) the first time they are requested. The 
+        result is kept until the log is modified.
+        
+        Example:
+        >>> times = log.get_timestamps().view('datetime64[us]')"""
+        if (key, time_format) not in self.times:
+            columns = self.columns
+            times = columns.timestamps.get(key)
+            if times is None:
+                times = numpy.empty(columns.number_of_events(), 
+                                    dtype=numpy.int64)
+                times.fill(timestamps.NAT)
+            values = columns.extra.get(key, {})
+            missing = [i for i in values if times[i] == timestamps.NAT]
+            if missing:
+                times = times.copy()
+                times[missing] = timestamps.parse_timestamps(
+                            [values[i] for i in missing], time_format)[0]
+            self.times[(key, time_format)] = times
+        return self.times[(key, time_format)]
+    
+    def activity_durations(self, start_key='start_time', end_key='end_time',
+                            time_format=None):
+        """Returns a dictionary that maps each activity to a dictionary with 
+        the number of events of the activity with both times ('rep') and the
+        sum of their durations in seconds ('sum'). Durations are computed 
+        from the cached times (see get_timestamps)."""
+        start = self.get_timestamps(start_key, time_format)
+        end = self.get_timestamps(end_key, time_format)
+        valid = (start != timestamps.NAT) & (end != timestamps.NAT)
+        valid &= self.columns.codes['name'] >= 0
+        codes = self.columns.codes['name'][valid]
+        seconds = (end[valid] - start[valid]) / 1e6
+        categories = self.columns.categories['name']
+        reps = numpy.bincount(codes, minlength=len(categories))
+        sums = numpy.bincount(codes, weights=seconds, minlength=len(categories))
+        return dict((act, {'rep':int(reps[i]), 'sum':sums[i]}) 
+                    for i, act in enumerate(categories.values) if reps[i])
+    
+    def select_cases(self, case_indexes):
+        """Returns a new EnhancedLog with the cases in the list 
+        [case_indexes]."""
+        return EnhancedLog(columns=self.columns.select(case_indexes))
+    
+    def mark_as_modified(self, modified=True):
+        Log.mark_as_modified(self, modified)
+        if modified:
+            self.plain_cases = None
+            self.times = {}
+    
+    def _case_key(self, case):
+        """Returns the unique case (tuple of activity names) of [case]."""
+        return tuple([act['name'] for act in case])
+    
+    def _append_cases(self, cases):
+        cases = list(cases)
+        self.columns.extend(cases)
+        new_uniq_cases = defaultdict(int)
+        for case in cases:
+            new_uniq_cases[self._case_key(case)] += 1
+        return new_uniq_cases
     
     def get_uniq_cases(self):
         """Returns the list of unique cases of the log. Unique cases are 
         computed from the cases (and permanently stored)."""
-        if self.cases and not self.uniq_cases:
-            for case in self.cases:
-                self.uniq_cases[tuple([act['name'] for act in case])] += 1
+        if self.columns.number_of_cases() and not self.uniq_cases:
+            self.uniq_cases = self.columns.uniq_cases()
         return self.uniq_cases
 
-    def add_dummy_start_activity(self, candidates=['S','start','begin']):
-        """Adds a dummy start activity to all cases, using the first element
-        in candidates list that does not appear in the current log alphabet. If
-        no candidates are available, None is returned. Otherwise the name of the
-        dummy activity is returned."""
+    def _add_dummy_activity(self, candidates, at_end):
+        """Adds a dummy activity (see add_dummy_start_activity) at the 
+        beginning, or at the end if [at_end], of all cases."""
         possible_candidates = [cand for cand in candidates 
                                 if cand not in self.get_alphabet()]
         if not possible_candidates:
-            print ('All candidates for initial activity where already used, '
-                'please enlarge candidate list and rerun.')
+            print ('All candidates for %s activity were already used, '
+                'please enlarge candidate list and rerun.' % 
+                ('final' if at_end else 'initial'))
             return None
-        start_act = possible_candidates[0]
-        for case in self.cases:
-            case[0:0] = [{'name':start_act}]
+        act = possible_candidates[0]
+        self.columns.insert_events(act, at_end)
         if self.uniq_cases:
             new_uniq_cases = defaultdict(int)
             for case,occ in self.uniq_cases.iteritems():
-                new_case = (start_act,)+case
+                new_case = case+(act,) if at_end else (act,)+case
                 new_uniq_cases[new_case] = occ
             self.uniq_cases = new_uniq_cases
         if self.alphabet:
-            self.alphabet.add(start_act)
+            self.alphabet.add(act)
         self.activity_positions = None #to force recomputation
         self.mark_as_modified()
-        return start_act
+        return act
+
+    def add_dummy_start_activity(self, candidates=['S','start','begin']):
+        """Adds a dummy start activity to all cases, using the first element
+        in candidates list that does not appear in the current log alphabet. If
+        no candidates are available, None is returned. Otherwise the name of the
+        dummy activity is returned."""
+        return self._add_dummy_activity(candidates, at_end=False)
     
-#    
-#    def add_dummy_end_activity(self, candidates=['E','final','end']):
-#        """Adds a dummy end activity to all cases, using the first element
-#        in candidates list that does not appear in the current log alphabet. If
-#        no candidates are available, None is returned. Otherwise the name of the
-#        dummy activity is returned."""
-#        possible_candidates = [cand for cand in candidates 
-#                                if cand not in self.get_alphabet()]
-#        if not possible_candidates:
-#            print ('All candidates for initial activity were already used, '
-#                'please enlarge candidate list and rerun.')
-#            return None
-#        end_act = possible_candidates[0]
-#        for case in self.cases:
-#            case.append( end_act )
-#        if self.uniq_cases:
-#            new_uniq_cases = defaultdict(int)
-#            for case,occ in self.uniq_cases.iteritems():
-#                new_case = case+(end_act,)
-#                new_uniq_cases[new_case] = occ
-#            self.uniq_cases = new_uniq_cases
-#        if self.alphabet:
-#            self.alphabet.add(end_act)
-#        self.activity_positions = None #to force recomputation
-#        self.mark_as_modified()
-#        return end_act
+    def add_dummy_end_activity(self, candidates=['E','final','end']):
+        """Adds a dummy end activity to all cases, using the first element
+        in candidates list that does not appear in the current log alphabet. If
+        no candidates are available, None is returned. Otherwise the name of the
+        dummy activity is returned."""
+        return self._add_dummy_activity(candidates, at_end=True)
     
     def reencode(self, reencoder, write_dict=False, dict_file=None):
         """Reencodes the log activities using the given reencoder.
@@ -686,34 +1394,17 @@ class EnhancedLog(Log):
         Example:
             log.reencode( pmlab.log.reencoders.AlphaReencoder() )
         """
-        if self.cases:
-            for case in self.cases:
-                for act in case:
-                    act['name'] = reencoder.reencode(act['name'])
+        self.columns.rename(reencoder.reencode)
         if self.uniq_cases:
             new_uniq = defaultdict(int)
             for case,occ in self.uniq_cases.iteritems():
-                new_uniq[tuple(map(reencoder.reencode,case))] = occ
+                new_uniq[tuple(map(reencoder.reencode,case))] += occ
             self.uniq_cases = new_uniq
         self.alphabet = set() #to force recomputation
         self.activity_positions = None #to force recomputation
         self.mark_as_modified()
         if write_dict:
-            own_fid = False
-            if not dict_file:
-                if self.filename:
-                    dict_file = self.filename+'.dict'
-                else:
-                    dict_file = 'reencode.dict'
-            if isinstance(dict_file, basestring): #a filename
-                file = open(dict_file,'w')
-                own_fid = True
-            else:
-                file = filename
-            print 'Saving dictionary to', file.name
-            reencoder.save(file)
-            if own_fid:
-                file.close()
+            self._save_reencoder(reencoder, dict_file)
                 
     def cases_per_activity(self, uniq_cases=False):
         """Returns a dictionary that maps each activity to a list of the 
@@ -723,16 +1414,12 @@ class EnhancedLog(Log):
         just the unique cases."""
         if not uniq_cases:
             cases = self.get_cases()
-            cases_per_act = defaultdict(set)
-            for i, case in enumerate(cases):
-                for act in case:
-                    cases_per_act[act['name']].add(i)
         else:
             cases = self.get_uniq_cases()
-            cases_per_act = defaultdict(set)
-            for i, case in enumerate(cases):
-                for w in case:
-                    cases_per_act[w].add(i)
+        cases_per_act = defaultdict(set)
+        for i, case in enumerate(cases):
+            for w in case:
+                cases_per_act[w].add(i)
         return cases_per_act
     
     def save(self, filename, format='json'):
@@ -741,7 +1428,7 @@ class EnhancedLog(Log):
         Format values are:
             'raw': print all cases (with repetitions), just the activity names.
             'raw_uniq': print all unique cases, just the activity names.
-            'xes': use the XES format, all the information.
+            'json': all the information, as a list of lists of dictionaries.
         """
         own_fid = False
         if isinstance(filename, basestring): #a filename
@@ -753,14 +1440,14 @@ class EnhancedLog(Log):
             self.filename = file.name
         if format=='raw':
             for case in self.get_cases():
-                print >> file, ' '.join([act['name'] for act in case])
+                print >> file, ' '.join(case)
         elif format=='raw_uniq':
             for case in self.get_uniq_cases():
                 print >> file, ' '.join(case)
         elif format=='xes':
             pass
         elif format=='json':
-            json.dump(self.get_cases(), file)
+            json.dump([case.to_list() for case in self.get_cases(True)], file)
         else:
             if own_fid:
                 file.close()
@@ -769,3 +1456,12 @@ class EnhancedLog(Log):
 #        self.mark_as_modified(False)
         if own_fid:
             file.close()
+
+#imported at the end since the encoded module builds on the Log class
+from encoded import (EncodedLog, encode_log, save_pmbin, log_from_pmbin,
+                    cached_log_from_pmbin, save_pmbin_sidecar, 
+                    parikh_matrix)
+from columns import EventColumns, CasesView
+from prefix_tree import PrefixTree
+from statistics import LogStatistics
+from relations import LogRelations
@@ -0,0 +1,15 @@
+from test_log import Test_Log_From_Xes
+from test_encoded import Test_Encoded_Log
+from test_pmbin import Test_Pmbin
+from test_csv import Test_Log_From_Csv
+from test_extend import Test_Extend
+from test_columns import Test_Enhanced_Log
+from test_timestamps import Test_Timestamps
+from test_prefix_tree import Test_Prefix_Tree
+from test_filters import Test_Filter_Pipeline
+from test_projectors import Test_Project_Log
+from test_clustering import Test_Kmeans_Clusters, Test_Activity_Clusters
+from test_statistics import Test_Log_Statistics
+from test_weighted import Test_Weighted_Cases
+from test_relations import Test_Log_Relations
+from test_sampling import Test_Sampling
@@ -0,0 +1,93 @@
+from .. import Log
+from ..clustering import (kmeans_clusters, optional_clusters, 
+                        xor_activities_clusters, max_alphabet_clusters,
+                        similarity_clusters)
+import numpy
+import random
+import unittest
+
+class Test_Kmeans_Clusters(unittest.TestCase):
+    def setUp(self):
+        rnd = random.Random(0)
+        cases = []
+        for i in range(500):
+            alphabet = 'abc' if i % 2 else 'xyz'
+            cases.append([rnd.choice(alphabet) 
+                        for j in range(rnd.randint(3,8))])
+        self.log = Log(cases=cases)
+
+    def test_separated_alphabets(self):
+        """Test that cases with disjoint alphabets end in different clusters
+        and that no case is lost"""
+        for ngrams in (1, 2):
+            logs = kmeans_clusters(self.log, 2, ngrams=ngrams, seed=1)
+            self.assertEqual(sorted(''.join(sorted(log.get_alphabet())) 
+                                    for log in logs), ['abc', 'xyz'])
+            self.assertEqual(sum(log.number_of_cases() for log in logs), 500)
+
+    def test_similarity_vectors(self):
+        """Test that the Parikh vectors are returned as a dense array over 
+        the alphabet"""
+        data = similarity_clusters(self.log)
+        self.assertTrue(isinstance(data, numpy.ndarray))
+        self.assertEqual(data.shape, (len(self.log.get_uniq_cases()), 6))
+        self.assertEqual(data.sum(), sum(len(case) for case in 
+                                        self.log.get_uniq_cases()))
+
+class Test_Activity_Clusters(unittest.TestCase):
+    def setUp(self):
+        self.cases = [['s','a','b','e'], ['s','a','e'], ['s','c','e'],
+                    ['s','c','b','e'], ['s','e'], ['s','a','b','e']]
+        self.log = Log(cases=self.cases)
+
+    def test_optional_clusters(self):
+        """Test that the clusters split by optional activities until their
+        size is below the threshold"""
+        logs = optional_clusters(self.log, 1)
+        uniq = [log.get_uniq_cases() for log in logs]
+        self.assertEqual(sorted(case for u in uniq for case in u),
+                        sorted(set(tuple(case) for case in self.cases)))
+        self.assertTrue(all(len(u) == 1 for u in uniq))
+        self.assertEqual(sum(sum(u.values()) for u in uniq), 6)
+
+    def test_xor_activities_clusters(self):
+        """Test the split by the exclusive activities a and c"""
+        logs = xor_activities_clusters(self.log)
+        self.assertEqual([[list(case) for case in log.get_cases()] 
+                        for log in logs],
+                        [[self.cases[0], self.cases[1], self.cases[5]],
+                        [self.cases[2], self.cases[3]], [self.cases[4]]])
+
+    def test_xor_activities_uniq_clusters(self):
+        uniq_cases = {}
+        for case in self.cases:
+            uniq_cases[tuple(case)] = uniq_cases.get(tuple(case), 0) + 1000
+        log = Log(uniq_cases=uniq_cases)
+        logs = xor_activities_clusters(log)
+        self.assertEqual(log.cases, [])
+        uniq = [dict(l.get_uniq_cases()) for l in logs]
+        #the first cluster is the one of the activity of the first case
+        self.assertEqual(sorted(uniq[:2]),
+                        sorted([{('s','a','b','e'):2000, ('s','a','e'):1000},
+                        {('s','c','e'):1000, ('s','c','b','e'):1000}]))
+        self.assertEqual(uniq[2], {('s','e'):1000})
+
+    def test_max_alphabet_clusters(self):
+        """Test the greedy clusters with alphabets of at most 4 activities"""
+        logs = max_alphabet_clusters(self.log, 4)
+        self.assertEqual([[list(case) for case in log.get_cases()] 
+                        for log in logs],
+                        [[self.cases[0], self.cases[1], self.cases[4], 
+                        self.cases[5]], [self.cases[2], self.cases[3]], []])
+
+    def test_max_alphabet_uniq_clusters(self):
+        """Test that a log only stored as unique cases is clustered into 
+        logs of unique cases, without rehydrating it"""
+        log = Log(uniq_cases={('s','a','b','e'):50000, ('s','a','e'):3,
+                            ('s','c','d','f','e'):7})
+        logs = max_alphabet_clusters(log, 4)
+        self.assertEqual(log.cases, [])
+        self.assertEqual([dict(l.get_uniq_cases()) for l in logs],
+                        [{('s','a','b','e'):50000, ('s','a','e'):3}, 
+                        {('s','c','d','f','e'):7}])
+        self.assertTrue(all(l.cases == [] for l in logs))
@@ -0,0 +1,94 @@
+from .. import EnhancedLog
+from .. timestamps import NAT, parse_timestamp, format_timestamp
+import random
+import unittest
+
+class Test_Enhanced_Log(unittest.TestCase):
+    def setUp(self):
+        self.cases = [[{'name':'a', 'timestamp':'2010-12-30T11:02:00.000+01:00',
+                        'transition':'complete', 'org:resource':'Pete'},
+                       {'name':'b', 'timestamp':'2010-12-30 11:05:10',
+                        'cost':'12'}],
+                      [{'name':'a', 'timestamp':'yesterday'}]]
+        self.log = EnhancedLog(cases=self.cases)
+
+    def test_event_views(self):
+        """Test that the views give back the original dictionaries"""
+        cases = self.log.get_cases(True)
+        self.assertEqual(len(cases), 2)
+        self.assertEqual([case.to_list() for case in cases], self.cases)
+        self.assertEqual(cases[0][-1]['cost'], '12')
+        self.assertEqual(cases[1][0].get('transition'), None)
+        self.assertRaises(KeyError, lambda: cases[0][1]['transition'])
+
+    def test_columns(self):
+        """Test that the standard attributes are stored as typed columns"""
+        columns = self.log.columns
+        self.assertEqual(columns.offsets.tolist(), [0, 2, 3])
+        self.assertEqual(columns.codes['name'].tolist(), [0, 1, 0])
+        self.assertEqual(columns.timestamps['timestamp'][0], 1293703320000000)
+        self.assertEqual(columns.timestamps['timestamp'][2], NAT)
+
+    def test_plain_cases(self):
+        self.assertEqual(self.log.get_cases(), [['a','b'], ['a']])
+        self.assertEqual(dict(self.log.get_uniq_cases()), 
+                        {('a','b'):1, ('a',):1})
+
+    def test_plain_cases_copy(self):
+        """Test that modifying the returned cases does not modify the log"""
+        cases = self.log.get_cases()
+        cases[0].append('Z')
+        self.assertEqual(self.log.get_cases(), [['a','b'], ['a']])
+
+    def test_write_through(self):
+        """Test that cases and attributes written through the views are 
+        stored in the log"""
+        self.assertEqual(repr(self.log.get_cases(True)), repr(self.cases))
+        cases = self.log.get_cases(True)
+        cases[0], cases[1] = cases[1], cases[0]
+        self.assertEqual(self.log.get_cases(), [['a'], ['a','b']])
+        self.assertEqual(self.log.get_cases(True)[1][1]['cost'], '12')
+        cases[0] = [{'name':'c', 'timestamp':'2010-12-30T11:02:00Z'}]
+        self.assertEqual(dict(self.log.get_uniq_cases()), 
+                        {('a','b'):1, ('c',):1})
+        self.assertEqual(self.log.columns.number_of_cases(), 2)
+        event = self.log.get_cases(True)[1][0]
+        event['name'] = 'd'
+        event['cost'] = '3'
+        event['timestamp'] = '2010-12-30T10:02:00Z'
+        self.assertEqual(self.log.get_cases(), [['c'], ['d','b']])
+        self.assertEqual(self.log.get_alphabet(), set(['b','c','d']))
+        self.assertEqual(self.log.get_cases(True)[1][0].to_dict(), 
+                {'name':'d', 'cost':'3', 'transition':'complete', 
+                'org:resource':'Pete', 'timestamp':'2010-12-30T10:02:00Z'})
+        self.assertEqual(self.log.get_timestamps()[1], 1293703320000000)
+
+    def test_shuffle(self):
+        log = EnhancedLog(cases=[[{'name':str(i), 'n':i}] for i in range(50)])
+        random.Random(1).shuffle(log.get_cases(True))
+        cases = log.get_cases()
+        self.assertNotEqual(cases, [[str(i)] for i in range(50)])
+        self.assertEqual(sorted(cases), sorted([[str(i)] for i in range(50)]))
+        self.assertEqual([case[0]['n'] for case in log.get_cases(True)], 
+                        [int(case[0]) for case in cases])
+        self.assertEqual(log.columns.number_of_events(), 50)
+
+    def test_dummy_activities(self):
+        self.log.add_dummy_start_activity()
+        self.log.add_dummy_end_activity()
+        self.assertEqual(self.log.get_cases(), [['S','a','b','E'], 
+                                                ['S','a','E']])
+        self.assertEqual(self.log.get_cases(True)[0][2]['cost'], '12')
+
+    def test_select_and_extend(self):
+        log = self.log.select_cases([1, 0])
+        self.assertEqual(log.get_cases(True)[1].to_list(), self.cases[0])
+        log.extend(self.log.get_cases(True))
+        self.assertEqual(dict(log.get_uniq_cases()), 
+                        {('a','b'):2, ('a',):2})
+
+    def test_timestamp_round_trip(self):
+        for value in ['1969-07-20T20:17:40Z', '2011-03-01T08:00:00.123456-05:30',
+                      '2011-03-01 08:00:00.250']:
+            self.assertEqual(format_timestamp(*parse_timestamp(value)), value)
+        self.assertEqual(parse_timestamp('2011-02-30T08:00:00'), None)
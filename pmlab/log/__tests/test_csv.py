@@ -0,0 +1,78 @@
+import pmlab.log
+from .. import log_from_csv
+from ..projectors import CaseSpec, project_log
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+class Test_Log_From_Csv(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'test.csv')
+        rnd = random.Random(1)
+        rows = []
+        for case in range(40):
+            for event in range(rnd.randint(1,6)):
+                hour = rnd.randint(1,23)
+                rows.append('case{0},act{1},{2}.01.14 {3}:00,{2}.01.14 {3}:30'.format(
+                            case, rnd.randint(0,4), rnd.randint(10,12), hour))
+        rnd.shuffle(rows)
+        with open(self.filename, 'w') as f:
+            f.write('#case,activity,start,end\n')
+            f.write('\n'.join(rows)+'\n')
+        self.old_chunk_size = pmlab.log.csv_min_chunk_size
+        pmlab.log.csv_min_chunk_size = 64
+
+    def tearDown(self):
+        pmlab.log.csv_min_chunk_size = self.old_chunk_size
+        shutil.rmtree(self.dir)
+
+    def test_parallel_matches_serial(self):
+        """Test that parallel ingestion produces the same cases as the serial
+        one"""
+        time_format = '%d.%m.%y %H:%M'
+        serial = log_from_csv(self.filename, time_format=time_format,
+                            only_uniq_cases=True)
+        parallel = log_from_csv(self.filename, time_format=time_format,
+                            only_uniq_cases=True, processes=3)
+        self.assertEqual(len(serial.get_cases()), 40)
+        self.assertEqual(serial.get_uniq_cases(), parallel.get_uniq_cases())
+
+    def test_all_info(self):
+        """Test that times are parsed once and stored in an EnhancedLog"""
+        time_format = '%d.%m.%y %H:%M'
+        plain = log_from_csv(self.filename, time_format=time_format)
+        log = log_from_csv(self.filename, time_format=time_format, 
+                            all_info=True)
+        parallel = log_from_csv(self.filename, time_format=time_format, 
+                            all_info=True, processes=3)
+        self.assertEqual(log.get_cases(), plain.get_cases())
+        self.assertEqual(log.get_uniq_cases(), parallel.get_uniq_cases())
+        self.assertEqual(set(log.columns.timestamps), 
+                        set(['start_time', 'end_time']))
+        for case in log.get_cases(True):
+            for event in case:
+                self.assertRegexpMatches(event['start_time'], 
+                                        r'^1[0-2]\.01\.14 [1-9][0-9]?:00$')
+        durations = log.activity_durations()
+        for act, duration in durations.iteritems():
+            self.assertEqual(duration['sum'], duration['rep']*1800)
+
+    def test_spec(self):
+        """Test that the projection applied while parsing gives the same log
+        as projecting the loaded log"""
+        time_format = '%d.%m.%y %H:%M'
+        spec = CaseSpec(['act1','act2'], 'suppress', min_length=2)
+        full = log_from_csv(self.filename, time_format=time_format)
+        expected = [list(case) for case in project_log(full, ['act1','act2'], 
+                    'suppress').get_cases() if len(case) >= 2]
+        log = log_from_csv(self.filename, time_format=time_format, spec=spec)
+        self.assertEqual(sorted(log.get_cases()), sorted(expected))
+        log = log_from_csv(self.filename, time_format=time_format, spec=spec,
+                            processes=3)
+        self.assertEqual(sorted(log.get_cases()), sorted(expected))
+        log = log_from_csv(self.filename, time_format=time_format, spec=spec,
+                            all_info=True)
+        self.assertEqual(sorted(log.get_cases()), sorted(expected))
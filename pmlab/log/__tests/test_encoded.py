@@ -0,0 +1,62 @@
+from .. import Log
+from .. encoded import EncodedLog, encode_log
+from .. reencoders import DictionaryReencoder
+import unittest
+
+class Test_Encoded_Log(unittest.TestCase):
+    def setUp(self):
+        self.log = Log(cases=[['a','b','c'], ['a','b','c'], ['a','c'], ['b']])
+        self.elog = encode_log(self.log)
+
+    def test_arrays(self):
+        """Test that the CSR arrays describe the unique cases of the log"""
+        self.assertEqual(self.elog.number_of_uniq_cases(), 3)
+        self.assertEqual(self.elog.number_of_cases(), 4)
+        self.assertEqual(len(self.elog.events), 6)
+        self.assertEqual(self.elog.offsets[-1], 6)
+        self.assertEqual(str(self.elog.events.dtype), 'int32')
+
+    def test_decoding_views(self):
+        """Test that cases, unique cases and alphabet are decoded"""
+        self.assertEqual(self.elog.get_uniq_cases(), self.log.get_uniq_cases())
+        self.assertEqual(sorted(self.elog.get_cases()),
+                        sorted(map(tuple, self.log.get_cases())))
+        self.assertEqual(self.elog.get_alphabet(), set(['a','b','c']))
+
+    def test_dummy_activities(self):
+        """Test that dummy start and end activities are added to all cases"""
+        self.assertEqual(self.elog.add_dummy_start_activity(), 'S')
+        self.assertEqual(self.elog.add_dummy_end_activity(), 'E')
+        self.assertEqual(dict(self.elog.get_uniq_cases()),
+                        {('S','a','b','c','E'):2, ('S','a','c','E'):1,
+                        ('S','b','E'):1})
+
+    def test_reencode_merges_cases(self):
+        """Test that a non injective reencoding merges the unique cases"""
+        elog = encode_log(Log(cases=[['a','c'], ['b','c'], ['b']]))
+        elog.reencode(DictionaryReencoder({'a':'x', 'b':'x', 'c':'c'}))
+        self.assertEqual(dict(elog.get_uniq_cases()),
+                        {('x','c'):2, ('x',):1})
+        self.assertEqual(elog.number_of_uniq_cases(), 2)
+
+    def test_cached_encoding(self):
+        """Test that the encoded log of a plain log is kept until the log is
+        modified"""
+        encoded = self.log.get_encoded_log()
+        self.assertTrue(self.log.get_encoded_log() is encoded)
+        self.log.add_dummy_start_activity()
+        self.assertFalse(self.log.get_encoded_log() is encoded)
+
+    def test_parikh_matrix(self):
+        """Test that the Parikh matrix counts the activities of each unique
+        case and is cached with the encoded log"""
+        matrix, weights = self.log.parikh_matrix()
+        elog = self.log.get_encoded_log()
+        for i in range(elog.number_of_uniq_cases()):
+            row = matrix.getrow(i).toarray()[0]
+            case = elog.uniq_case(i)
+            self.assertEqual(dict((act, row[code]) for act, code 
+                                in elog.activity_ids.iteritems() if row[code]),
+                            dict((act, case.count(act)) for act in case))
+        self.assertEqual(sorted(weights), [1, 1, 2])
+        self.assertTrue(self.log.parikh_matrix()[0] is matrix)
@@ -0,0 +1,52 @@
+from .. import Log
+from .. encoded import encode_log
+import unittest
+
+class Test_Extend(unittest.TestCase):
+    def setUp(self):
+        self.log = Log(cases=[['a','b'], ['a','b'], ['a','c']])
+
+    def test_extend_cases(self):
+        """Test that cases and unique cases are updated"""
+        self.log.get_uniq_cases()
+        self.log.extend([['a','b'], ['d']])
+        self.log.add_case(['a','c'])
+        self.assertEqual(len(self.log.get_cases()), 6)
+        self.assertEqual(dict(self.log.get_uniq_cases()), 
+                        {('a','b'):3, ('a','c'):2, ('d',):1})
+
+    def test_extend_uniq_log(self):
+        """Test that a log stored as unique cases is not rehydrated"""
+        log = Log(uniq_cases={('a','b'):5})
+        log.extend([['a','b']])
+        self.assertEqual(log.cases, [])
+        self.assertEqual(dict(log.get_uniq_cases()), {('a','b'):6})
+
+    def test_derived_information(self):
+        """Test that alphabet, activity positions and encoded log are kept
+        up to date"""
+        self.log.get_alphabet()
+        old_positions = dict(zip(self.log.get_uniq_cases(), 
+                                self.log.get_activity_positions()))
+        encoded = self.log.get_encoded_log()
+        self.log.extend([['c','a','c'], ['a','b']])
+        self.assertEqual(self.log.alphabet, set(['a','b','c']))
+        positions = self.log.get_activity_positions()
+        for case, pos in zip(self.log.get_uniq_cases(), positions):
+            self.assertEqual(pos['c'], [i for i, act in enumerate(case) 
+                                        if act == 'c'])
+            #the positions of the known unique cases are not recomputed
+            if case in old_positions:
+                self.assertTrue(pos is old_positions[case])
+        self.assertTrue(self.log.get_encoded_log() is encoded)
+        self.assertEqual(encoded.get_uniq_cases(), self.log.get_uniq_cases())
+
+    def test_extend_encoded_log(self):
+        """Test that encoded logs grow in place"""
+        elog = encode_log(self.log)
+        for i in range(20):
+            elog.extend([['a','b'], ['e']*i])
+        self.assertEqual(elog.number_of_cases(), 43)
+        self.assertEqual(elog.get_uniq_cases()[('a','b')], 22)
+        self.assertEqual(elog.get_uniq_cases()[('e',)*5], 1)
+        self.assertTrue('e' in elog.get_alphabet())
@@ -0,0 +1,37 @@
+from .. import Log
+from ..filters import (FilterPipeline, CaseLengthFilter, PrefixerFilter,
+                        RemoveImmediateRepetitionsFilter, FrequencyFilter,
+                        filter_log)
+import unittest
+
+class Test_Filter_Pipeline(unittest.TestCase):
+    def setUp(self):
+        self.uniq_cases = {('a','b','b','c'):3, ('a','b','c'):2, ('a',):1, 
+                            ('e','e'):4}
+        self.log = Log(uniq_cases=dict(self.uniq_cases))
+
+    def test_merge(self):
+        """Test that unique cases that become equal are merged"""
+        pipeline = FilterPipeline(CaseLengthFilter(above=2),
+                                RemoveImmediateRepetitionsFilter(),
+                                PrefixerFilter('x'))
+        fl = pipeline.filter_log(self.log)
+        self.assertEqual(dict(fl.get_uniq_cases()), 
+                        {('xa','xb','xc'):5, ('xe',):4})
+
+    def test_same_as_filter_log(self):
+        """Test that the pipeline gives the same log as filtering each case"""
+        f = RemoveImmediateRepetitionsFilter()
+        cases_log = Log(cases=self.log.get_cases())
+        expected = filter_log(cases_log, f).get_uniq_cases()
+        self.assertEqual(dict(FilterPipeline(f).filter_log(
+                                self.log).get_uniq_cases()), dict(expected))
+        self.assertEqual(dict(filter_log(self.log, f).get_uniq_cases()), 
+                        dict(expected))
+
+    def test_shared_cases(self):
+        fl = FilterPipeline(FrequencyFilter(self.log, case_min_freq=3)
+                            ).filter_log(self.log)
+        self.assertEqual(sorted(fl.get_uniq_cases().values()), [3, 4])
+        for case in fl.get_uniq_cases():
+            self.assertTrue(any(case is c for c in self.uniq_cases))
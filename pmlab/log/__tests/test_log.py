@@ -0,0 +1,78 @@
+from .. import iter_xes_cases, log_from_xes, log_from_file
+from ..projectors import CaseSpec
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+xes_log = """<?xml version="1.0" encoding="UTF-8" ?>
+<log xes.version="1.0" xmlns="http://www.xes-standard.org/">
+<string key="concept:name" value="test"/>
+<trace>
+ <string key="concept:name" value="case0"/>
+ <event><string key="concept:name" value="a"/><string key="lifecycle:transition" value="complete"/></event>
+ <event><string key="concept:name" value="b"/><string key="lifecycle:transition" value="complete"/></event>
+</trace>
+<trace>
+ <string key="concept:name" value="case1"/>
+ <event><string key="concept:name" value="a"/><string key="lifecycle:transition" value="complete"/></event>
+ <event><string key="concept:name" value="b"/><string key="lifecycle:transition" value="complete"/></event>
+</trace>
+<trace>
+ <string key="concept:name" value="case2"/>
+ <event><string key="concept:name" value="a"/><string key="lifecycle:transition" value="complete"/></event>
+ <event><string key="concept:name" value="c"/><string key="lifecycle:transition" value="complete"/></event>
+ <event><string key="concept:name" value="b"/><string key="lifecycle:transition" value="complete"/></event>
+</trace>
+</log>
+"""
+
+class Test_Log_From_Xes(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'test.xes')
+        with open(self.filename, 'w') as f:
+            f.write(xes_log)
+        self.gz_filename = self.filename+'.gz'
+        with gzip.open(self.gz_filename, 'wb') as f:
+            f.write(xes_log)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_iter_xes_cases(self):
+        """Test that the cases are yielded one per trace, in file order"""
+        cases = list(iter_xes_cases(self.filename))
+        self.assertEqual(cases, [['a','b'], ['a','b'], ['a','c','b']])
+
+    def test_iter_xes_cases_all_info(self):
+        """Test that all the event information is kept if requested"""
+        cases = list(iter_xes_cases(self.filename, all_info=True))
+        self.assertEqual(cases[2][1], {'name':'c', 'transition':'complete'})
+
+    def test_uniq_cases(self):
+        """Test that unique cases are counted while streaming"""
+        log = log_from_xes(self.filename, only_uniq_cases=True)
+        self.assertEqual(dict(log.get_uniq_cases()), 
+                        {('a','b'):2, ('a','c','b'):1})
+        self.assertEqual(log.get_alphabet(), set(['a','b','c']))
+
+    def test_gz(self):
+        """Test that compressed logs are loaded, both through log_from_xes 
+        and log_from_file"""
+        log = log_from_xes(self.gz_filename)
+        self.assertEqual(len(log.get_cases()), 3)
+        log = log_from_file(self.gz_filename, uniq_cases=True)
+        self.assertEqual(len(log.get_uniq_cases()), 2)
+
+    def test_spec(self):
+        """Test that projections and filters are applied while parsing"""
+        log = log_from_xes(self.filename, spec=CaseSpec(['a','c'], 'keep'))
+        self.assertEqual(log.get_cases(), [['a'], ['a'], ['a','c']])
+        log = log_from_file(self.filename, uniq_cases=True, 
+                            spec=CaseSpec(['c'], 'suppress_if_any'))
+        self.assertEqual(dict(log.get_uniq_cases()), {('a','b'):2})
+        log = log_from_xes(self.filename, all_info=True, 
+                            spec=CaseSpec(min_length=3))
+        self.assertEqual([len(case) for case in log.get_cases(True)], [3])
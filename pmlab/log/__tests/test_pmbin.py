@@ -0,0 +1,68 @@
+from .. import Log, EncodedLog, log_from_file
+import numpy as np
+import os
+import shutil
+import tempfile
+import unittest
+
+class Test_Pmbin(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'test.tr')
+        with open(self.filename, 'w') as f:
+            f.write('a b c\na b c\na c\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_save_and_load(self):
+        """Test that a log saved in pmbin format is memory-mapped when 
+        loaded"""
+        log = Log(cases=[['a','b'], ['a','b'], ['b']])
+        pmbin = os.path.join(self.dir, 'test.pmbin')
+        log.save(pmbin, format='pmbin')
+        loaded = log_from_file(pmbin)
+        self.assertTrue(isinstance(loaded, EncodedLog))
+        self.assertTrue(isinstance(loaded.events, np.memmap))
+        self.assertEqual(loaded.get_uniq_cases(), log.get_uniq_cases())
+
+    def test_sidecar_cache(self):
+        """Test that the sidecar cache is written, reused and invalidated 
+        when the source file changes"""
+        log = log_from_file(self.filename, cache=True)
+        self.assertTrue(os.path.exists(self.filename+'.pmbin'))
+        self.assertEqual(dict(log.get_uniq_cases()), 
+                        {('a','b','c'):2, ('a','c'):1})
+        cached = log_from_file(self.filename, cache=True)
+        self.assertTrue(isinstance(cached.events, np.memmap))
+        self.assertEqual(cached.filename, self.filename)
+        with open(self.filename, 'a') as f:
+            f.write('d\n')
+        os.utime(self.filename, (0, 0))
+        log = log_from_file(self.filename, cache=True)
+        self.assertEqual(log.number_of_cases(), 4)
+
+    def test_truncated_sidecar(self):
+        """Test that a truncated sidecar is ignored and rewritten"""
+        log_from_file(self.filename, cache=True)
+        sidecar = self.filename+'.pmbin'
+        with open(sidecar, 'r+b') as f:
+            f.truncate(os.path.getsize(sidecar)-20)
+        log = log_from_file(self.filename, cache=True)
+        self.assertEqual(dict(log.get_uniq_cases()), 
+                        {('a','b','c'):2, ('a','c'):1})
+        self.assertTrue(isinstance(log.events, np.memmap))
+        self.assertEqual([name for name in os.listdir(self.dir) 
+                        if name.endswith('.tmp')], [])
+
+    def test_activity_names(self):
+        """Test that byte string and unicode activities keep their type"""
+        log = Log(cases=[['\xe9t\xe9', u'caf\xe9'], ['a']])
+        pmbin = os.path.join(self.dir, 'names.pmbin')
+        log.save(pmbin, format='pmbin')
+        loaded = log_from_file(pmbin)
+        self.assertEqual(dict(loaded.get_uniq_cases()), 
+                        dict(log.get_uniq_cases()))
+        self.assertEqual(sorted(type(act).__name__ 
+                                for act in loaded.activities),
+                        ['str', 'str', 'unicode'])
@@ -0,0 +1,40 @@
+from .. import Log
+import unittest
+
+class Test_Prefix_Tree(unittest.TestCase):
+    def setUp(self):
+        self.log = Log(uniq_cases={('a','b','c'):3, ('a','b','d'):2, 
+                                    ('a',):1, ('e',):4})
+
+    def test_counts(self):
+        tree = self.log.get_prefix_tree()
+        self.assertEqual(len(tree), 6)
+        ab = tree.node(('a','b'))
+        self.assertEqual((tree.count[ab], tree.variants[ab], tree.ends[ab]),
+                        (5, 2, 0))
+        self.assertEqual(tree.count[0], 10)
+        self.assertEqual(tree.case(tree.node(('a','b','d'))), ('a','b','d'))
+        self.assertEqual(tree.node(('b',)), None)
+
+    def test_walk(self):
+        """Test that each shared prefix is stepped once and that unreachable
+        subtrees are skipped"""
+        steps = []
+        def step(state, activity):
+            steps.append(activity)
+            return None if activity == 'c' else state + activity
+        tree = self.log.get_prefix_tree()
+        reached = dict(tree.walk('', step))
+        self.assertEqual(sorted(steps), ['a','b','c','d','e'])
+        self.assertEqual(reached[tree.node('abd')], 'abd')
+        self.assertEqual(reached[tree.node('abc')], None)
+        fitting = sum(tree.ends[node] for node, state in reached.iteritems()
+                    if state is not None)
+        self.assertEqual(fitting, 7)
+
+    def test_extend(self):
+        tree = self.log.get_prefix_tree()
+        self.log.extend([['a','b'], ['a','b','c']])
+        self.assertTrue(self.log.get_prefix_tree() is tree)
+        self.assertEqual(tree.count[tree.node('ab')], 7)
+        self.assertEqual(tree.variants[tree.node('ab')], 3)
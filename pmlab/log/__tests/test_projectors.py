@@ -0,0 +1,48 @@
+from .. import Log
+from ..encoded import EncodedLog
+from ..projectors import project_log, CaseSpec, projection_actions
+import random
+import unittest
+
+class Test_Project_Log(unittest.TestCase):
+    def setUp(self):
+        rnd = random.Random(2)
+        #more than 64 activities, so that signatures have several words
+        alphabet = ['a{0}'.format(i) for i in range(70)]
+        self.cases = [[rnd.choice(alphabet[:5] if rnd.random() < 0.5 
+                                    else alphabet) 
+                        for j in range(rnd.randint(1,5))]
+                        for i in range(300)]
+        self.log = Log(cases=self.cases)
+
+    def test_same_as_per_case(self):
+        """Test that the vectorized projection keeps the same cases, in the
+        same order, as projecting each case"""
+        uniq_log = Log(uniq_cases=dict(self.log.get_uniq_cases()))
+        for activities in (['a1','a2'], ['a0','a1','a2','a3','a4'], 
+                            ['a65','a3']):
+            for action in projection_actions:
+                spec = CaseSpec(activities, action)
+                expected = [spec.project(case) for case in self.cases]
+                expected = [case for case in expected if case is not None]
+                proj_log = project_log(self.log, activities, action)
+                self.assertEqual(proj_log.get_cases(), expected)
+                expected_uniq = {}
+                for case in expected:
+                    key = tuple(case)
+                    expected_uniq[key] = expected_uniq.get(key, 0) + 1
+                proj_log = project_log(uniq_log, activities, action)
+                self.assertTrue(isinstance(proj_log, EncodedLog))
+                self.assertEqual(dict(proj_log.get_uniq_cases()), 
+                                expected_uniq)
+                self.assertEqual(proj_log.number_of_uniq_cases(), 
+                                len(expected_uniq))
+        self.assertEqual(uniq_log.cases, [])
+
+    def test_signatures_cached(self):
+        signatures = self.log.get_activity_signatures()
+        self.assertTrue(self.log.get_activity_signatures() is signatures)
+        self.assertEqual(signatures.shape[1], 2)
+        self.log.add_case(['a0'])
+        self.assertEqual(len(self.log.get_activity_signatures()), 
+                        len(self.log.get_uniq_cases()))
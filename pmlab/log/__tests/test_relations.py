@@ -0,0 +1,43 @@
+from .. import Log
+from collections import defaultdict
+import random
+import unittest
+
+class Test_Log_Relations(unittest.TestCase):
+    def setUp(self):
+        rnd = random.Random(2)
+        self.cases = [[rnd.choice('abcab') for i in xrange(rnd.randint(0,9))]
+                        for j in xrange(200)]
+        self.log = Log(cases=self.cases)
+
+    def test_matrices(self):
+        """Test the relations against the counts of each case"""
+        df, loops, ef = defaultdict(int), defaultdict(int), defaultdict(int)
+        for case in self.cases:
+            for i, act in enumerate(case):
+                if i+1 < len(case):
+                    df[(act, case[i+1])] += 1
+                if i+2 < len(case) and case[i+2] == act:
+                    loops[(act, case[i+1])] += 1
+                for act2 in case[i+1:]:
+                    ef[(act, act2)] += 1
+        rel = self.log.get_relations()
+        self.assertEqual(rel.named(rel.directly_follows), dict(df))
+        self.assertEqual(rel.named(rel.two_loops), dict(loops))
+        self.assertEqual(rel.named(rel.eventually_follows), dict(ef))
+        followed = defaultdict(int)
+        for case in self.cases:
+            for i, act in enumerate(case):
+                for act2 in set(case[i+1:]):
+                    followed[(act, act2)] += 1
+        self.assertEqual(rel.named(rel.followed_events()), dict(followed))
+        starts = sum(1 for case in self.cases if case and case[0] == 'a')
+        self.assertEqual(rel.start_counts[rel.code('a')], starts)
+
+    def test_cache(self):
+        rel = self.log.get_relations()
+        self.assertTrue(self.log.get_relations() is rel)
+        self.log.add_case(['c','c'])
+        rel2 = self.log.get_relations()
+        self.assertEqual(rel2.directly_follows[rel2.code('c'),rel2.code('c')],
+                        rel.directly_follows[rel.code('c'),rel.code('c')]+1)
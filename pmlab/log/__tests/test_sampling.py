@@ -0,0 +1,96 @@
+import pmlab.log
+from .. import Log, log_from_csv, iter_cases
+from ..sampling import (BernoulliSampler, ReservoirSampler, StratifiedSampler,
+                        sample_cases, sample_log, sample_file)
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+class Test_Sampling(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.uniq_cases = {('a','b','c'):5000, ('a','c'):2000, ('d',):3}
+        self.log = Log(uniq_cases=dict(self.uniq_cases))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_reservoir(self):
+        sample = sample_log(self.log, ReservoirSampler(100, seed=1))
+        counts = sample.get_uniq_cases()
+        self.assertEqual(sum(counts.values()), 100)
+        self.assertTrue(50 < counts[('a','b','c')] < 90)
+        small = sample_log(self.log, ReservoirSampler(10000, seed=1))
+        self.assertEqual(dict(small.get_uniq_cases()), self.uniq_cases)
+
+    def test_reservoir_uniform(self):
+        """Test that every position of the stream is sampled with the same
+        probability, whether offered one by one or in bulk"""
+        hits = [0]*20
+        for seed in range(2000):
+            sampler = ReservoirSampler(5, seed=seed)
+            for i in range(10):
+                sampler.add((i,))
+            sampler.add(('bulk',), 10)
+            for case in sampler.reservoir:
+                if case[0] != 'bulk':
+                    hits[case[0]] += 1
+        # each position is sampled with probability 5/20
+        for h in hits[:10]:
+            self.assertTrue(400 < h < 600)
+
+    def test_bernoulli(self):
+        sample = sample_log(self.log, BernoulliSampler(0.1, seed=3))
+        counts = sample.get_uniq_cases()
+        self.assertTrue(400 < counts[('a','b','c')] < 600)
+        self.assertTrue(140 < counts[('a','c')] < 260)
+        same = sample_cases(self.log.get_cases(), BernoulliSampler(0, seed=3))
+        self.assertEqual(same.get_uniq_cases(), {})
+        all_cases = sample_log(self.log, BernoulliSampler(1))
+        self.assertEqual(dict(all_cases.get_uniq_cases()), self.uniq_cases)
+        first = sample_log(self.log, BernoulliSampler(0.1, seed=3))
+        self.assertEqual(first.get_uniq_cases(), counts)
+
+    def test_stratified(self):
+        sampler = StratifiedSampler(5, key='variant', seed=1)
+        sample = sample_log(self.log, sampler)
+        self.assertEqual(dict(sample.get_uniq_cases()),
+                        {('a','b','c'):5, ('a','c'):5, ('d',):3})
+        self.assertEqual(dict(sampler.populations), self.uniq_cases)
+        sampler = StratifiedSampler(4, key='length', seed=1)
+        sample = sample_log(self.log, sampler)
+        counts = sample.get_uniq_cases()
+        self.assertEqual(counts[('a','b','c')], 4)
+        self.assertEqual(counts[('d',)], 3)
+        self.assertEqual(dict(sampler.populations), {3:5000, 2:2000, 1:3})
+
+    def test_sample_file(self):
+        """Test that raw and CSV files are sampled while streamed"""
+        raw = os.path.join(self.dir, 'test.tr')
+        with open(raw, 'w') as f:
+            f.write('# comment\n')
+            for i in range(300):
+                f.write('a b c\n' if i % 3 else 'a c\n')
+        sample = sample_file(raw, ReservoirSampler(30, seed=2),
+                            comment_marks='#')
+        self.assertEqual(sum(sample.get_uniq_cases().values()), 30)
+        self.assertEqual(sample.get_alphabet(), set(['a','b','c']))
+        rnd = random.Random(1)
+        rows = []
+        for case in range(30):
+            hours = [rnd.randint(10,23) for event in range(rnd.randint(1,5))]
+            for act, hour in enumerate(hours):
+                rows.append('case{0},act{1},2014-01-01T{2}:00:00,'
+                            '2014-01-01T{2}:30:00'.format(case, act, hour))
+        filename = os.path.join(self.dir, 'test.csv')
+        with open(filename, 'w') as f:
+            f.write('\n'.join(rows)+'\n')
+        old_buffer = pmlab.log.csv_stream_buffer
+        pmlab.log.csv_stream_buffer = 8
+        try:
+            streamed = list(iter_cases(filename))
+        finally:
+            pmlab.log.csv_stream_buffer = old_buffer
+        self.assertEqual(streamed, log_from_csv(filename).get_cases())
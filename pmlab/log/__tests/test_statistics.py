@@ -0,0 +1,37 @@
+from .. import Log
+import unittest
+
+class Test_Log_Statistics(unittest.TestCase):
+    def setUp(self):
+        self.log = Log(uniq_cases={('a','b','a'):3, ('a','c'):2, ('d',):1, 
+                                    ('b','a','b','a'):1})
+
+    def test_histograms(self):
+        self.assertEqual(self.log.case_length_histogram(), 
+                        [(1, 1), (2, 2), (3, 3), (4, 1)])
+        self.assertEqual(self.log.case_frequency_histogram(),
+                        [(1, 2), (2, 1), (3, 1)])
+        self.assertFalse(self.log.cases)
+
+    def test_counts(self):
+        stats = self.log.get_statistics()
+        self.assertEqual((stats.cases, stats.uniq_cases, stats.events),
+                        (7, 4, 18))
+        self.assertEqual(dict(stats.activity_frequencies()),
+                        {'a':10, 'b':5, 'c':2, 'd':1})
+        self.assertEqual(dict(stats.activity_frequencies(case_count=True)),
+                        {'a':6, 'b':4, 'c':2, 'd':1})
+        self.assertEqual(dict(stats.start_activities()), 
+                        {'a':5, 'b':1, 'd':1})
+        self.assertEqual(dict(stats.end_activities()), 
+                        {'a':4, 'c':2, 'd':1})
+        self.assertEqual(dict(stats.directly_follows()),
+                        {('a','b'):4, ('b','a'):5, ('a','c'):2})
+
+    def test_invalidation(self):
+        """Test that the cached statistics are recomputed when the log
+        changes"""
+        self.assertEqual(self.log.get_statistics().cases, 7)
+        self.log.add_case(['d'])
+        self.assertEqual(self.log.get_statistics().cases, 8)
+        self.assertEqual(self.log.activity_frequencies()['d'], 2)
@@ -0,0 +1,57 @@
+from .. timestamps import (NAT, parse_timestamp, parse_iso_timestamps, 
+                        parse_formatted_timestamps, to_datetimes, 
+                        format_timestamp)
+from datetime import datetime
+import random
+import unittest
+
+class Test_Timestamps(unittest.TestCase):
+    def test_vectorized_matches_scalar(self):
+        """Test that the vectorized ISO-8601 parser agrees with the scalar 
+        one"""
+        rnd = random.Random(3)
+        values = [None, '', 'yesterday', '2011-02-29T10:00:00', 
+                '2012-02-29T10:00:00', '2010-12-30T11:02:00.000-00:00',
+                '2010-12-30T24:02:00.000+01:00', u'2010-12-30T11:02:00Z']
+        for i in range(200):
+            value = '%04d-%02d-%02d%s%02d:%02d:%02d' % (rnd.randint(1,2100),
+                    rnd.randint(1,12), rnd.randint(1,31), rnd.choice('T '),
+                    rnd.randint(0,23), rnd.randint(0,59), rnd.randint(0,59))
+            value += rnd.choice(['', '.123', '.000001', '.5', '.12', 
+                                '.1234567', '.123456000', '.123456789'])
+            value += rnd.choice(['', 'Z', '+01:00', '-05:30', '+14:00', 
+                                '+0100', '-0530', '-0000'])
+            values.append(value)
+        micros, offsets, styles, verbatim = parse_iso_timestamps(values)
+        for i, value in enumerate(values):
+            parsed = parse_timestamp(value)
+            if parsed is None:
+                self.assertEqual(micros[i], NAT)
+                self.assertEqual(i in verbatim, value is not None)
+            else:
+                self.assertEqual((micros[i], offsets[i], styles[i]), parsed)
+                self.assertEqual(i in verbatim, 
+                                format_timestamp(*parsed) != value)
+
+    def test_xs_datetime(self):
+        """Test fractions of 1 to 9 digits and time zones without colon"""
+        values = ['2010-12-30T11:02:00.5+01:00', '2010-12-30T11:02:00.12+01:00',
+                '2010-12-30T10:02:00.123456789Z', '2010-12-30T11:02:00+0100',
+                '2010-12-30T10:02:00.1234567890Z']
+        micros, offsets, styles, verbatim = parse_iso_timestamps(values)
+        base = 1293703320000000
+        self.assertEqual(micros.tolist(), [base+500000, base+120000, 
+                                        base+123456, base, NAT])
+        self.assertEqual(offsets.tolist(), [60, 60, 0, 60, 0])
+        self.assertEqual(verbatim, [2, 4])
+        for i in (0, 1, 3):
+            self.assertEqual(format_timestamp(micros[i], offsets[i], 
+                                            styles[i]), values[i])
+
+    def test_formatted(self):
+        values = ['30.12.10 11:02', '30.12.10 1:02', 'never', None]
+        micros, offsets, styles, verbatim = parse_formatted_timestamps(
+                                                values, '%d.%m.%y %H:%M')
+        self.assertEqual(to_datetimes(micros), [datetime(2010,12,30,11,2),
+                        datetime(2010,12,30,1,2), None, None])
+        self.assertEqual(verbatim, [1, 2])
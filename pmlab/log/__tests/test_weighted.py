@@ -0,0 +1,58 @@
+from .. import Log
+from ..encoded import encode_log
+from ..filters import filter_log, CaseLengthFilter
+from ..noise import log_from_noise
+from ..clustering import random_balanced_clusters
+import random
+import unittest
+
+class Test_Weighted_Cases(unittest.TestCase):
+    def setUp(self):
+        self.uniq_cases = {('a','b','c'):1000, ('a','c'):500, ('d','e'):1}
+        self.log = Log(uniq_cases=dict(self.uniq_cases))
+
+    def test_iter_weighted(self):
+        self.assertEqual(dict(self.log.iter_weighted()), self.uniq_cases)
+        self.assertEqual(dict(self.log.get_weighted_variants()), 
+                        self.uniq_cases)
+        self.assertEqual(dict(encode_log(self.log).iter_weighted()),
+                        self.uniq_cases)
+        cases_log = Log(cases=[['a'], ['b'], ['a']])
+        self.assertEqual(list(cases_log.iter_weighted()), 
+                        [(['a'], 1), (['b'], 1), (['a'], 1)])
+        self.assertEqual(self.log.cases, [])
+
+    def test_rehydrate(self):
+        self.assertEqual(len(self.log.rehydrate()), 1501)
+        self.assertEqual(len(self.log.cases), 1501)
+
+    def test_consumers(self):
+        """Test that noise, filters and clustering do not rehydrate"""
+        random.seed(1)
+        noisy = log_from_noise(self.log, perror=0.1)
+        self.assertEqual(sum(noisy.get_uniq_cases().values()), 1501)
+        self.assertTrue(700 < noisy.get_uniq_cases()[('a','b','c')] < 1000)
+        filtered = filter_log(self.log, CaseLengthFilter(above=3))
+        self.assertEqual(dict(filtered.get_uniq_cases()), 
+                        {('a','b','c'):1000})
+        logs = random_balanced_clusters(self.log, 2)
+        self.assertEqual([sum(log.get_uniq_cases().values()) for log in logs],
+                        [751, 750])
+        self.assertEqual(self.log.cases, [])
+        cases_log = Log(cases=[['a'], ['b'], ['c']])
+        self.assertEqual([log.get_cases() for log in 
+                        random_balanced_clusters(cases_log, 2)],
+                        [[['a'], ['b']], [['c']]])
+
+    def test_output_storage(self):
+        """Test that derived logs are stored like their input, whatever the
+        occurrences of the unique cases"""
+        uniq_log = Log(uniq_cases={('a','b'):1, ('b','c'):1, ('c','a'):3})
+        for log in (random_balanced_clusters(uniq_log, 2) + 
+                    [log_from_noise(uniq_log, perror=0.5)]):
+            self.assertEqual(log.cases, [])
+            self.assertTrue(log.only_uniq_cases())
+        cases_log = Log(cases=[['a','b'], ['a','b'], ['b','c']])
+        for log in (random_balanced_clusters(cases_log, 2) + 
+                    [log_from_noise(cases_log, perror=0.5)]):
+            self.assertFalse(log.only_uniq_cases())
@@ -0,0 +1,87 @@
+"""Activity bitsets of the unique cases of an encoded log.
+
+The signature of a unique case is the set of its activities, stored as a row
+of uint64 words in which bit (c % 64) of word (c // 64) is set if the
+activity with code c appears in the case. Tests such as "the case contains
+some (or only) activities of a set" become bitwise operations over the
+signatures of all the unique cases at once.
+
+Example:
+>>> signatures = log.get_activity_signatures()
+>>> mask = pmlab.log.bitsets.activity_mask(log.get_encoded_log(), ['A','B'])
+>>> selected = pmlab.log.bitsets.contains_any(signatures, mask)"""
+import numpy
+
+def number_of_words(activities):
+    """Returns the number of uint64 words of the bitsets of [activities]
+    activity codes."""
+    return max(1, (activities + 63) // 64)
+
+def activity_signatures(elog):
+    """Returns the (unique cases x words) uint64 array with the signature of
+    each unique case of the EncodedLog [elog]."""
+    n = elog.number_of_uniq_cases()
+    signatures = numpy.zeros((n, number_of_words(len(elog.activities))),
+                            dtype=numpy.uint64)
+    events = elog.events.astype(numpy.int64)
+    cases = numpy.repeat(numpy.arange(n), elog.case_lengths())
+    bits = numpy.left_shift(numpy.uint64(1), (events & 63).astype(numpy.uint64))
+    numpy.bitwise_or.at(signatures, (cases, events >> 6), bits)
+    return signatures
+
+def activity_codes(elog, activities):
+    """Returns the boolean array that tells, for each activity code of the
+    EncodedLog [elog], if the activity is in [activities]. Activities not in
+    the log are ignored."""
+    selected = numpy.zeros(len(elog.activities), dtype=bool)
+    codes = [elog.activity_ids[act] for act in activities
+            if act in elog.activity_ids]
+    selected[codes] = True
+    return selected
+
+def activity_mask(elog, activities):
+    """Returns the bitset (uint64 array) of [activities] in the EncodedLog
+    [elog]."""
+    mask = numpy.zeros(number_of_words(len(elog.activities)),
+                    dtype=numpy.uint64)
+    for code in numpy.flatnonzero(activity_codes(elog, activities)):
+        mask[code >> 6] |= numpy.uint64(1) << numpy.uint64(code & 63)
+    return mask
+
+def contains_any(signatures, mask):
+    """Returns the boolean array that tells which [signatures] have some
+    activity of the bitset [mask]."""
+    return (signatures & mask).any(axis=1)
+
+def contains_only(signatures, mask):
+    """Returns the boolean array that tells which [signatures] only have
+    activities of the bitset [mask]."""
+    return ~(signatures & ~mask).any(axis=1)
+
+def activity_membership(elog):
+    """Returns the (unique cases x activity codes) boolean array that tells
+    which activities appear in each unique case of the EncodedLog 
+    [elog]."""
+    signatures = elog.get_activity_signatures()
+    codes = numpy.arange(len(elog.activities))
+    words = signatures[:, codes >> 6]
+    bits = (words >> (codes & 63).astype(numpy.uint64)) & numpy.uint64(1)
+    return bits == 1
+
+_popcount_table = numpy.array([bin(i).count('1') for i in xrange(256)],
+                            dtype=numpy.int64)
+
+def pack(selected):
+    """Returns the bitsets (uint8 arrays, see numpy.packbits) of the rows of
+    the boolean array [selected]."""
+    return numpy.packbits(selected, axis=-1)
+
+def unpack(bits, length):
+    """Returns the boolean array of [length] elements of the bitset 
+    [bits] (see pack)."""
+    return numpy.unpackbits(bits, axis=-1)[..., :length].astype(bool)
+
+def popcount(bits):
+    """Returns the number of bits set in each row of the uint8 array of 
+    bitsets [bits] (see pack)."""
+    return _popcount_table[bits].sum(axis=-1)
@@ -1,38 +1,55 @@
-import copy
-from collections import defaultdict, namedtuple, deque
-from .. log import Log, EnhancedLog
+"""Clustering of the cases of a log.
 
-from matplotlib.pyplot import show
-from hcluster import pdist, linkage, dendrogram
+The plotting and hierarchical clustering libraries (matplotlib, hcluster) 
+are only imported by the functions that draw, so that the clustering 
+functions can be used without a display."""
+from collections import defaultdict, namedtuple, deque
+import heapq
+from .. log import Log, EnhancedLog, log_from_weighted
+from .. log.encoded import ngram_matrix
+from .. log import bitsets
 
 import numpy
-from numpy.random import rand
-from numpy import zeros
-from pandas import DataFrame
-from pylab import plot,show
-from scipy.cluster.vq import kmeans,vq
 
 def random_balanced_clusters(log, clusters=2):
     """Returns a list of logs obtained from [log] by random
     balancing clustering. 
     
     Actually the order is not random but follows the original log order. Works
-    with plain and enhanced logs."""
+    with plain and enhanced logs. The cases of plain logs are read with 
+    Log.iter_weighted, so a log only stored as unique cases is split without
+    rehydrating it, producing logs also stored as unique cases."""
     enhanced = isinstance(log,EnhancedLog)
-    cases = log.get_cases(True) if enhanced else log.get_cases()
-    LogClass = EnhancedLog if enhanced else Log
-    base_size = len(cases)/clusters
+    if enhanced:
+        number_of_cases = log.columns.number_of_cases()
+    else:
+        number_of_cases = sum(occ for case, occ in log.iter_weighted())
+    base_size = number_of_cases/clusters
     cluster_sizes = [base_size]*clusters
-    for i in xrange(len(cases)%clusters):
+    for i in xrange(number_of_cases%clusters):
         cluster_sizes[i] += 1
     print 'Generating', clusters, 'clusters with sizes:'
     print cluster_sizes
-    current_case = 0
+    if enhanced:
+        logs = []
+        current_case = 0
+        for size in cluster_sizes:
+            logs.append(log.select_cases(range(current_case,current_case+size)))
+            current_case += size
+        return logs
     logs = []
-    for cluster, size in enumerate(cluster_sizes):
-        new_log = LogClass(cases=copy.deepcopy(cases[current_case:current_case+size]))
-        logs.append(new_log)
-        current_case += size
+    weighted_cases = log.iter_weighted()
+    case, left = None, 0
+    for size in cluster_sizes:
+        cluster = []
+        while size > 0:
+            while left == 0:
+                case, left = next(weighted_cases)
+            taken = min(size, left)
+            cluster.append((case, taken))
+            size -= taken
+            left -= taken
+        logs.append(log_from_weighted(cluster, log.only_uniq_cases()))
     return logs
 
 TreeNode = namedtuple('TreeNode','cases sons selectable_act')
@@ -42,239 +59,393 @@ def optional_clusters(log, threshold):
     splitting cases that contain and do not contain a particular activity. The
     activity chosen is the one that gives the more balanced splitting. If no
     splitting activity is available, then the cluster is not further split, 
-    regardless of its size."""
-    cases = log.get_uniq_cases().items()
-    cases_per_activity = log.cases_per_activity(uniq_cases=True)
-    all_cases = set(range(len(cases)))
-    all_activities = cases_per_activity.keys()
-    selectable_act = [act for act in all_activities 
-                    if len(cases_per_activity[act]) not in [0, len(all_cases)]]
-    splits = []
-    tree_nodes = [TreeNode(all_cases,[], selectable_act),]
+    regardless of its size.
+    
+    The unique cases of each tree node and of each activity are bitsets (see
+    pmlab.log.bitsets), so the split of a node is scored for all the 
+    selectable activities with a few array operations."""
+    elog = log.get_encoded_log()
+    cases = list(elog.iter_uniq_cases())
+    activities = elog.activities
+    #bitset of the unique cases of each activity
+    cases_per_activity = bitsets.pack(bitsets.activity_membership(elog).T)
+    all_cases = bitsets.pack(numpy.ones(len(cases), dtype=bool))
+    def selectable(node_cases, candidates):
+        """Returns the candidates that appear in some but not all the 
+        cases of the node."""
+        candidates = numpy.asarray(candidates, dtype=numpy.int64)
+        counts = bitsets.popcount(cases_per_activity[candidates] & node_cases)
+        return candidates[(counts > 0) & 
+                        (counts < bitsets.popcount(node_cases))].tolist()
+    tree_nodes = [TreeNode(all_cases,[], 
+                            selectable(all_cases, range(len(activities)))),]
     nodes_to_expand = deque([0])
     leafs = []
     while len(nodes_to_expand) > 0:
         #split current node if it is above threshold an there are selectable activities
         current_node = nodes_to_expand.pop()
         tn = tree_nodes[current_node]
-        #print tn
-        if (len(tn.cases) <= threshold or 
+        size = bitsets.popcount(tn.cases)
+        if (size <= threshold or 
             len(tn.selectable_act) == 0):
             leafs.append(tn)
             continue
-        print 'Expanding node', current_node, 'of size', len(tn.cases)
+        print 'Expanding node', current_node, 'of size', size
         #selecting most balanced split
-        dif_sizes = [(act,abs(len(tn.cases&cases_per_activity[act]) - len(tn.cases)/2)) 
-                        for act in tn.selectable_act]
-        sorted_size = sorted(dif_sizes,key = lambda x: x[1])
-        selected_act = sorted_size[0][0]
-        cases_son1 = tn.cases&cases_per_activity[selected_act]
-        cases_son2 = tn.cases-cases_son1
-        print "Splitting using activity '{0}' that appears in {1} cases".format(selected_act,len(cases_son1))
+        counts = bitsets.popcount(cases_per_activity[tn.selectable_act] & 
+                                tn.cases)
+        selected_act = tn.selectable_act[numpy.abs(counts - size/2).argmin()]
+        cases_son1 = tn.cases & cases_per_activity[selected_act]
+        cases_son2 = tn.cases & ~cases_son1
+        print "Splitting using activity '{0}' that appears in {1} cases".format(
+                activities[selected_act], bitsets.popcount(cases_son1))
         tn.sons.append(len(tree_nodes))
         tn.sons.append(len(tree_nodes)+1)
-        selectable1 = [act for act in tn.selectable_act 
-                        if len(cases_son1&cases_per_activity[act]) not in [0,len(cases_son1)]]
-        selectable2 = [act for act in tn.selectable_act 
-                        if len(cases_son2&cases_per_activity[act]) not in [0,len(cases_son2)]]
-        tree_nodes.append( TreeNode(cases_son1, [], selectable1) )
-        tree_nodes.append( TreeNode(cases_son2, [], selectable2) )
+        tree_nodes.append( TreeNode(cases_son1, [], 
+                                    selectable(cases_son1, tn.selectable_act)) )
+        tree_nodes.append( TreeNode(cases_son2, [], 
+                                    selectable(cases_son2, tn.selectable_act)) )
         nodes_to_expand.append( tn.sons[0] )
         nodes_to_expand.append( tn.sons[1] )
     print 'Generating', len(leafs), 'clusters'
     logs = []
     for node in leafs:
         cluster_cases = defaultdict(int)
-        for c in node.cases:
+        for c in numpy.flatnonzero(bitsets.unpack(node.cases, len(cases))):
             cluster_cases[cases[c][0]] = cases[c][1]
         new_log = Log(uniq_cases=cluster_cases)
         logs.append(new_log)
     return logs
 
+def _case_variants(elog, log):
+    """Returns the pair (cases, variants) with the list of cases of [log], 
+    which is not only stored as unique cases, and the array with the unique
+    case of its EncodedLog [elog] of each case."""
+    variants = dict((case, i) for i, (case, occ) 
+                    in enumerate(elog.iter_uniq_cases()))
+    cases = [case for case, occ in log.iter_weighted()]
+    return cases, numpy.array([variants[tuple(case)] for case in cases],
+                            dtype=numpy.int64)
+
+def _variant_clusters(log, elog, cases, case_variants, variant_clusters,
+                    clusters):
+    """Returns the list of the [clusters] logs with the cases of [log] in 
+    each cluster, given the array [variant_clusters] with the cluster of 
+    each unique case of [elog] (-1 for none). The clusters of a log only stored as unique 
+    cases ([cases] is None) are built from the unique cases and their 
+    occurrences, the others keep the order of [cases]."""
+    if cases is None:
+        weighted = [[] for i in xrange(clusters)]
+        for cluster, case in zip(variant_clusters.tolist(), 
+                                elog.iter_uniq_cases()):
+            if cluster >= 0:
+                weighted[cluster].append(case)
+        return [log_from_weighted(cases, True) for cases in weighted]
+    case_clusters = variant_clusters[case_variants]
+    return [Log(cases=[cases[i] for i in 
+                        numpy.flatnonzero(case_clusters == cluster)])
+            for cluster in xrange(clusters)]
+
 def max_alphabet_clusters(log, threshold):
     """Creates n clusters. The first n-1 contain cases such that the
     alphabet of the log is below [threshold]. The last one contains all 
-    remaining cases."""
-    cases = log.get_cases()
-    alphabets = []
-    wholeAlphabet = set()
-    for case in cases:
-        alphabet = set(case)
-        alphabets.append( alphabet )
-        wholeAlphabet.update( alphabet )
-    print "Complete alphabet has",len(wholeAlphabet),"elements"
-    unassigned = set(range(len(alphabets)))
-    logs = []
-    while True:
-        #take smallest alphabet in unassigned
-        (index,alph) = min((len(e[1]), e) for e in [(i,alphabets[i]) for i in unassigned])[1]
-        if len(alph) > threshold:
-            print "#Remaining", len(unassigned),"cases have alphabets greater than the threshold"
-            break
-        #find all traces with same alphabet, and the one that yields smaller alphabet increment
-        unassigned.remove( index )
-        cluster = [index]
-        print (index, alph)
-        while True:
-            differences = [(i,alphabets[i]-alph) for i in unassigned]
-            mindif = len(wholeAlphabet)
-            d_index=None
-            for e in differences:
-                if len(e[1]) == 0:
-                    cluster.append(e[0])
-                    unassigned.remove( e[0] )
-                elif len(e[1]) < mindif:
-                    #print "Prev min", mindif, "Prev index", d_index
-                    mindif = len(e[1])
-                    d_index = e[0]
-                    d_alph = e[1]
-                    #print "New min", mindif,"New idx",d_index
-            #d_alph = alphabets[d_index]
-            #print "selected with index", d_index, "and alphabet",d_alph
-            #(d_index,d_alph) = min((len(e[1]), e) for e in differences)[1]
-            if len(d_alph)+len(alph) > threshold:
+    remaining cases.
+    
+    Cases are grouped by their alphabet, and the greedy search works on the
+    unique alphabets: each cluster starts with the smallest unassigned 
+    alphabet and absorbs the alphabet that adds less new activities while 
+    the threshold is not exceeded. The growth of each alphabet is kept in a 
+    heap that, when the cluster alphabet grows, is only updated for the 
+    alphabets that contain the new activities. A log only stored as unique
+    cases is clustered without rehydrating it (see Log.only_uniq_cases)."""
+    elog = log.get_encoded_log()
+    if elog.number_of_uniq_cases() == 0:
+        return [Log(cases=[])]
+    #unique alphabets (activity signatures) of the unique cases
+    variant_first, variant_alphabets = numpy.unique(
+                                    elog.get_activity_signatures(), axis=0,
+                                    return_index=True, return_inverse=True)[1:]
+    if log.only_uniq_cases():
+        cases, case_variants = None, None
+        #alphabets numbered by first unique case
+        first = variant_first
+    else:
+        cases, case_variants = _case_variants(elog, log)
+        #alphabets numbered by first case
+        case_alphabets = variant_alphabets[case_variants]
+        first = numpy.empty(len(variant_first), dtype=numpy.int64)
+        first.fill(len(cases))
+        numpy.minimum.at(first, case_alphabets, numpy.arange(len(cases)))
+    order = numpy.argsort(first)
+    rank = numpy.empty(len(order), dtype=numpy.int64)
+    rank[order] = numpy.arange(len(order))
+    variant_alphabets = rank[variant_alphabets]
+    membership = bitsets.activity_membership(elog)[variant_first[order]]
+    sizes = membership.sum(axis=1)
+    occurrences = numpy.bincount(variant_alphabets, weights=elog.counts,
+                                minlength=len(sizes)).astype(numpy.int64)
+    #alphabets that contain each activity
+    containing = [numpy.flatnonzero(column) for column in membership.T]
+    print "Complete alphabet has",membership.any(axis=0).sum(),"elements"
+    unassigned = numpy.ones(len(sizes), dtype=bool)
+    #cluster of each alphabet, -1 if unassigned
+    alphabet_clusters = numpy.empty(len(sizes), dtype=numpy.int64)
+    alphabet_clusters.fill(-1)
+    clusters = 0
+    while unassigned.any():
+        #only alphabets that fit in the cluster enter the heap
+        candidates = numpy.flatnonzero(unassigned & (sizes <= threshold))
+        growth = sizes.copy()
+        heap = zip(sizes[candidates].tolist(), candidates.tolist())
+        heapq.heapify(heap)
+        cluster_alphabet = numpy.zeros(membership.shape[1], dtype=bool)
+        alphabet_size = 0
+        cluster = []
+        while heap:
+            alph_growth, alph = heapq.heappop(heap)
+            if not unassigned[alph] or alph_growth != growth[alph]:
+                continue #outdated entry
+            if alphabet_size + alph_growth > threshold:
                 break
-            cluster.append(d_index)
-            alph |= d_alph
-            #print "current alphabet",alph
-            unassigned.remove( d_index )
-        print "#Cluster found with",len(cluster),"cases with alphabet size",len(alph)
-
-        cluster_cases = [cases[i] for i in cluster]
-        logs.append(Log(cases=cluster_cases))
+            unassigned[alph] = False
+            cluster.append(alph)
+            new_activities = numpy.flatnonzero(membership[alph] & 
+                                            ~cluster_alphabet)
+            cluster_alphabet[new_activities] = True
+            alphabet_size += len(new_activities)
+            if len(new_activities) == 0:
+                continue
+            updated = numpy.concatenate([containing[act] 
+                                        for act in new_activities])
+            updated = updated[unassigned[updated]]
+            updated, decrease = numpy.unique(updated, return_counts=True)
+            growth[updated] -= decrease
+            updated = updated[growth[updated] <= threshold - alphabet_size]
+            for other in updated.tolist():
+                heapq.heappush(heap, (growth[other], other))
+        if not cluster:
+            print "#Remaining", occurrences[unassigned].sum(),
+            print "cases have alphabets greater than the threshold"
+            break
+        alphabet_clusters[cluster] = clusters
+        clusters += 1
+        print "#Cluster found with",occurrences[cluster].sum(),
+        print "cases with alphabet size", alphabet_size
     #final cluster
-    garbage_cases = [cases[i] for i in unassigned]
-    logs.append(Log(cases=garbage_cases))
-    return logs
+    alphabet_clusters[unassigned] = clusters
+    return _variant_clusters(log, elog, cases, case_variants,
+                            alphabet_clusters[variant_alphabets], clusters+1)
 
 def xor_activities_clusters( log ):
     """Splits in clusters selecting a pair of mutually exclusive activities.
     Produces three logs: one containing all the cases in which the first 
     exclusive activity appears, the second containing all the cases of the 
     second activity, and the last one containing all the cases in which none of
-    the previous activities appears."""
-    cases = log.get_cases()
-    cases_per_activity = log.cases_per_activity()
-    all_cases = set(range(len(cases)))
-    all_activities = cases_per_activity.keys()
-    splits = []
-    for i, act1 in enumerate(all_activities):
-        for j in range(i+1,len(all_activities)):
-            #print i, j
-            act2 = all_activities[j]
-            t1 = cases_per_activity[act1]
-            t2 = cases_per_activity[act2]
-            intersection = t1 & t2
-            if len(intersection) == 0:
-                print 'Candidates',act1,'and',act2
-                #order
-                if sorted(t1)[0] < sorted(t2)[0]:
-                    tup = (t1,t2,act1,act2)
-                else:
-                    tup = (t2,t1,act2,act1)
-                if tup not in splits:
-                    splits.append(tup)
-    #sort splits, use the one involving more traces
-    #print splits
-    max_traces = 0
-    max_split = 0
-    for i, tup in enumerate(splits):
-        val = len(tup[0])+len(tup[1])
-        if max_traces < val:
-            max_traces = val
-            max_split = i
-    #split
+    the previous activities appears.
+    
+    The exclusive pairs are found on the activity membership of the unique
+    cases (see pmlab.log.bitsets): two activities are exclusive if no 
+    unique case contains both. The clusters are selections of unique cases,
+    so a log only stored as unique cases is not rehydrated (see 
+    max_alphabet_clusters)."""
+    elog = log.get_encoded_log()
+    if log.only_uniq_cases():
+        cases, case_variants = None, None
+        first_case = numpy.arange(elog.number_of_uniq_cases())
+    else:
+        #unique case of each case, and first case of each unique case
+        cases, case_variants = _case_variants(elog, log)
+        first_case = numpy.empty(elog.number_of_uniq_cases(), 
+                                dtype=numpy.int64)
+        first_case.fill(len(cases))
+        numpy.minimum.at(first_case, case_variants, numpy.arange(len(cases)))
+    membership = bitsets.activity_membership(elog)
+    present = numpy.flatnonzero(membership.any(axis=0))
+    membership = membership[:, present]
+    all_activities = [elog.activities[code] for code in present]
+    cases_per_activity = elog.counts.dot(membership)
+    first_per_activity = numpy.where(membership, first_case[:, None], 
+                                    first_case.max()+1).min(axis=0)
+    together = membership.T.astype(numpy.float32).dot(
+                                        membership.astype(numpy.float32))
+    first, second = numpy.triu_indices(len(all_activities), 1)
+    exclusive = together[first, second] == 0
+    first, second = first[exclusive], second[exclusive]
+    for i, j in zip(first, second):
+        print 'Candidates',all_activities[i],'and',all_activities[j]
+    #use the split involving more traces
+    best = (cases_per_activity[first] + cases_per_activity[second]).argmax()
+    split = (first[best], second[best])
+    if first_per_activity[split[1]] < first_per_activity[split[0]]:
+        split = split[::-1]
     print ("Splitting using activities '{0}' ({1} cases) "
-        "and '{2}' ({3} cases)").format(splits[max_split][2],
-                                        len(splits[max_split][0]),
-                                        splits[max_split][3],
-                                        len(splits[max_split][1]))
-    logs = []
-    for cluster in range(2):
-        logs.append( Log(cases=[cases[t] for t in splits[max_split][cluster]]) )
-    #remainder cluster
-    remaining_cases = all_cases - splits[max_split][0] - splits[max_split][1]
-    logs.append( Log(cases=[cases[t] for t in remaining_cases]) )
-    return logs
+        "and '{2}' ({3} cases)").format(all_activities[split[0]],
+                                        cases_per_activity[split[0]],
+                                        all_activities[split[1]],
+                                        cases_per_activity[split[1]])
+    #cluster of each unique case, the last one is the remainder cluster
+    variant_clusters = numpy.empty(len(first_case), dtype=numpy.int64)
+    variant_clusters.fill(2)
+    variant_clusters[membership[:, split[1]]] = 1
+    variant_clusters[membership[:, split[0]]] = 0
+    return _variant_clusters(log, elog, cases, case_variants, 
+                            variant_clusters, 3)
+
+def _present_activities(log):
+    """Returns the Parikh matrix and weights of [log] (see Log.parikh_matrix)
+    restricted to the columns of the activities that appear in some case."""
+    matrix, weights = log.parikh_matrix()
+    present = numpy.unique(log.get_encoded_log().events)
+    return matrix[:, present], weights
+
+def _euclidean_pdist(matrix):
+    """Returns the condensed matrix (see hcluster.pdist) of the euclidean 
+    distances between the rows of the sparse [matrix], computed from its 
+    Gram matrix."""
+    gram = (matrix * matrix.T).toarray().astype(float)
+    norms = numpy.diag(gram)
+    rows, cols = numpy.triu_indices(len(norms), 1)
+    squared = norms[rows] + norms[cols] - 2*gram[rows, cols]
+    return numpy.sqrt(numpy.maximum(squared, 0))
 
 def hierarchical_clusters( log, show_plot=None ):
     """Translates traces to Parikh vectors and computes in the vector space
-       a hierarchical clustering."""
-    def get_parikh(case,alphabet):
-        v = zeros(len(alphabet),dtype=int)
-        for act in case:
-            v[alphabet[act]] = v[alphabet[act]] +1
-        # canonical representation
-        m = min(v)
-        return v - m   
-    
-    actsind = {}
-    i = 0
-    for act in log.get_alphabet():
-        actsind[act] = i
-        i = i +1
-
-    uniq_cases = log.get_uniq_cases()
-    N = len(uniq_cases)
-    M = len(actsind)
-    data = zeros((N,M),dtype=int)
-    i = 0
-    parikhdict = {}
-    for case in uniq_cases.keys():
-        data[i] = get_parikh(case,actsind)
-        str_i = ','.join(map(str,data[i]))
-        if str_i not in parikhdict:
-            parikhdict[str_i] = [i]
-        else:
-            parikhdict[str_i].append(i)
-        i = i + 1
-    df = DataFrame(data)
-    data_uniq = df.drop_duplicates()
-    Y = pdist(data_uniq,metric='euclidean')
+       a hierarchical clustering. The memory used is quadratic in the number
+       of different vectors (see kmeans_clusters for large logs)."""
+    from hcluster import linkage, dendrogram
+    from matplotlib.pyplot import show
+    data, weights = _present_activities(log)
+    N, M = data.shape
+    # canonical representation: subtract the minimum of each vector, which 
+    # is only non-zero for the cases containing all the activities
+    data = data.astype(int)
+    if M > 0:
+        for i in numpy.flatnonzero(numpy.diff(data.indptr) == M):
+            start, end = data.indptr[i], data.indptr[i+1]
+            data.data[start:end] -= data.data[start:end].min()
+    data.eliminate_zeros()
+    data.sort_indices()
+    # drop duplicated vectors
+    keys = {}
+    for i in xrange(N):
+        start, end = data.indptr[i], data.indptr[i+1]
+        keys.setdefault((data.indices[start:end].tostring(), 
+                        data.data[start:end].tostring()), i)
+    data_uniq = data[sorted(keys.itervalues())]
+    Y = _euclidean_pdist(data_uniq)
     Z = linkage(Y,method='average')
     dendrogram(Z)
     show()
  
 
-def similarity_clusters( log, show_plot=None ):
+def similarity_clusters( log, show_plot=None, clusters=2 ):
     """Translates traces to Parikh vectors and computes in the vector space
-       a K-means clustering."""
-    
-    def get_parikh(case,alphabet):
-        v = zeros(len(alphabet),dtype=int)
-        for act in case:
-            v[alphabet[act]] = v[alphabet[act]] +1
-        return v    
-    
-    actsind = {}
-    i = 0
-    for act in log.alphabet:
-        actsind[act] = i
-        i = i +1
+       a K-means clustering with [clusters] clusters (see minibatch_kmeans).
+       Returns the Parikh vectors (a dense array of unique cases x 
+       activities, see Log.parikh_matrix). If [show_plot], the vectors of 
+       the first two clusters are plotted. See kmeans_clusters to obtain 
+       the logs of the clusters."""
+    matrix, weights = log.parikh_matrix()
+    centroids, idx = minibatch_kmeans(matrix, clusters, weights)
+    data = matrix.toarray()
+    if show_plot:
+        from pylab import plot, show
+        plot(data[idx==0],'ob',data[idx==1],'or')
+        plot(centroids[:,0],centroids[:,1],'sg',markersize=8)
+        show()  
+    return data
 
-    uniq_cases = log.get_uniq_cases()
-    N = len(uniq_cases)
-    M = len(actsind)
-    data = zeros((N,M),dtype=int)
-    i = 0
-    for case in uniq_cases.keys():
-        data[i] = get_parikh(case,actsind)
-        i = i + 1
-    print data
-#    data = vstack((rand(150,2) + array([.5,.5]),rand(150,2)))
-    # computing K-Means with K = 2 (2 clusters)
-    centroids,_ = kmeans(data,2)
-    # assign each sample to a cluster
-    idx,_ = vq(data,centroids)
+def _squared_distances(rows, centroids):
+    """Returns the (rows x centroids) array of the squared euclidean 
+    distances between the rows of the sparse matrix [rows] and the dense 
+    [centroids]."""
+    squared = (numpy.asarray(rows.multiply(rows).sum(axis=1)) - 
+                2*rows.dot(centroids.T) + (centroids**2).sum(axis=1))
+    return numpy.maximum(squared, 0)
 
-    # some plotting using numpy's logical indexing
-#    plot(data[idx==0,0],data[idx==0,1],'ob',
-#     data[idx==1,0],data[idx==1,1],'or')
-    plot(data[idx==0],'ob',data[idx==1],'or')
-    plot(centroids[:,0],centroids[:,1],'sg',markersize=8)
-    show()  
-    return data
+def _assign(matrix, centroids, batch_size):
+    """Returns the index of the nearest centroid of each row of [matrix],
+    computed in batches of [batch_size] rows."""
+    labels = numpy.empty(matrix.shape[0], dtype=numpy.int64)
+    for start in xrange(0, matrix.shape[0], batch_size):
+        labels[start:start+batch_size] = _squared_distances(
+            matrix[start:start+batch_size], centroids).argmin(axis=1)
+    return labels
+
+def minibatch_kmeans(matrix, k, weights=None, batch_size=1024, 
+                    iterations=100, seed=None):
+    """Mini-batch k-means of the rows of the sparse [matrix] (e.g. the 
+    Parikh vectors of Log.parikh_matrix), where the row i stands for 
+    weights[i] points (1 if [weights] is None).
     
+    The initial centroids are chosen with k-means++, and then each of the 
+    [iterations] moves the centroids towards a batch of [batch_size] rows 
+    sampled proportionally to their weight. The memory used is linear in 
+    the number of rows. Returns the (k x columns) array of centroids and 
+    the array with the index of the nearest centroid of each row."""
+    rnd = numpy.random.RandomState(seed)
+    n = matrix.shape[0]
+    k = min(k, n)
+    weights = (numpy.ones(n) if weights is None 
+                else numpy.asarray(weights, dtype=float))
+    probabilities = weights / weights.sum()
+    #k-means++ seeding
+    chosen = [rnd.choice(n, p=probabilities)]
+    centroids = matrix[chosen].toarray().astype(float)
+    nearest = _squared_distances(matrix, centroids)[:, 0]
+    for i in xrange(1, k):
+        scores = nearest*weights
+        if scores.sum() <= 0:
+            break
+        chosen.append(rnd.choice(n, p=scores/scores.sum()))
+        centroid = matrix[chosen[-1]].toarray().astype(float)
+        centroids = numpy.vstack((centroids, centroid))
+        nearest = numpy.minimum(nearest, 
+                                _squared_distances(matrix, centroid)[:, 0])
+    counts = numpy.zeros(len(centroids))
+    for iteration in xrange(iterations):
+        batch = matrix[rnd.choice(n, size=min(batch_size, n), 
+                                p=probabilities)]
+        labels = _squared_distances(batch, centroids).argmin(axis=1)
+        for c in numpy.unique(labels):
+            members = batch[numpy.flatnonzero(labels == c)]
+            counts[c] += members.shape[0]
+            rate = members.shape[0] / counts[c]
+            centroids[c] = ((1-rate)*centroids[c] + 
+                            rate*numpy.asarray(members.mean(axis=0))[0])
+    return centroids, _assign(matrix, centroids, batch_size)
+
+def kmeans_clusters(log, clusters=2, ngrams=1, batch_size=1024, 
+                    iterations=100, seed=None):
+    """Returns a list of logs obtained from [log] by clustering its unique 
+    cases with mini-batch k-means (see minibatch_kmeans), weighting each one
+    by its occurrences. No plot is shown, and the memory used is linear in
+    the number of unique cases.
     
- 
-            
+    [ngrams] length of the sequences of activities counted in the vectors: 1
+        for Parikh vectors (see Log.parikh_matrix), 2 to count the pairs of
+        consecutive activities, etc.
+    
+    Empty clusters are not returned, and each log is an EncodedLog (see 
+    pmlab.log.encoded).
+    
+    Example:
+    >>> logs = pmlab.log.clustering.kmeans_clusters(log, 8, ngrams=2)"""
+    elog = log.get_encoded_log()
+    if ngrams == 1:
+        matrix, weights = log.parikh_matrix()
+    else:
+        key = ('ngrams', ngrams)
+        if key not in elog.cache:
+            elog.cache[key] = ngram_matrix(elog, ngrams)
+        matrix, weights = elog.cache[key], elog.counts
+    if matrix.shape[0] == 0:
+        return []
+    centroids, labels = minibatch_kmeans(matrix.astype(float), clusters, 
+                                        weights, batch_size, iterations, seed)
+    logs = []
+    for c in xrange(len(centroids)):
+        selected = numpy.flatnonzero(labels == c)
+        if len(selected):
+            logs.append(elog.select(selected))
+    return logs
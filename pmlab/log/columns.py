@@ -0,0 +1,443 @@
+"""Module with the columnar (struct of arrays) storage of the event attributes
+of an EnhancedLog.
+
+Instead of keeping one dictionary per event, each standard attribute is
+stored in a typed numpy array indexed by event. The events of case i are the
+ones in range(offsets[i], offsets[i+1]):
+    name, transition, org:resource: int32 codes of the interned values (see
+        Categories), -1 if the event has no such attribute.
+    timestamp, start_time, end_time: int64 microseconds since the epoch, NAT
+        if missing (see pmlab.log.timestamps). The time zone offset and the
+        layout of the original string are kept so that the original value can
+        be given back. Times are parsed once, when the events are added.
+Any other attribute is stored sparsely, as a dictionary per key that maps
+event indexes to values. So are the times that cannot be given back from
+their numeric value. Dictionary-like access to the events is given by
+views (see EventView, CaseView and CasesView) that write through to the
+columns."""
+from collections import defaultdict
+import numpy
+from timestamps import NAT, parse_timestamps, format_timestamp, to_datetimes
+
+categorical_keys = ('name', 'transition', 'org:resource')
+time_keys = ('timestamp', 'start_time', 'end_time')
+
+class Categories:
+    """Interned values of a categorical attribute. [values] is the list of
+    distinct values, and [codes] maps each value to its position in the
+    list."""
+    def __init__(self, values=()):
+        self.values = list(values)
+        self.codes = dict((v, i) for i, v in enumerate(self.values))
+
+    def code(self, value):
+        """Returns the code of [value], adding it if it is new."""
+        try:
+            return self.codes[value]
+        except KeyError:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+            return code
+
+    def __len__(self):
+        return len(self.values)
+
+    def decoder(self):
+        """Returns an object array that maps each code to its value. Code -1
+        is mapped to None."""
+        decoder = numpy.empty(len(self.values)+1, dtype=object)
+        decoder[:-1] = self.values
+        return decoder
+
+class EventColumns:
+    """Attributes of the events of a set of cases stored as columns.
+
+    [time_formats] maps time attributes to the datetime.strptime format used
+    to parse them, attributes not in it are parsed as ISO-8601 timestamps."""
+    def __init__(self, time_formats=None):
+        self.offsets = numpy.zeros(1, dtype=numpy.int64)
+        self.codes = dict((key, numpy.zeros(0, dtype=numpy.int32))
+                            for key in categorical_keys)
+        self.categories = dict((key, Categories()) for key in categorical_keys)
+        self.time_formats = dict(time_formats) if time_formats else {}
+        self.timestamps = {}
+        self.timezones = {}
+        self.timestamp_styles = {}
+        #time attribute -> column, only for the attributes that appear
+        self.extra = {}
+        #maps each other attribute to a dictionary {event index: value}
+
+    def number_of_cases(self):
+        return len(self.offsets)-1
+
+    def number_of_events(self):
+        return len(self.codes['name'])
+
+    def _time_columns(self):
+        """Yields the tuples (key, timestamps, timezones, styles) of the time
+        attributes."""
+        for key in self.timestamps:
+            yield (key, self.timestamps[key], self.timezones[key],
+                    self.timestamp_styles[key])
+
+    def _set_time_columns(self, key, times, zones, styles):
+        self.timestamps[key] = times
+        self.timezones[key] = zones
+        self.timestamp_styles[key] = styles
+
+    def extend(self, cases):
+        """Appends [cases], each one a sequence of dictionaries (or of event
+        views), to the columns."""
+        base = self.number_of_events()
+        lengths = []
+        codes = dict((key, []) for key in categorical_keys)
+        times = dict((key, []) for key in time_keys)
+        extra = defaultdict(dict)
+        index = base
+        for case in cases:
+            length = 0
+            for event in case:
+                for key, column in codes.iteritems():
+                    value = event.get(key)
+                    column.append(-1 if value is None
+                                    else self.categories[key].code(value))
+                for key, column in times.iteritems():
+                    column.append(event.get(key))
+                for key in event:
+                    if key not in codes and key not in times:
+                        extra[key][index] = event[key]
+                index += 1
+                length += 1
+            lengths.append(length)
+        if not lengths:
+            return
+        n = index - base
+        for key, column in codes.iteritems():
+            self.codes[key] = numpy.concatenate((self.codes[key],
+                                numpy.array(column, dtype=numpy.int32)))
+        for key, values in times.iteritems():
+            present = any(value is not None for value in values)
+            if not present and key not in self.timestamps:
+                continue
+            if present:
+                parsed = parse_timestamps(values, self.time_formats.get(key))
+                for i in parsed[3]:
+                    extra[key][base+i] = values[i]
+            else:
+                parsed = (numpy.empty(n, dtype=numpy.int64),
+                        numpy.zeros(n, dtype=numpy.int16),
+                        numpy.zeros(n, dtype=numpy.int8))
+                parsed[0].fill(NAT)
+            if key not in self.timestamps:
+                old = numpy.empty(base, dtype=numpy.int64)
+                old.fill(NAT)
+                self._set_time_columns(key, old,
+                    numpy.zeros(base, dtype=numpy.int16),
+                    numpy.zeros(base, dtype=numpy.int8))
+            self._set_time_columns(key,
+                numpy.concatenate((self.timestamps[key], parsed[0])),
+                numpy.concatenate((self.timezones[key], parsed[1])),
+                numpy.concatenate((self.timestamp_styles[key], parsed[2])))
+        for key, values in extra.iteritems():
+            self.extra.setdefault(key, {}).update(values)
+        self.offsets = numpy.concatenate((self.offsets, self.offsets[-1] +
+                            numpy.cumsum(lengths, dtype=numpy.int64)))
+
+    def take(self, events, lengths):
+        """Returns new columns with the events in the array of event indexes
+        [events], grouped in cases with the given [lengths]."""
+        events = numpy.asarray(events, dtype=numpy.int64)
+        new = EventColumns(self.time_formats)
+        new.offsets = numpy.zeros(len(lengths)+1, dtype=numpy.int64)
+        numpy.cumsum(lengths, out=new.offsets[1:])
+        for key, column in self.codes.iteritems():
+            new.codes[key] = column[events]
+            new.categories[key] = Categories(self.categories[key].values)
+        for key, times, zones, styles in self._time_columns():
+            new._set_time_columns(key, times[events], zones[events],
+                                    styles[events])
+        for key, values in self.extra.iteritems():
+            selected = numpy.in1d(events, values.keys())
+            if selected.any():
+                new.extra[key] = dict((i, values[events[i]])
+                                for i in numpy.flatnonzero(selected).tolist())
+        return new
+
+    def select(self, case_indexes):
+        """Returns new columns with the cases in the list [case_indexes]."""
+        case_indexes = numpy.asarray(case_indexes, dtype=numpy.int64)
+        starts = self.offsets[case_indexes]
+        lengths = self.offsets[case_indexes+1] - starts
+        new_starts = numpy.cumsum(lengths) - lengths
+        events = (numpy.arange(lengths.sum(), dtype=numpy.int64) +
+                    numpy.repeat(starts - new_starts, lengths))
+        return self.take(events, lengths)
+
+    def insert_events(self, name, at_end=False):
+        """Inserts an event with activity [name] (and no other attributes) at
+        the beginning (or at the end if [at_end]) of every case."""
+        n = self.number_of_cases()
+        positions = self.offsets[1:] if at_end else self.offsets[:-1]
+        code = self.categories['name'].code(name)
+        for key, column in self.codes.items():
+            self.codes[key] = numpy.insert(column, positions,
+                                            code if key == 'name' else -1)
+        for key, times, zones, styles in list(self._time_columns()):
+            self._set_time_columns(key, numpy.insert(times, positions, NAT),
+                                    numpy.insert(zones, positions, 0),
+                                    numpy.insert(styles, positions, 0))
+        for key, values in self.extra.iteritems():
+            old = numpy.array(values.keys(), dtype=numpy.int64)
+            new = old + numpy.searchsorted(positions, old, 'right')
+            self.extra[key] = dict(zip(new.tolist(), values.values()))
+        self.offsets = self.offsets + numpy.arange(n+1)
+
+    def rename(self, function):
+        """Replaces each activity name by [function](name). Names with the
+        same image are merged."""
+        new = Categories()
+        remap = numpy.array([new.code(function(name)) for name in
+                        self.categories['name'].values] + [-1], dtype=numpy.int32)
+        self.codes['name'] = remap[self.codes['name']]
+        self.categories['name'] = new
+
+    def names(self):
+        """Returns the list of cases, each one the list of its activity
+        names."""
+        names = self.categories['name'].decoder()[self.codes['name']].tolist()
+        bounds = self.offsets.tolist()
+        return [names[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+    def uniq_cases(self):
+        """Returns a dictionary that maps each unique case (tuple of activity
+        names) to its number of occurrences. Cases are compared on their
+        codes, so that names are only decoded once per unique case."""
+        codes = self.codes['name']
+        bounds = self.offsets.tolist()
+        counts = defaultdict(int)
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            counts[codes[start:end].tostring()] += 1
+        decoder = self.categories['name'].decoder()
+        uniq_cases = defaultdict(int)
+        for key, occ in counts.iteritems():
+            case = numpy.fromstring(key, dtype=numpy.int32)
+            uniq_cases[tuple(decoder[case].tolist())] += occ
+        return uniq_cases
+
+    def value(self, index, key):
+        """Returns the value of attribute [key] of event [index]. Raises
+        KeyError if the event has no such attribute."""
+        codes = self.codes.get(key)
+        if codes is not None:
+            code = codes[index]
+            if code >= 0:
+                return self.categories[key].values[code]
+        values = self.extra.get(key)
+        if values is not None and index in values:
+            return values[index]
+        times = self.timestamps.get(key)
+        if times is not None and times[index] != NAT:
+            time_format = self.time_formats.get(key)
+            if time_format:
+                return to_datetimes(times[index:index+1])[0].strftime(
+                                                                time_format)
+            return format_timestamp(times[index], self.timezones[key][index],
+                                    self.timestamp_styles[key][index])
+        raise KeyError, key
+
+    def set_value(self, index, key, value):
+        """Sets the attribute [key] of event [index] to [value]."""
+        codes = self.codes.get(key)
+        if codes is not None:
+            codes[index] = -1 if value is None \
+                            else self.categories[key].code(value)
+            return
+        if key in time_keys:
+            parsed = parse_timestamps([value], self.time_formats.get(key))
+            if key not in self.timestamps:
+                n = self.number_of_events()
+                times = numpy.empty(n, dtype=numpy.int64)
+                times.fill(NAT)
+                self._set_time_columns(key, times,
+                    numpy.zeros(n, dtype=numpy.int16),
+                    numpy.zeros(n, dtype=numpy.int8))
+            self.timestamps[key][index] = parsed[0][0]
+            self.timezones[key][index] = parsed[1][0]
+            self.timestamp_styles[key][index] = parsed[2][0]
+            if not len(parsed[3]):
+                self.extra.get(key, {}).pop(index, None)
+                return
+        self.extra.setdefault(key, {})[index] = value
+
+    def keys(self, index):
+        """Returns the list of attributes of event [index]."""
+        keys = [key for key, codes in self.codes.iteritems()
+                if codes[index] >= 0]
+        keys += [key for key, values in self.extra.iteritems()
+                if index in values]
+        keys += [key for key, times in self.timestamps.iteritems()
+                if times[index] != NAT and key not in keys]
+        return keys
+
+class EventView:
+    """Dictionary-like view of the attributes of an event stored in
+    EventColumns. Values are looked up on demand and written through to the
+    columns, use 'to_dict' to obtain a plain dictionary. [changed] is called
+    after each write."""
+    def __init__(self, columns, index, changed=None):
+        self.columns = columns
+        self.index = index
+        self.changed = changed
+
+    def __getitem__(self, key):
+        return self.columns.value(self.index, key)
+
+    def __setitem__(self, key, value):
+        self.columns.set_value(self.index, key, value)
+        if self.changed:
+            self.changed()
+
+    def get(self, key, default=None):
+        try:
+            return self.columns.value(self.index, key)
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    has_key = __contains__
+
+    def keys(self):
+        return self.columns.keys(self.index)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def iteritems(self):
+        return iter(self.items())
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, EventView):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+class CaseView:
+    """Sequence of the events (see EventView) of the case with index [case]
+    in EventColumns."""
+    def __init__(self, columns, case, changed=None):
+        self.columns = columns
+        self.case = case
+        self.start = int(columns.offsets[case])
+        self.end = int(columns.offsets[case+1])
+        self.changed = changed
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in xrange(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError, 'event index out of range'
+        return EventView(self.columns, self.start+i, self.changed)
+
+    def __iter__(self):
+        for index in xrange(self.start, self.end):
+            yield EventView(self.columns, index, self.changed)
+
+    def to_list(self):
+        """Returns the list of dictionaries of the events of the case."""
+        return [event.to_dict() for event in self]
+
+    def __eq__(self, other):
+        if isinstance(other, CaseView):
+            other = other.to_list()
+        return self.to_list() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return repr(self.to_list())
+
+class CasesView:
+    """Sequence of the cases (see CaseView) stored in EventColumns.
+
+    Cases can be replaced by other cases of the view or by new sequences of
+    dictionaries, e.g. random.shuffle(log.get_cases(True)). The columns are
+    not rebuilt on each replacement: the index in the columns of the case at
+    each position is kept in [order] (new cases are appended to the columns)
+    until commit is called. [changed] is called after each write."""
+    def __init__(self, columns, changed=None):
+        self.columns = columns
+        self.changed = changed
+        self.order = None
+        #case index in the columns of each position, None if not reordered
+
+    def __len__(self):
+        if self.order is None:
+            return self.columns.number_of_cases()
+        return len(self.order)
+
+    def _position(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError, 'case index out of range'
+        return i
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in xrange(*i.indices(len(self)))]
+        i = self._position(i)
+        case = i if self.order is None else self.order[i]
+        return CaseView(self.columns, case, self.changed)
+
+    def __setitem__(self, i, case):
+        i = self._position(i)
+        if self.order is None:
+            self.order = range(len(self))
+        if isinstance(case, CaseView) and case.columns is self.columns:
+            self.order[i] = case.case
+        else:
+            self.columns.extend([case])
+            self.order[i] = self.columns.number_of_cases()-1
+        if self.changed:
+            self.changed()
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield self[i]
+
+    def commit(self):
+        """Rebuilds the columns with the cases in the current order (if they
+        were replaced) and returns them. Views obtained before keep referring
+        to the previous columns."""
+        if self.order is not None:
+            self.columns = self.columns.select(self.order)
+            self.order = None
+        return self.columns
+
+    def __repr__(self):
+        return repr(list(self))
@@ -0,0 +1,551 @@
+"""Integer-encoded columnar storage for logs in the pmlab package.
+
+Activities are interned into a small integer vocabulary, and the events of all
+the unique cases of a log are stored in a single contiguous int32 array. An
+array of case offsets (CSR layout) delimits each unique case, and a parallel
+array keeps the number of occurrences of each unique case."""
+from array import array
+from collections import defaultdict
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from .. log import Log
+
+class _Vocabulary(dict):
+    """Dictionary that assigns consecutive integers to new activities."""
+    def __missing__(self, activity):
+        code = len(self)
+        self[activity] = code
+        return code
+
+def encode_uniq_cases(uniq_cases, filename=None, format=None):
+    """Returns an EncodedLog containing the unique cases in [uniq_cases] (a
+    dictionary mapping each unique case to its number of occurrences)."""
+    vocabulary = _Vocabulary()
+    events = array('i')
+    lengths = array('l')
+    counts = array('l')
+    for case, occ in uniq_cases.iteritems():
+        events.extend(map(vocabulary.__getitem__, case))
+        lengths.append(len(case))
+        counts.append(occ)
+    activities = [None]*len(vocabulary)
+    for act, code in vocabulary.iteritems():
+        activities[code] = act
+    offsets = np.zeros(len(lengths)+1, dtype=np.int64)
+    np.cumsum(np.frombuffer(lengths, dtype=np.dtype('l')), out=offsets[1:])
+    return EncodedLog(filename=filename, format=format, activities=activities,
+                    events=np.frombuffer(events, dtype=np.int32).copy(),
+                    offsets=offsets,
+                    counts=np.frombuffer(counts, dtype=np.dtype('l')).astype(np.int64))
+
+def encode_log(log):
+    """Returns an EncodedLog with the same unique cases as [log].
+
+    Example:
+    >>> elog = pmlab.log.encoded.encode_log(log)
+    >>> elog.events, elog.offsets, elog.counts
+    """
+    return encode_uniq_cases(log.get_uniq_cases(), filename=log.filename,
+                            format=log.last_write_format)
+
+class EncodedLog(Log):
+    """Class representing a log whose unique cases are stored as integer
+    arrays:
+        activities: list mapping each activity code to the activity name.
+        events: int32 array with the activity codes of all the events of all
+            the unique cases, one unique case after the other.
+        offsets: int64 array of length (unique cases+1). The events of unique
+            case i are events[offsets[i]:offsets[i+1]].
+        counts: int64 array with the occurrences of each unique case.
+
+    get_cases, get_uniq_cases and get_alphabet decode the arrays on demand, so
+    that an EncodedLog can be used with all the algorithms that work on plain
+    logs. Derived information (such as the one computed by the vectorized
+    algorithms working on the arrays) is stored in the [cache] dictionary,
+    which is cleared whenever the log is modified."""
+    def __init__(self, filename=None, format=None, activities=None,
+                events=None, offsets=None, counts=None):
+        """Constructs an encoded log from its arrays (see class
+        documentation). If no arrays are given, an empty log is returned."""
+        Log.__init__(self, filename=filename, format=format)
+        self.activities = list(activities) if activities is not None else []
+        self.activity_ids = dict((act, code)
+                                for code, act in enumerate(self.activities))
+        self.events = (events if events is not None
+                        else np.zeros(0, dtype=np.int32))
+        self.offsets = (offsets if offsets is not None
+                        else np.zeros(1, dtype=np.int64))
+        self.counts = (counts if counts is not None
+                        else np.zeros(0, dtype=np.int64))
+        self.cache = {}
+        self.uniq_case_index = None
+        #maps the codes of each unique case (as a string) to its index
+        self.buffers = {}
+        #arrays with spare capacity backing events, offsets and counts
+
+    def number_of_uniq_cases(self):
+        """Returns the number of unique cases of the log."""
+        return len(self.counts)
+
+    def number_of_cases(self):
+        """Returns the number of cases of the log."""
+        return int(self.counts.sum())
+
+    def case_lengths(self):
+        """Returns an array with the length of each unique case."""
+        return np.diff(self.offsets)
+
+    def uniq_case_codes(self, i):
+        """Returns the array of activity codes of the [i]-th unique case."""
+        return self.events[self.offsets[i]:self.offsets[i+1]]
+
+    def uniq_case(self, i):
+        """Returns the [i]-th unique case as a tuple of activity names."""
+        acts = self.activities
+        return tuple([acts[c] for c in self.uniq_case_codes(i)])
+
+    def iter_uniq_cases(self):
+        """Iterates over the pairs (unique case, occurrences) of the log,
+        following the order of the arrays."""
+        acts = self.activities
+        events = self.events.tolist()
+        offsets = self.offsets.tolist()
+        for i, occ in enumerate(self.counts.tolist()):
+            yield (tuple([acts[c] for c in events[offsets[i]:offsets[i+1]]]),
+                    occ)
+
+    def get_cases(self):
+        """Returns the list of cases of the log, decoding and replicating each
+        unique case its occurrence times. The list is not stored."""
+        cases = []
+        for ucase, occ in self.iter_uniq_cases():
+            cases += [ucase]*occ
+        return cases
+
+    def rehydrate(self):
+        """Returns the list of cases of the log (see get_cases)."""
+        return self.get_cases()
+
+    def iter_weighted(self):
+        """Iterates over the pairs (unique case, occurrences) of the log (see
+        Log.iter_weighted and iter_uniq_cases)."""
+        return self.iter_uniq_cases()
+
+    def only_uniq_cases(self):
+        """Returns True: encoded logs only store unique cases."""
+        return True
+
+    def get_weighted_variants(self):
+        """Returns the list of pairs (unique case, occurrences) of the log, 
+        following the order of the arrays."""
+        return list(self.iter_uniq_cases())
+
+    def get_uniq_cases(self):
+        """Returns a dictionary mapping each unique case of the log to its
+        number of occurrences. The dictionary is decoded from the arrays at
+        each call and is not stored."""
+        uniq_cases = defaultdict(int)
+        for ucase, occ in self.iter_uniq_cases():
+            uniq_cases[ucase] += occ
+        return uniq_cases
+
+    def get_alphabet(self):
+        """Returns the alphabet of the log (the activities that actually
+        appear in some case)."""
+        if not self.alphabet:
+            self.alphabet = set(self.activities[c]
+                                for c in np.unique(self.events))
+        return self.alphabet
+
+    def get_encoded_log(self):
+        """Returns the log itself, since it is already encoded."""
+        return self
+
+    def mark_as_modified(self, modified=True):
+        """Marks the log as modified (see Log.mark_as_modified). Modifying the
+        log also clears all the cached derived information."""
+        if modified:
+            self.alphabet = set()
+            self.cache = {}
+            self.uniq_case_index = None
+            self.buffers = {}
+        Log.mark_as_modified(self, modified)
+
+    def extend(self, cases):
+        """Adds the iterable of [cases] to the log (see 
+        extend_uniq_cases)."""
+        new_uniq_cases = defaultdict(int)
+        for case in cases:
+            new_uniq_cases[tuple(case)] += 1
+        self.extend_uniq_cases(new_uniq_cases)
+
+    def _grow(self, name, extra):
+        """Returns a writable buffer for the array [name] with room for 
+        [extra] more elements, doubling its capacity when needed (so that
+        appending is amortized constant time)."""
+        current = getattr(self, name)
+        buf = self.buffers.get(name)
+        if buf is None or len(buf) < len(current)+extra:
+            buf = np.empty(max(2*len(current), len(current)+extra, 16), 
+                            dtype=current.dtype)
+            buf[:len(current)] = current
+            self.buffers[name] = buf
+        return buf
+
+    def extend_uniq_cases(self, uniq_cases):
+        """Adds the unique cases in the dictionary [uniq_cases] (that maps 
+        each unique case to its occurrences) to the log. The occurrences of
+        known unique cases are increased, and new ones are appended to the 
+        arrays, in time proportional to the new data (amortized)."""
+        if self.uniq_case_index is None:
+            events = self.events
+            offsets = self.offsets
+            self.uniq_case_index = dict(
+                (events[offsets[i]:offsets[i+1]].tostring(), i) 
+                for i in xrange(len(self.counts)))
+        index = self.uniq_case_index
+        buffers = self.buffers
+        n_cases = len(self.counts)
+        n_events = len(self.events)
+        new_codes = []
+        new_counts = []
+        increments = []
+        for case, occ in uniq_cases.iteritems():
+            codes = np.array([self._intern(act) for act in case], 
+                            dtype=np.int32)
+            key = codes.tostring()
+            if key in index:
+                increments.append((index[key], occ))
+            else:
+                index[key] = n_cases+len(new_codes)
+                new_codes.append(codes)
+                new_counts.append(occ)
+        extra_events = sum(len(codes) for codes in new_codes)
+        events = self._grow('events', extra_events)
+        offsets = self._grow('offsets', len(new_codes))
+        counts = self._grow('counts', len(new_codes))
+        position = n_events
+        for i, codes in enumerate(new_codes):
+            events[position:position+len(codes)] = codes
+            position += len(codes)
+            offsets[n_cases+i+1] = position
+            counts[n_cases+i] = new_counts[i]
+        for i, occ in increments:
+            counts[i] += occ
+        self.events = events[:position]
+        self.offsets = offsets[:n_cases+len(new_codes)+1]
+        self.counts = counts[:n_cases+len(new_codes)]
+        alphabet = self.alphabet
+        self.mark_as_modified()
+        if alphabet:
+            for case in uniq_cases:
+                alphabet.update(case)
+            self.alphabet = alphabet
+        self.uniq_case_index = index
+        self.buffers = buffers
+
+    def _intern(self, activity):
+        """Returns the code of [activity], adding it to the vocabulary if
+        needed."""
+        if activity not in self.activity_ids:
+            self.activity_ids[activity] = len(self.activities)
+            self.activities.append(activity)
+        return self.activity_ids[activity]
+
+    def _insert_activity(self, activity, at_start):
+        """Adds [activity] at the beginning (or the end) of every case."""
+        code = self._intern(activity)
+        lengths = np.diff(self.offsets)
+        offsets = np.zeros_like(self.offsets)
+        np.cumsum(lengths+1, out=offsets[1:])
+        events = np.empty(len(self.events)+len(lengths), dtype=np.int32)
+        new_pos = offsets[:-1] if at_start else offsets[1:]-1
+        mask = np.ones(len(events), dtype=bool)
+        mask[new_pos] = False
+        events[new_pos] = code
+        events[mask] = self.events
+        self.events = events
+        self.offsets = offsets
+        self.mark_as_modified()
+
+    def add_dummy_start_activity(self, candidates=['S','start','begin']):
+        """Adds a dummy start activity to all cases (see
+        Log.add_dummy_start_activity)."""
+        possible_candidates = [cand for cand in candidates
+                                if cand not in self.get_alphabet()]
+        if not possible_candidates:
+            print ('All candidates for initial activity where already used, '
+                'please enlarge candidate list and rerun.')
+            return None
+        start_act = possible_candidates[0]
+        self._insert_activity(start_act, at_start=True)
+        return start_act
+
+    def add_dummy_end_activity(self, candidates=['E','final','end']):
+        """Adds a dummy end activity to all cases (see
+        Log.add_dummy_end_activity)."""
+        possible_candidates = [cand for cand in candidates
+                                if cand not in self.get_alphabet()]
+        if not possible_candidates:
+            print ('All candidates for initial activity were already used, '
+                'please enlarge candidate list and rerun.')
+            return None
+        end_act = possible_candidates[0]
+        self._insert_activity(end_act, at_start=False)
+        return end_act
+
+    def select(self, selected):
+        """Returns a new EncodedLog (with the same activity codes) with the 
+        unique cases whose indexes are in the array [selected]."""
+        selected = np.asarray(selected, dtype=np.int64)
+        events, offsets = select_uniq_cases(self.events, self.offsets, 
+                                            selected)
+        return EncodedLog(activities=self.activities, events=events,
+                        offsets=offsets, counts=self.counts[selected])
+
+    def merge_duplicated_uniq_cases(self):
+        """Merges the unique cases that have the same sequence of activity
+        codes (e.g. after a reencoding that is not injective), adding their
+        occurrences."""
+        rows = {}
+        keep = []
+        counts = self.counts.copy()
+        events = self.events
+        offsets = self.offsets
+        for i in xrange(len(counts)):
+            key = events[offsets[i]:offsets[i+1]].tostring()
+            if key in rows:
+                counts[rows[key]] += counts[i]
+            else:
+                rows[key] = i
+                keep.append(i)
+        if len(keep) == len(counts):
+            return
+        keep = np.array(keep, dtype=np.int64)
+        self.counts = counts[keep]
+        self.events, self.offsets = select_uniq_cases(events, offsets, keep)
+        self.mark_as_modified()
+
+    def reencode(self, reencoder, write_dict=False, dict_file=None):
+        """Reencodes the log activities using the given reencoder (see
+        Log.reencode). Only the vocabulary has to be reencoded, unless two
+        activities receive the same name."""
+        names = [reencoder.reencode(act) for act in self.activities]
+        vocabulary = _Vocabulary()
+        recode = np.array([vocabulary[name] for name in names], dtype=np.int32)
+        activities = [None]*len(vocabulary)
+        for act, code in vocabulary.iteritems():
+            activities[code] = act
+        self.activities = activities
+        self.activity_ids = dict(vocabulary)
+        self.mark_as_modified()
+        if len(activities) < len(names):
+            self.events = recode[self.events]
+            self.merge_duplicated_uniq_cases()
+        if write_dict:
+            self._save_reencoder(reencoder, dict_file)
+
+def select_uniq_cases(events, offsets, selected):
+    """Returns the (events, offsets) arrays obtained by keeping only the
+    unique cases whose indexes are in the array [selected]."""
+    lengths = offsets[selected+1]-offsets[selected]
+    new_offsets = np.zeros(len(selected)+1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    #position of each new event in the old events array
+    starts = np.repeat(offsets[selected]-new_offsets[:-1], lengths)
+    positions = starts + np.arange(new_offsets[-1])
+    return events[positions], new_offsets
+
+def parikh_matrix(elog):
+    """Returns the (unique cases x activity codes) scipy CSR matrix with the
+    number of occurrences of each activity in each unique case of the 
+    EncodedLog [elog]."""
+    from scipy.sparse import csr_matrix
+    n = elog.number_of_uniq_cases()
+    rows = np.repeat(np.arange(n, dtype=np.int64), elog.case_lengths())
+    matrix = csr_matrix((np.ones(len(rows), dtype=np.int64), 
+                        (rows, elog.events)), 
+                        shape=(n, len(elog.activities)))
+    matrix.sum_duplicates()
+    return matrix
+
+def ngram_matrix(elog, n=2):
+    """Returns the (unique cases x n-grams) scipy CSR matrix with the number
+    of occurrences of each sequence of [n] consecutive activities in each 
+    unique case of the EncodedLog [elog]. Only the n-grams that appear in 
+    some case have a column, in the order of their activity codes."""
+    from scipy.sparse import csr_matrix
+    cases = elog.number_of_uniq_cases()
+    rows = np.repeat(np.arange(cases, dtype=np.int64), elog.case_lengths())
+    positions = np.arange(len(rows), dtype=np.int64)
+    valid = positions + n <= elog.offsets[rows+1]
+    positions = positions[valid]
+    keys = np.zeros(len(positions), dtype=np.int64)
+    for i in xrange(n):
+        keys = keys*len(elog.activities) + elog.events[positions+i]
+    ngrams, columns = np.unique(keys, return_inverse=True)
+    matrix = csr_matrix((np.ones(len(keys), dtype=np.int64), 
+                        (rows[valid], columns)), shape=(cases, len(ngrams)))
+    matrix.sum_duplicates()
+    return matrix
+
+pmbin_magic = 'PMBIN02\n'
+pmbin_alignment = 64
+pmbin_arrays = (('events', np.int32), ('offsets', np.int64), 
+                ('counts', np.int64))
+
+def _aligned(position):
+    return -(-position // pmbin_alignment) * pmbin_alignment
+
+def pmbin_source_key(filename, **params):
+    """Returns the key identifying the current contents of the source file 
+    [filename] (path, size and modification time) together with the loading
+    parameters [params]. Stored in 'pmbin' sidecar caches to decide whether
+    they can be reused. The key is returned as it is read back from the JSON
+    header, so that it can be compared with the stored one."""
+    st = os.stat(filename)
+    return json.loads(json.dumps((os.path.abspath(filename), st.st_size, 
+                                st.st_mtime, sorted(params.items())),
+                                default=repr))
+
+def _pmbin_header(elog, layout, source):
+    """Returns the JSON header of a 'pmbin' file. Byte string activities are
+    stored as latin-1 text (so that any byte survives), and the positions of
+    the unicode activities are listed to restore their type."""
+    return json.dumps({'activities': [act if isinstance(act, unicode)
+                                    else str(act).decode('latin-1')
+                                    for act in elog.activities],
+                    'unicode': [i for i, act in enumerate(elog.activities)
+                                if isinstance(act, unicode)],
+                    'layout': layout, 'source': source, 
+                    'format': elog.last_write_format})
+
+def save_pmbin(elog, filename, source=None):
+    """Writes the EncodedLog [elog] in the 'pmbin' binary format to 
+    [filename] (a file or a filename).
+    
+    The file contains a small JSON header (activity names and array layout)
+    followed by the raw events, offsets and counts arrays, aligned so that 
+    they can be memory-mapped by 'log_from_pmbin'.
+    [source] key of the file the log was loaded from (see pmbin_source_key).
+    A [filename] is written to a temporary file of the same directory that
+    then replaces it, so processes that have the old file memory-mapped keep
+    their (unlinked) copy and no reader sees a partially written file.
+    """
+    arrays = []
+    layout = {}
+    position = 0
+    for name, dtype in pmbin_arrays:
+        a = np.ascontiguousarray(getattr(elog, name), dtype=dtype)
+        position = _aligned(position)
+        layout[name] = (position, len(a))
+        arrays.append((position, a))
+        position += a.nbytes
+    header = _pmbin_header(elog, layout, source)
+    if not isinstance(filename, basestring):
+        _write_pmbin(filename, header, arrays)
+        return
+    directory, base = os.path.split(os.path.abspath(filename))
+    fd, temp_name = tempfile.mkstemp(prefix=base+'.', suffix='.tmp', 
+                                    dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            _write_pmbin(file, header, arrays)
+        os.rename(temp_name, filename)
+    except:
+        os.remove(temp_name)
+        raise
+
+def _write_pmbin(file, header, arrays):
+    """Writes the [header] and the list of (position, array) [arrays] of a
+    'pmbin' file to [file]."""
+    file.write(pmbin_magic)
+    file.write(struct.pack('<Q', len(header)))
+    file.write(header)
+    data_start = _aligned(len(pmbin_magic)+8+len(header))
+    written = len(pmbin_magic)+8+len(header)
+    for position, a in arrays:
+        file.write('\0'*(data_start+position-written))
+        file.write(a.tostring())
+        written = data_start+position+a.nbytes
+
+def read_pmbin_header(filename):
+    """Returns the header of the 'pmbin' file [filename] and the position 
+    where its arrays start. Raises ValueError if it is not a 'pmbin' file or
+    it is truncated."""
+    with open(filename, 'rb') as f:
+        if f.read(len(pmbin_magic)) != pmbin_magic:
+            raise ValueError, "'{0}' is not a pmbin log".format(filename)
+        length = f.read(8)
+        if len(length) < 8:
+            raise ValueError, "'{0}' is truncated".format(filename)
+        header_length = struct.unpack('<Q', length)[0]
+        header = json.loads(f.read(header_length))
+    data_start = _aligned(len(pmbin_magic)+8+header_length)
+    size = os.path.getsize(filename)
+    for name, dtype in pmbin_arrays:
+        position, length = header['layout'][name]
+        if data_start+position+length*np.dtype(dtype).itemsize > size:
+            raise ValueError, "'{0}' is truncated".format(filename)
+    activities = [act.encode('latin-1') for act in header['activities']]
+    for i in header['unicode']:
+        activities[i] = header['activities'][i]
+    header['activities'] = activities
+    if header['format'] is not None:
+        header['format'] = header['format'].encode('latin-1')
+    return header, data_start
+
+def log_from_pmbin(filename, mmap=True):
+    """Loads the EncodedLog stored in the 'pmbin' file [filename].
+    
+    If [mmap] is True, the arrays are memory-mapped (read only) instead of 
+    read, so that loading is almost instantaneous and several processes 
+    loading the same file share its pages."""
+    header, data_start = read_pmbin_header(filename)
+    arrays = {}
+    for name, dtype in pmbin_arrays:
+        position, length = header['layout'][name]
+        if mmap and length > 0:
+            arrays[name] = np.memmap(filename, dtype=dtype, mode='r', 
+                                    offset=data_start+position, shape=(length,))
+        else:
+            with open(filename, 'rb') as f:
+                f.seek(data_start+position)
+                arrays[name] = np.fromfile(f, dtype=dtype, count=length)
+    return EncodedLog(filename=filename, format=header['format'],
+                        activities=header['activities'], **arrays)
+
+def cached_log_from_pmbin(source_filename, **params):
+    """Returns the log stored in the 'pmbin' sidecar cache of 
+    [source_filename] (the same filename with the '.pmbin' extension 
+    appended), or None if there is no cache or it is outdated (i.e. the 
+    source file or the loading parameters [params] have changed)."""
+    sidecar = source_filename+'.pmbin'
+    if not os.path.exists(sidecar):
+        return None
+    try:
+        header, data_start = read_pmbin_header(sidecar)
+        if header['source'] != pmbin_source_key(source_filename, **params):
+            return None
+        log = log_from_pmbin(sidecar)
+    except (ValueError, IOError, KeyError, TypeError, AttributeError):
+        #not a valid sidecar (e.g. partially written by an old version)
+        return None
+    log.filename = source_filename
+    return log
+
+def save_pmbin_sidecar(log, source_filename, **params):
+    """Writes the sidecar cache of [source_filename] (see 
+    cached_log_from_pmbin) containing [log]. Failing to write the cache 
+    (e.g. in a read-only directory) is not an error."""
+    sidecar = source_filename+'.pmbin'
+    try:
+        save_pmbin(log.get_encoded_log(), sidecar, 
+                    source=pmbin_source_key(source_filename, **params))
+    except (IOError, OSError) as e:
+        print "Warning! Could not write cache '{0}': {1}".format(sidecar, e)
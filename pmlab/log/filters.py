@@ -1,6 +1,6 @@
 import copy
 from collections import defaultdict
-from .. log import Log
+from .. log import Log, EnhancedLog
 
 
 class RemoveImmediateRepetitionsFilter:
@@ -122,17 +122,69 @@ class FrequencyFilter:
         if tuple(case) in self.kept_cases:
             return case
     
+class FilterPipeline:
+    """Applies a sequence of filters to the unique cases of a log, keeping 
+    the occurrences of each unique case. All the filters are applied to each
+    unique case in a single pass, so the cost depends on the number of unique
+    cases, not on the number of cases. A pipeline is itself a filter."""
+    def __init__(self, *filters):
+        """Constructs the pipeline that applies [filters] in order."""
+        self.filters = filters
+
+    def filter(self, case):
+        """Applies all the filters to [case]. Returns None if some filter 
+        removes it."""
+        for f in self.filters:
+            case = f.filter(case)
+            if not case:
+                return None
+        return case
+
+    def filter_uniq_cases(self, uniq_cases):
+        """Returns the dictionary with the occurrences of the filtered 
+        [uniq_cases]. The unique cases not changed by the filters are shared
+        with [uniq_cases], the ones that become equal are merged."""
+        return self.filter_weighted(uniq_cases.iteritems())
+
+    def filter_weighted(self, weighted_cases):
+        """Returns the dictionary with the occurrences of the filtered cases
+        of the iterable of pairs (case, occurrences) [weighted_cases] (see 
+        Log.iter_weighted)."""
+        new_uniq_cases = defaultdict(int)
+        for case, occ in weighted_cases:
+            new_case = self.filter(case)
+            if new_case:
+                if not isinstance(new_case, tuple):
+                    new_case = tuple(new_case)
+                new_uniq_cases[new_case] += occ
+        return new_uniq_cases
+
+    def filter_log(self, log):
+        """Returns a filtered version of [log], stored as unique cases.
+        
+        Example:
+            pipeline = pm.log.filters.FilterPipeline(
+                pm.log.filters.CaseLengthFilter(above=3),
+                pm.log.filters.RemoveImmediateRepetitionsFilter())
+            fl = pipeline.filter_log(l)
+        """
+        return Log(uniq_cases=self.filter_weighted(
+                                            log.get_weighted_variants()))
+    
 def filter_log( log, filter ):
-    """Returns a filtered version of [log].
+    """Returns a filtered version of [log]. If [log] is only stored as unique
+    cases (or is an EncodedLog), the filter is applied once per unique case
+    (see FilterPipeline).
     
     Examples:
         fl = pm.log.filters.filter_log(l, pm.log.filters.PrefixerFilter('pre') )
         or
         fl = pm.log.filters.filter_log(l, pm.log.filters.RemoveImmediateRepetitionsFilter() )
         """
-    cases = log.get_cases()
+    if not log.cases and not isinstance(log, EnhancedLog):
+        return FilterPipeline(filter).filter_log(log)
     new_cases = []
-    for case in cases:
+    for case in log.get_cases():
         new_case = filter.filter( case )
         if new_case:
             new_cases.append(new_case)
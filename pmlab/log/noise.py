@@ -1,5 +1,41 @@
 import random
-from .. log import Log
+import numpy
+from .. log import log_from_weighted
+
+def _inject_noise(words, noise, alphabet):
+    """Modifies the list of activities [words] with one error of type 
+    [noise] (see log_from_noise)."""
+    if noise == "single":
+        modification = random.randint(0,2)
+        if modification == 0: #suppression
+            words.pop( random.randint(0,len(words)-1) )
+        elif modification == 1: #swap
+            positions = range(len(words))
+            random.shuffle( positions )
+            words[positions[0]], words[positions[1]] = words[positions[1]], words[positions[0]]
+        elif modification == 2: #insertion
+            words.insert( random.randint(0, len(words)), random.choice( alphabet ) )
+    elif noise == 'maruster':
+        # Maruster's noise
+        modification = random.randint(0,3)
+        if modification < 3: #suppressions
+            if modification == 0: #suppression in first third of trace
+                interval = range(0, len(words)/3 )
+            elif modification == 1: #suppression in middle third of trace
+                interval = range(len(words)/3, 2*len(words)/3 )
+            elif modification == 2: #suppression in last third of trace
+                interval = range(2*len(words)/3, len(words) )
+            random.shuffle( interval )
+            start = min(interval[0:2])
+            end = max(interval[0:2])
+            del words[start:end+1]
+        else:
+            #swap
+            positions = range(len(words))
+            random.shuffle( positions )
+            words[positions[0]], words[positions[1]] = words[positions[1]], words[positions[0]]
+    else:
+        raise TypeError, "Unknown type of noise '{0}'".format(noise)
 
 def log_from_noise(log, noise='single', perror=0.05):
     """Generates a log from [log] by injecting errors into the cases.
@@ -13,44 +49,34 @@ def log_from_noise(log, noise='single', perror=0.05):
                         the middle part. Besides that, two random events can be 
                         swapped.
     [perror] Probability of error injection for each case.
+    
+    The cases are read with Log.iter_weighted, so a log only stored as unique
+    cases is not rehydrated: the number of modified occurrences of each 
+    unique case is drawn from a binomial distribution, and the noisy log is 
+    also stored as unique cases.
     """
     alphabet=list(log.get_alphabet())
-    cases = log.get_cases()
-    new_cases = []
-    for case in cases:
-        words = case[:] # a copy to avoid modifying the original log
-        if random.random() <= perror:
-            #modify trace    
-            if noise == "single":
-                modification = random.randint(0,2)
-                if modification == 0: #suppression
-                    words.pop( random.randint(0,len(words)-1) )
-                elif modification == 1: #swap
-                    positions = range(len(words))
-                    random.shuffle( positions )
-                    words[positions[0]], words[positions[1]] = words[positions[1]], words[positions[0]]
-                elif modification == 2: #insertion
-                    words.insert( random.randint(0, len(words)), random.choice( alphabet ) )
-            elif noise == 'maruster':
-                # Maruster's noise
-                modification = random.randint(0,3)
-                if modification < 3: #suppressions
-                    if modification == 0: #suppression in first third of trace
-                        interval = range(0, len(words)/3 )
-                    elif modification == 1: #suppression in middle third of trace
-                        interval = range(len(words)/3, 2*len(words)/3 )
-                    elif modification == 2: #suppression in last third of trace
-                        interval = range(2*len(words)/3, len(words) )
-                    random.shuffle( interval )
-                    start = min(interval[0:2])
-                    end = max(interval[0:2])
-                    del words[start:end+1]
-                else:
-                    #swap
-                    positions = range(len(words))
-                    random.shuffle( positions )
-                    words[positions[0]], words[positions[1]] = words[positions[1]], words[positions[0]]
-            else:
-                raise TypeError, "Unknown type of noise '{0}'".format(noise)
-        new_cases.append(words)
-    return Log(cases=new_cases)
+    return log_from_weighted(_noisy_cases(log, noise, perror, alphabet),
+                            log.only_uniq_cases())
+
+def _noisy_cases(log, noise, perror, alphabet):
+    """Iterates over the pairs (case, occurrences) of [log] with the errors
+    injected (see log_from_noise)."""
+    #generator of the binomial draws, seeded from random to be reproducible
+    rng = None
+    for case, occ in log.iter_weighted():
+        if occ == 1:
+            words = list(case) # a copy to avoid modifying the original log
+            if random.random() <= perror:
+                _inject_noise(words, noise, alphabet)
+            yield words, 1
+            continue
+        if rng is None:
+            rng = numpy.random.RandomState(random.getrandbits(32))
+        modified = rng.binomial(occ, perror)
+        for i in xrange(modified):
+            words = list(case)
+            _inject_noise(words, noise, alphabet)
+            yield words, 1
+        if occ > modified:
+            yield case, occ-modified
@@ -0,0 +1,121 @@
+"""Module with the prefix tree (trie) of the unique cases of a log.
+
+Most unique cases of a log share long prefixes. Algorithms that replay every
+case from the initial state of a model (transition systems, Petri nets,...)
+can use the prefix tree to replay each shared prefix only once, branching
+from the state reached at its end (see PrefixTree.walk).
+
+Example:
+>>> tree = log.get_prefix_tree()
+>>> fitting = sum(tree.ends[node] for node, state in tree.walk(s0, step)
+                if state is not None)"""
+
+class PrefixTree:
+    """Prefix tree of a set of unique cases. Node 0 is the root (the empty
+    prefix) and, for each node n:
+        parent[n]: node of the prefix without its last activity (-1 for the
+            root).
+        activity[n]: last activity of the prefix (None for the root).
+        depth[n]: length of the prefix.
+        children[n]: dictionary that maps each activity to the child node.
+        count[n]: number of cases (with repetitions) with that prefix.
+        variants[n]: number of unique cases with that prefix.
+        ends[n]: number of cases that are exactly the prefix (0 if no unique
+            case ends at n)."""
+    def __init__(self, uniq_cases=None):
+        """Builds the tree of the dictionary [uniq_cases] (that maps each
+        unique case to its occurrences). If None, the tree is empty."""
+        self.parent = [-1]
+        self.activity = [None]
+        self.depth = [0]
+        self.children = [{}]
+        self.count = [0]
+        self.variants = [0]
+        self.ends = [0]
+        if uniq_cases:
+            for case, occ in uniq_cases.iteritems():
+                self.add(case, occ)
+
+    def __len__(self):
+        """Returns the number of nodes of the tree."""
+        return len(self.parent)
+
+    def add(self, case, occ=1):
+        """Adds [occ] occurrences of [case] to the tree. Returns the node of
+        the case."""
+        node = 0
+        path = [0]
+        for activity in case:
+            child = self.children[node].get(activity)
+            if child is None:
+                child = len(self.parent)
+                self.children[node][activity] = child
+                self.parent.append(node)
+                self.activity.append(activity)
+                self.depth.append(self.depth[node]+1)
+                self.children.append({})
+                self.count.append(0)
+                self.variants.append(0)
+                self.ends.append(0)
+            node = child
+            path.append(node)
+        new_variant = self.ends[node] == 0
+        for n in path:
+            self.count[n] += occ
+            if new_variant:
+                self.variants[n] += 1
+        self.ends[node] += occ
+        return node
+
+    def node(self, prefix):
+        """Returns the node of [prefix], or None if no case has it."""
+        node = 0
+        for activity in prefix:
+            node = self.children[node].get(activity)
+            if node is None:
+                return None
+        return node
+
+    def case(self, node):
+        """Returns the prefix (tuple of activities) of [node]."""
+        case = []
+        while node > 0:
+            case.append(self.activity[node])
+            node = self.parent[node]
+        case.reverse()
+        return tuple(case)
+
+    def nodes(self, node=0):
+        """Yields the nodes of the subtree of [node] in depth-first order."""
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(self.children[node].itervalues())
+
+    def case_ends(self, node=0):
+        """Yields the nodes of the subtree of [node] in which some unique case
+        ends."""
+        for n in self.nodes(node):
+            if self.ends[n]:
+                yield n
+
+    def walk(self, initial_state, step):
+        """Replays the tree depth-first, computing the state of each prefix
+        only once.
+
+        [step](state, activity) must return the state reached executing
+        [activity] from [state], or None if it cannot be executed. Yields the
+        pair (node, state) of the root (with [initial_state]) and of every
+        node whose parent was reached. Nodes that cannot be reached are
+        yielded with state None, and their subtrees are skipped. A parent is
+        always yielded before its children."""
+        yield 0, initial_state
+        stack = [(0, initial_state)]
+        while stack:
+            node, state = stack.pop()
+            for activity, child in self.children[node].iteritems():
+                child_state = step(state, activity)
+                yield child, child_state
+                if child_state is not None:
+                    stack.append((child, child_state))
@@ -1,7 +1,8 @@
 #from operator import itemgetter
 #import pickle
-import copy
-from .. log import Log
+import numpy
+from .. log import Log, bitsets
+from .. log.encoded import EncodedLog
 
 def most_frequent(act_dict, n, extend_same_freq=False):
     """Returns the [n] most frequent activities in the given activity dictionary
@@ -22,6 +23,82 @@ def above_threshold(act_dict, threshold):
     return dict([(act,occ) for act, occ in act_dict.iteritems() 
                 if occ >= threshold])
 
+projection_actions = ('keep','suppress', 'keep_if_any','suppress_if_any',
+                    'keep_if_all','suppress_if_all')
+
+class CaseSpec:
+    """Projection and filter of the cases of a log, that can be applied while
+    the log is loaded (see the [spec] parameter of log_from_file, 
+    log_from_xes and log_from_csv), so that the events and cases discarded 
+    are never stored.
+    
+    Example:
+    >>> spec = pmlab.log.projectors.CaseSpec(['A','B','C'], 'keep', 
+                                            min_length=2)
+    >>> log = pmlab.log.log_from_file('huge.xes', spec=spec)"""
+    def __init__(self, activities=None, action='keep', min_length=0, 
+                max_length=None):
+        """[activities] and [action] define the projection (see project_log),
+        no projection is done if [activities] is None. Then only the cases 
+        whose (projected) length is in the interval [min_length,max_length]
+        are kept. If [max_length] is None, it is considered infinity."""
+        if action not in projection_actions:
+            raise TypeError, ("action can only be 'keep', 'suppress', 'keep_if_any'"
+                            "'suppress_if_any', 'keep_if_all' or 'suppress_if_all'")
+        self.activities = (frozenset(activities) if activities is not None 
+                            else None)
+        self.action = action
+        self.min_length = min_length
+        self.max_length = max_length
+
+    def keeps_activity(self, activity):
+        """Returns False if the events of [activity] are removed by the 
+        projection, so that loaders can discard them as soon as they are 
+        read."""
+        if self.activities is None:
+            return True
+        if self.action == 'keep':
+            return activity in self.activities
+        elif self.action == 'suppress':
+            return activity not in self.activities
+        return True
+
+    def select(self, names):
+        """Returns the list of positions of the events kept from the case 
+        with the list of activity [names], or None if the case is 
+        discarded."""
+        activities = self.activities
+        action = self.action
+        if activities is None:
+            positions = range(len(names))
+        elif action in ('keep', 'suppress'):
+            keep = action == 'keep'
+            positions = [i for i, act in enumerate(names) 
+                        if (act in activities) == keep]
+            if not positions:
+                return None
+        else:
+            if action in ('keep_if_any', 'suppress_if_any'):
+                found = any(act in activities for act in names)
+            else:
+                found = all(act in activities for act in names)
+            if found != action.startswith('keep'):
+                return None
+            positions = range(len(names))
+        if len(positions) < self.min_length:
+            return None
+        if self.max_length is not None and len(positions) > self.max_length:
+            return None
+        return positions
+
+    def project(self, case):
+        """Returns the new list with the activities kept from [case], or None
+        if the case is discarded."""
+        positions = self.select(case)
+        if positions is None:
+            return None
+        return [case[i] for i in positions]
+
 def project_log( log, activities, action='keep', whole_case=False ):
     """Returns a projected version of [log].
     
@@ -38,35 +115,57 @@ def project_log( log, activities, action='keep', whole_case=False ):
             will be kept.
         'suppress_if_all': only cases containing all activities in the 
             list will be removed.
+    
+    The projection works on the arrays of the encoded log (see 
+    Log.get_encoded_log): the case selections are tests on the activity 
+    bitsets of the unique cases (see pmlab.log.bitsets), and 'keep' and 
+    'suppress' gather the kept events. Each case of [log] is then replaced
+    by the projection of its unique case, so the projected log keeps the
+    order of the cases. A log only stored as unique cases (see 
+    Log.only_uniq_cases) is projected into an EncodedLog instead, without 
+    rehydrating it.
     """
-    if action not in ('keep','suppress', 'keep_if_any','suppress_if_any',
-                    'keep_if_all','suppress_if_all' ):
+    if action not in projection_actions:
         raise TypeError, ("action can only be 'keep', 'suppress', 'keep_if_any'"
                         "'suppress_if_any', 'keep_if_all' or 'suppress_if_all'")
-    cases = log.get_cases()
+    elog = log.get_encoded_log()
+    events, counts = elog.events, elog.counts
+    if action in ('keep', 'suppress'):
+        kept_codes = bitsets.activity_codes(elog, activities)
+        if action == 'suppress':
+            kept_codes = ~kept_codes
+        kept = kept_codes[events]
+        cases = numpy.repeat(numpy.arange(len(counts)), elog.case_lengths())
+        lengths = numpy.bincount(cases[kept], minlength=len(counts))
+        selected = numpy.flatnonzero(lengths)
+        new_offsets = numpy.zeros(len(selected)+1, dtype=numpy.int64)
+        numpy.cumsum(lengths[selected], out=new_offsets[1:])
+        proj_log = EncodedLog(activities=elog.activities, events=events[kept],
+                            offsets=new_offsets, counts=counts[selected])
+    else:
+        signatures = log.get_activity_signatures()
+        mask = bitsets.activity_mask(elog, activities)
+        if action.endswith('_any'):
+            found = bitsets.contains_any(signatures, mask)
+        else:
+            found = bitsets.contains_only(signatures, mask)
+        if action.startswith('suppress'):
+            found = ~found
+        selected = numpy.flatnonzero(found)
+        proj_log = elog.select(selected)
+    if log.only_uniq_cases():
+        #cases that only differ in suppressed activities become equal
+        proj_log.merge_duplicated_uniq_cases()
+        return proj_log
+    #projection of each unique case, None if it is discarded
+    projected = [None]*len(counts)
+    for i, (case, occ) in zip(selected.tolist(), proj_log.iter_uniq_cases()):
+        projected[i] = case
+    variants = dict((case, i) for i, (case, occ) 
+                    in enumerate(elog.iter_uniq_cases()))
     new_cases = []
-    for case in cases:
-        if action=='keep':
-            new_case = [act for act in case if act in activities]
-            if new_case:
-                new_cases.append(new_case)
-        elif action=='suppress':
-            new_case = [act for act in case if act not in activities]
-            if new_case:
-                new_cases.append(new_case)
-        elif action=='keep_if_any':
-            if any([act in activities for act in case]):
-                new_cases.append(copy.copy(case))
-        elif action=='suppress_if_any':
-            if all([act not in activities for act in case]):
-                new_cases.append(copy.copy(case))
-        elif action=='keep_if_all':
-            all_activities = all([act in activities for act in case])
-            if all_activities:
-                new_cases.append(copy.copy(case))
-        elif action=='suppress_if_all':
-            all_activities = all([act in activities for act in case])
-            if not all_activities:
-                new_cases.append(copy.copy(case))
-    proj_log = Log(cases=new_cases)
-    return proj_log
+    for case, occ in log.iter_weighted():
+        new_case = projected[variants[tuple(case)]]
+        if new_case is not None:
+            new_cases.append(list(new_case))
+    return Log(cases=new_cases)
@@ -0,0 +1,116 @@
+"""Ordering relations between the activities of a log.
+
+The relations used by discovery algorithms (directly follows, length-two
+loops, eventually follows, start and end activities) are computed on the
+arrays of the encoded log (see pmlab.log.encoded) as weighted (activities x
+activities) matrices indexed by activity code. Logs cache them until they
+are modified.
+
+Example:
+>>> rel = log.get_relations()
+>>> a, b = rel.code('A'), rel.code('B')
+>>> rel.directly_follows[a,b], rel.eventually_follows[a,b]"""
+import numpy
+
+class LogRelations:
+    """Relations of an encoded log. The matrices are int64 arrays indexed by
+    the codes of the [activities] list, and are weighted by the occurrences
+    of the cases:
+        directly_follows[a,b]: number of times that b directly follows a.
+        two_loops[a,b]: number of times that the sequence a b a appears.
+        eventually_follows[a,b]: number of pairs of events of the same case
+            such that a happens before b.
+        start_counts[a], end_counts[a]: number of cases that start (end)
+            with a.
+        activity_counts[a]: number of events of a.
+        present: boolean array that tells which activities appear in some
+            case."""
+    def __init__(self, elog, statistics):
+        """Computes the relations of the EncodedLog [elog], taking the
+        directly follows and start/end counts from its LogStatistics
+        [statistics] (see pmlab.log.statistics)."""
+        self.activities = list(elog.activities)
+        self.activity_ids = dict((act, code)
+                                for code, act in enumerate(self.activities))
+        n_acts = len(self.activities)
+        self.directly_follows = statistics.directly_follows_matrix()
+        self.start_counts = statistics.start_counts
+        self.end_counts = statistics.end_counts
+        self.activity_counts = statistics.activity_counts
+        self.present = self.activity_counts > 0
+        self.followed = None
+        #cache of followed_events
+        events = elog.events.astype(numpy.int64)
+        lengths = elog.case_lengths()
+        cases = numpy.repeat(numpy.arange(len(lengths)), lengths)
+        weights = elog.counts.astype(numpy.int64)[cases]
+        #position of the last event of the case of each event
+        case_ends = numpy.repeat(elog.offsets[1:], lengths)-1
+        loops = numpy.flatnonzero(numpy.arange(len(events))+2 <= case_ends)
+        loops = loops[events[loops] == events[loops+2]]
+        self.two_loops = numpy.zeros((n_acts, n_acts), dtype=numpy.int64)
+        numpy.add.at(self.two_loops, (events[loops], events[loops+1]),
+                    weights[loops])
+        self._arrays = (events, weights, 
+                        numpy.repeat(elog.offsets[:-1], lengths), case_ends)
+        #events, their weights and the bounds of their cases
+        self.eventually_follows = self._eventually_follows()
+
+    def _activity_positions(self):
+        """Iterates over the pairs (activity code, sorted array with the 
+        positions of its events) of the activities that appear in the 
+        log."""
+        events = self._arrays[0]
+        n_acts = len(self.activities)
+        order = numpy.argsort(events, kind='mergesort')
+        bounds = numpy.zeros(n_acts+1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(events, minlength=n_acts), out=bounds[1:])
+        for act in numpy.flatnonzero(self.present):
+            yield act, order[bounds[act]:bounds[act+1]]
+
+    def _eventually_follows(self):
+        """Returns the eventually follows matrix. For each activity a, the
+        number of events of a before each event (in its case) is obtained
+        with two binary searches over the sorted positions of a, and row a
+        is the weighted sum of these numbers by activity."""
+        events, weights, case_starts, case_ends = self._arrays
+        n_acts = len(self.activities)
+        matrix = numpy.zeros((n_acts, n_acts), dtype=numpy.int64)
+        positions = numpy.arange(len(events))
+        for act, act_positions in self._activity_positions():
+            before = (numpy.searchsorted(act_positions, positions) -
+                    numpy.searchsorted(act_positions, case_starts))
+            matrix[act] = numpy.bincount(events, weights=weights*before,
+                                        minlength=n_acts)
+        return matrix
+
+    def followed_events(self):
+        """Returns the int64 matrix whose entry [a,b] is the number of events
+        of a that are eventually followed by some b in their case (used by
+        long distance dependency measures). It is computed the first time it
+        is requested."""
+        if self.followed is None:
+            events, weights, case_starts, case_ends = self._arrays
+            n_acts = len(self.activities)
+            self.followed = numpy.zeros((n_acts, n_acts), dtype=numpy.int64)
+            positions = numpy.arange(len(events))
+            for act, act_positions in self._activity_positions():
+                after = (numpy.searchsorted(act_positions, case_ends, 'right')-
+                        numpy.searchsorted(act_positions, positions, 'right'))
+                self.followed[:, act] = numpy.bincount(events, 
+                                        weights=weights*(after > 0),
+                                        minlength=n_acts)
+        return self.followed
+
+    def code(self, activity):
+        """Returns the code of [activity] (the index of its row and
+        column)."""
+        return self.activity_ids[activity]
+
+    def named(self, matrix):
+        """Returns a dictionary mapping each pair of activities (a,b) with a
+        non null entry in [matrix] to that entry."""
+        acts = self.activities
+        sources, targets = numpy.nonzero(matrix)
+        return dict(((acts[a], acts[b]), matrix[a, b].item())
+                    for a, b in zip(sources, targets))
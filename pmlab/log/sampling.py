@@ -0,0 +1,180 @@
+"""Sampling of the cases of a log while they are streamed.
+
+The samplers receive the cases one by one (with their occurrences), keep only
+the sampled ones and return them as a Log whose unique cases are counted
+with the number of times they were sampled. The cases can come from a file
+that is never loaded whole (see pmlab.log.iter_cases) or from a log (see
+Log.iter_weighted). Instead of drawing a random number per case, the
+samplers draw the (geometric) number of cases to skip until the next
+sampled one, so repeated cases are skipped in bulk.
+
+Example:
+>>> sampler = pmlab.log.sampling.BernoulliSampler(0.01, seed=7)
+>>> log = pmlab.log.sampling.sample_file('huge.xes.gz', sampler)"""
+from collections import defaultdict
+import math
+import random
+from .. log import Log, iter_cases
+
+class BernoulliSampler:
+    """Keeps each case independently with a given probability, so the size
+    of the sample is not fixed."""
+    def __init__(self, probability, seed=None):
+        """[probability] of keeping each case (between 0 and 1). [seed] of
+        the random generator (see random.Random)."""
+        if not 0 <= probability <= 1:
+            raise ValueError, 'The probability must be between 0 and 1'
+        self.probability = probability
+        self.random = random.Random(seed)
+        self.sample = defaultdict(int)
+        #occurrences of each sampled case
+        self.skip = self._draw_skip()
+        #number of cases to skip before the next sampled one
+
+    def _draw_skip(self):
+        """Returns the number of cases rejected before the next success."""
+        if self.probability == 1:
+            return 0
+        if self.probability == 0:
+            return float('inf')
+        u = 1.0 - self.random.random()
+        return int(math.log(u) / math.log1p(-self.probability))
+
+    def add(self, case, occ=1):
+        """Offers [occ] occurrences of [case] to the sampler."""
+        while self.skip < occ:
+            occ -= self.skip + 1
+            self.sample[tuple(case)] += 1
+            self.skip = self._draw_skip()
+        self.skip -= occ
+
+    def get_log(self):
+        """Returns the Log of the sampled cases."""
+        return Log(uniq_cases=defaultdict(int, self.sample))
+
+class ReservoirSampler:
+    """Uniform sample of a fixed number of cases (or all of them if there
+    are less), using the reservoir algorithm L of Li ("Reservoir-sampling
+    algorithms of time complexity O(n(1+log(N/n)))"). Only the number of
+    cases to skip is drawn after the reservoir is full."""
+    def __init__(self, size, seed=None, rand=None):
+        """[size] number of cases of the sample. [seed] of the random
+        generator, or the random.Random object [rand] to use."""
+        if size < 0:
+            raise ValueError, 'The size of the sample cannot be negative'
+        self.size = size
+        self.random = rand or random.Random(seed)
+        self.reservoir = []
+        #sampled cases (tuples)
+        self.seen = 0
+        #number of cases offered
+        self.w = 1.0
+        self.skip = 0
+
+    def _next_skip(self):
+        """Updates the weight of the algorithm and draws the number of cases
+        to skip before the next replacement."""
+        self.w *= math.exp(math.log(1.0 - self.random.random()) / self.size)
+        if self.w >= 1.0:
+            #only if the random number was 0
+            self.skip = 0
+            return
+        u = 1.0 - self.random.random()
+        self.skip = int(math.log(u) / math.log1p(-self.w))
+
+    def add(self, case, occ=1):
+        """Offers [occ] occurrences of [case] to the sampler."""
+        self.seen += occ
+        if self.size == 0:
+            return
+        case = tuple(case)
+        if len(self.reservoir) < self.size:
+            filled = min(occ, self.size - len(self.reservoir))
+            self.reservoir.extend([case]*filled)
+            occ -= filled
+            if len(self.reservoir) < self.size:
+                return
+            self._next_skip()
+        while self.skip < occ:
+            occ -= self.skip + 1
+            self.reservoir[self.random.randrange(self.size)] = case
+            self._next_skip()
+        self.skip -= occ
+
+    def counts(self):
+        """Returns a dictionary mapping each sampled case to the number of
+        times it was sampled."""
+        counts = defaultdict(int)
+        for case in self.reservoir:
+            counts[case] += 1
+        return counts
+
+    def get_log(self):
+        """Returns the Log of the sampled cases."""
+        return Log(uniq_cases=self.counts())
+
+stratum_keys = {'variant': tuple, 'length': len}
+
+class StratifiedSampler:
+    """Uniform sample of a fixed number of cases of each stratum (variant,
+    case length,...), so that rare strata are represented in the sample.
+    The number of cases offered to each stratum is kept in [populations],
+    which allows reweighting the sample."""
+    def __init__(self, size, key='variant', seed=None):
+        """[size] number of cases sampled in each stratum. [key] function
+        that returns the stratum of a case, or the name of a predefined one:
+        'variant' (each unique case) or 'length' (the number of events).
+        [seed] of the random generator."""
+        self.size = size
+        self.key = stratum_keys.get(key, key)
+        if not callable(self.key):
+            raise ValueError, 'Unknown stratum key'
+        self.random = random.Random(seed)
+        self.strata = {}
+        #reservoir sampler of each stratum
+        self.populations = defaultdict(int)
+        #number of cases offered to each stratum
+
+    def add(self, case, occ=1):
+        """Offers [occ] occurrences of [case] to the sampler."""
+        stratum = self.key(case)
+        sampler = self.strata.get(stratum)
+        if sampler is None:
+            sampler = ReservoirSampler(self.size, rand=self.random)
+            self.strata[stratum] = sampler
+        sampler.add(case, occ)
+        self.populations[stratum] += occ
+
+    def get_log(self):
+        """Returns the Log of the sampled cases of all the strata."""
+        counts = defaultdict(int)
+        for sampler in self.strata.itervalues():
+            for case, occ in sampler.counts().iteritems():
+                counts[case] += occ
+        return Log(uniq_cases=counts)
+
+def sample_cases(cases, sampler):
+    """Offers the iterable of [cases] to [sampler] and returns the Log of the
+    sampled ones."""
+    for case in cases:
+        sampler.add(case)
+    return sampler.get_log()
+
+def sample_log(log, sampler):
+    """Returns the Log of the cases of [log] sampled by [sampler]. Repeated
+    cases are offered with their occurrences (see Log.iter_weighted), so
+    the log is not rehydrated."""
+    for case, occ in log.iter_weighted():
+        sampler.add(case, occ)
+    return sampler.get_log()
+
+def sample_file(filename, sampler, format=None, comment_marks=None,
+                spec=None):
+    """Returns the Log of the cases of the log file [filename] sampled by
+    [sampler], reading the file incrementally (see pmlab.log.iter_cases for
+    the rest of the parameters). Only the sample is kept in memory."""
+    log = sample_cases(iter_cases(filename, format, comment_marks, spec),
+                        sampler)
+    if isinstance(filename, basestring):
+        log.filename = filename
+    return log
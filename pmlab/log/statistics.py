@@ -0,0 +1,142 @@
+"""Statistics of the cases of a log.
+
+All the statistics are computed in a single vectorized pass over the arrays
+of the encoded log (see pmlab.log.encoded), so that no case has to be
+decoded or replicated. Logs cache the result until they are modified.
+
+Example:
+>>> stats = log.get_statistics()
+>>> stats.length_histogram()
+>>> stats.directly_follows()[('A','B')]"""
+from collections import defaultdict
+import numpy
+
+class LogStatistics:
+    """Statistics of an encoded log. The arrays are indexed by activity code
+    (see the [activities] list):
+        cases, uniq_cases, events: number of cases, unique cases and events
+            (with repetitions) of the log.
+        length_counts: array with the number of cases of each length.
+        variant_counts: array with the occurrences of each unique case.
+        activity_counts: array with the occurrences of each activity.
+        case_activity_counts: array with the number of cases in which each
+            activity appears.
+        start_counts, end_counts: arrays with the number of cases that start
+            (end) with each activity.
+        df_sources, df_targets, df_counts: arrays with the pairs of activities
+            that directly follow each other, and the number of times they
+            do."""
+    def __init__(self, elog):
+        """Computes the statistics of the EncodedLog [elog]."""
+        self.activities = list(elog.activities)
+        n_acts = len(self.activities)
+        counts = elog.counts.astype(numpy.int64)
+        lengths = elog.case_lengths()
+        events = elog.events.astype(numpy.int64)
+        self.uniq_cases = len(counts)
+        self.cases = int(counts.sum())
+        self.variant_counts = counts
+        self.length_counts = numpy.bincount(lengths, weights=counts,
+                                minlength=1).astype(numpy.int64)
+        self.events = int(lengths.dot(counts))
+        #unique case and occurrences of each event
+        case_of_event = numpy.repeat(numpy.arange(self.uniq_cases), lengths)
+        weights = counts[case_of_event]
+        self.activity_counts = numpy.bincount(events, weights=weights,
+                                minlength=n_acts).astype(numpy.int64)
+        #each activity once per unique case
+        width = max(n_acts, 1)
+        pairs = numpy.unique(case_of_event*width + events)
+        self.case_activity_counts = numpy.bincount(pairs % width,
+                                weights=counts[pairs // width],
+                                minlength=n_acts).astype(numpy.int64)
+        not_empty = lengths > 0
+        offsets = elog.offsets
+        self.start_counts = numpy.bincount(events[offsets[:-1][not_empty]],
+                                weights=counts[not_empty],
+                                minlength=n_acts).astype(numpy.int64)
+        self.end_counts = numpy.bincount(events[offsets[1:][not_empty]-1],
+                                weights=counts[not_empty],
+                                minlength=n_acts).astype(numpy.int64)
+        #directly follows pairs: consecutive events of the same case
+        follows = numpy.ones(len(events), dtype=bool)
+        follows[offsets[1:][not_empty]-1] = False
+        first = numpy.flatnonzero(follows)
+        keys, inverse = numpy.unique(events[first]*width + events[first+1],
+                                    return_inverse=True)
+        self.df_sources = keys // width
+        self.df_targets = keys % width
+        self.df_counts = numpy.bincount(inverse, weights=weights[first],
+                                minlength=len(keys)).astype(numpy.int64)
+
+    def _by_activity(self, counts):
+        """Returns a defaultdict(int) mapping each activity with a non null
+        value in the array [counts] to that value."""
+        codes = numpy.flatnonzero(counts)
+        return defaultdict(int, zip([self.activities[c] for c in codes],
+                                    counts[codes].tolist()))
+
+    def alphabet_size(self):
+        """Returns the number of activities that appear in some case."""
+        return int(numpy.count_nonzero(self.activity_counts))
+
+    def length_histogram(self):
+        """Returns a sorted list of tuples (x,y) where x is the case length
+        and y is the number of cases with that length."""
+        lengths = numpy.flatnonzero(self.length_counts)
+        return zip(lengths.tolist(), self.length_counts[lengths].tolist())
+
+    def frequency_histogram(self):
+        """Returns a sorted list of tuples (x,y) where x is the case
+        frequency and y is the number of unique cases with that
+        frequency."""
+        frequencies = numpy.bincount(self.variant_counts)
+        occ = numpy.flatnonzero(frequencies)
+        return zip(occ.tolist(), frequencies[occ].tolist())
+
+    def activity_frequencies(self, case_count=False):
+        """Returns a dictionary mapping each activity to its number of
+        occurrences, or to the number of cases in which it appears if
+        [case_count] is True."""
+        return self._by_activity(self.case_activity_counts if case_count
+                                else self.activity_counts)
+
+    def start_activities(self):
+        """Returns a dictionary mapping each activity to the number of cases
+        that start with it."""
+        return self._by_activity(self.start_counts)
+
+    def end_activities(self):
+        """Returns a dictionary mapping each activity to the number of cases
+        that end with it."""
+        return self._by_activity(self.end_counts)
+
+    def directly_follows(self):
+        """Returns a dictionary mapping each pair of activities (a,b) to the
+        number of times that b directly follows a in the log."""
+        acts = self.activities
+        return defaultdict(int, (((acts[a], acts[b]), occ) for a, b, occ in
+                            zip(self.df_sources.tolist(),
+                                self.df_targets.tolist(),
+                                self.df_counts.tolist())))
+
+    def directly_follows_matrix(self):
+        """Returns the (activities x activities) int64 array whose entry
+        [a,b] is the number of times that activity code b directly follows
+        a."""
+        n_acts = len(self.activities)
+        matrix = numpy.zeros((n_acts, n_acts), dtype=numpy.int64)
+        matrix[self.df_sources, self.df_targets] = self.df_counts
+        return matrix
+
+    def show(self):
+        """Prints a summary of the statistics."""
+        print 'Alphabet size:', self.alphabet_size()
+        print 'Number of cases:', self.cases
+        print 'Number of unique cases:', self.uniq_cases
+        case_histo = self.length_histogram()
+        if not case_histo:
+            return
+        print 'Length of shortest case:',case_histo[0][0]
+        print 'Length of largest case:',case_histo[-1][0]
+        print 'Average case length: {0:.1f}'.format(1.0*self.events/self.cases)
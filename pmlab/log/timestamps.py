@@ -0,0 +1,248 @@
+"""Module to parse the timestamps of the events of a log into numeric arrays.
+
+Times are represented as int64 microseconds since the epoch, so that arrays
+of times can be used directly as numpy datetime64[us] values. Timestamps
+with a time zone are converted to UTC, naive ones are taken as they are. NAT
+is used for missing values.
+
+ISO-8601 timestamps (the XES 'time:timestamp' attribute) are parsed with a
+vectorized fast path (see parse_iso_timestamps), any other layout can be
+given as a datetime.strptime format (see parse_formatted_timestamps)."""
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+import numpy
+
+NAT = numpy.iinfo(numpy.int64).min
+#value used for missing (or unparseable) timestamps, the numpy NaT
+
+iso_timestamp_re = re.compile(r'(\d{4})-(\d\d)-(\d\d)([T ])(\d\d):(\d\d):'
+                            r'(\d\d)(?:\.(\d{1,9}))?(Z|[+-]\d\d:?[0-5]\d)?$')
+_epoch = datetime(1970, 1, 1)
+
+def parse_timestamp(value):
+    """Parses the ISO-8601 timestamp [value].
+
+    Returns a tuple (microseconds since the epoch in UTC, time zone offset in
+    minutes, style), where style records the layout of [value] (separator,
+    fraction digits and kind of time zone) so that format_timestamp gives
+    back the same string. Fractions with more than 6 digits are truncated to
+    microseconds, so they are only given back if the truncated digits are
+    zeros. None is returned if [value] has any other layout."""
+    if not isinstance(value, basestring):
+        return None
+    m = iso_timestamp_re.match(value)
+    if not m or m.group(9) in ('-00:00', '-0000'):
+        return None
+    year, month, day, sep, hour, minute, second, fraction, tz = m.groups()
+    try:
+        local = datetime(int(year), int(month), int(day), int(hour),
+                        int(minute), int(second))
+    except ValueError:
+        return None
+    micro = 0
+    style = 0
+    if fraction:
+        micro = int((fraction + '00000')[:6])
+        style = len(fraction)
+    offset = 0
+    if tz == 'Z':
+        style += 10
+    elif tz:
+        offset = int(tz[1:3])*60 + int(tz[-2:])
+        if tz[0] == '-':
+            offset = -offset
+        style += 20 if len(tz) == 6 else 30
+    if sep == ' ':
+        style += 40
+    delta = local - _epoch
+    return ((delta.days*86400 + delta.seconds - offset*60)*1000000 + micro,
+            offset, style)
+
+def format_timestamp(micro, offset, style):
+    """Returns the string of the timestamp parsed by parse_timestamp."""
+    local = _epoch + timedelta(microseconds=int(micro) + int(offset)*60000000)
+    fraction, tz, sep = style % 10, (style // 10) % 4, style // 40
+    s = '%04d-%02d-%02d%s%02d:%02d:%02d' % (local.year, local.month,
+            local.day, ' ' if sep else 'T', local.hour, local.minute,
+            local.second)
+    if fraction:
+        s += '.' + ('%06d000' % local.microsecond)[:fraction]
+    if tz == 1:
+        s += 'Z'
+    elif tz:
+        s += ('%s%02d:%02d' if tz == 2 else '%s%02d%02d') % (
+                ('-' if offset < 0 else '+',) + divmod(abs(int(offset)), 60))
+    return s
+
+#width of the ISO-8601 layouts -> list of (fraction digits, time zone length)
+_iso_layouts = defaultdict(list)
+for f in range(10):
+    for tz in (0, 1, 5, 6):
+        _iso_layouts[19 + (f+1 if f else 0) + tz].append((f, tz))
+_days_in_month = numpy.array([31,28,31,30,31,30,31,31,30,31,30,31])
+
+def _ascii(value):
+    """Returns [value] as a byte string, or '' if it is not an ASCII
+    string."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, unicode):
+        try:
+            return value.encode('ascii')
+        except UnicodeEncodeError:
+            pass
+    return ''
+
+def _parse_iso_layout(strings, fraction, tz):
+    """Parses the list of [strings], all with the ISO-8601 layout with
+    [fraction] digits and a time zone of length [tz]. Returns the arrays of
+    microseconds, time zone offsets, styles and two boolean arrays telling
+    which strings were valid and which ones are given back by 
+    format_timestamp (i.e., no non-zero digit was truncated)."""
+    width = len(strings[0])
+    chars = numpy.array(strings, dtype='S%d' % width).view(numpy.uint8)
+    chars = chars.reshape(len(strings), width).astype(numpy.int64)
+    valid = numpy.ones(len(strings), dtype=bool)
+    def digits(start, stop):
+        d = chars[:, start:stop] - ord('0')
+        valid[:] &= ((d >= 0) & (d <= 9)).all(axis=1)
+        value = numpy.zeros(len(strings), dtype=numpy.int64)
+        for k in xrange(stop-start):
+            value = value*10 + d[:, k]
+        return value
+    def char(pos, c):
+        valid[:] &= chars[:, pos] == ord(c)
+    year, month, day = digits(0, 4), digits(5, 7), digits(8, 10)
+    hour, minute, second = digits(11, 13), digits(14, 16), digits(17, 19)
+    char(4, '-')
+    char(7, '-')
+    char(13, ':')
+    char(16, ':')
+    space = chars[:, 10] == ord(' ')
+    valid &= space | (chars[:, 10] == ord('T'))
+    styles = numpy.where(space, 40, 0).astype(numpy.int8)
+    micro = numpy.zeros(len(strings), dtype=numpy.int64)
+    exact = numpy.ones(len(strings), dtype=bool)
+    if fraction:
+        char(19, '.')
+        micro = digits(20, 20+min(fraction, 6))*10**max(6-fraction, 0)
+        if fraction > 6:
+            exact = digits(26, 20+fraction) == 0
+        styles += fraction
+    offsets = numpy.zeros(len(strings), dtype=numpy.int64)
+    pos = 20+fraction if fraction else 19
+    if tz == 1:
+        char(pos, 'Z')
+        styles += 10
+    elif tz:
+        if tz == 6:
+            char(pos+3, ':')
+        tz_minutes = digits(pos+tz-2, pos+tz)
+        offsets = digits(pos+1, pos+3)*60 + tz_minutes
+        minus = chars[:, pos] == ord('-')
+        valid &= minus | (chars[:, pos] == ord('+'))
+        valid &= (tz_minutes < 60) & ~(minus & (offsets == 0))
+        offsets = numpy.where(minus, -offsets, offsets)
+        styles += 20 if tz == 6 else 30
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_index = numpy.clip(month-1, 0, 11)
+    valid &= (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1)
+    valid &= day <= _days_in_month[month_index] + (leap & (month == 2))
+    valid &= (hour < 24) & (minute < 60) & (second < 60)
+    #days since the epoch of the civil date (proleptic Gregorian calendar)
+    y = year - (month <= 2)
+    era = y // 400
+    yoe = y - era*400
+    doy = (153*numpy.where(month > 2, month-3, month+9) + 2)//5 + day-1
+    days = era*146097 + yoe*365 + yoe//4 - yoe//100 + doy - 719468
+    micros = ((days*86400 + hour*3600 + minute*60 + second - offsets*60)*
+                1000000 + micro)
+    return micros, offsets.astype(numpy.int16), styles, valid, exact
+
+def parse_iso_timestamps(values):
+    """Parses the list of ISO-8601 timestamp strings [values] (None for
+    missing timestamps) with vectorized operations: the strings are grouped
+    by length, and the fields of each group are read as fixed-width digit
+    columns for each layout accepted by parse_timestamp with that length.
+
+    Returns the arrays of microseconds, time zone offsets and styles (see
+    parse_timestamp), and the list of positions of the values that
+    format_timestamp cannot give back (i.e., the ones that could not be
+    parsed, or whose fraction was truncated)."""
+    n = len(values)
+    micros = numpy.empty(n, dtype=numpy.int64)
+    micros.fill(NAT)
+    offsets = numpy.zeros(n, dtype=numpy.int16)
+    styles = numpy.zeros(n, dtype=numpy.int8)
+    strings = [_ascii(value) for value in values]
+    lengths = numpy.fromiter((len(s) for s in strings), dtype=numpy.int64,
+                            count=n)
+    exact = numpy.zeros(n, dtype=bool)
+    for length in numpy.unique(lengths):
+        positions = numpy.flatnonzero(lengths == length)
+        for layout in _iso_layouts.get(length, ()):
+            if not len(positions):
+                break
+            group = _parse_iso_layout([strings[i] for i in positions],
+                                        *layout)
+            valid = group[3]
+            parsed = positions[valid]
+            micros[parsed] = group[0][valid]
+            offsets[parsed] = group[1][valid]
+            styles[parsed] = group[2][valid]
+            exact[parsed] = group[4][valid]
+            positions = positions[~valid]
+    verbatim = [i for i in numpy.flatnonzero(~exact).tolist()
+                if values[i] is not None]
+    return micros, offsets, styles, verbatim
+
+def parse_formatted_timestamps(values, time_format):
+    """Parses the list of timestamp strings [values] (None for missing
+    timestamps) with datetime.strptime using [time_format]. Each distinct
+    string is parsed only once.
+
+    Returns the same tuple as parse_iso_timestamps. The positions of the
+    values that are not given back by formatting the parsed time with
+    [time_format] are also included in the returned list."""
+    n = len(values)
+    micros = numpy.empty(n, dtype=numpy.int64)
+    verbatim = []
+    parsed = {}
+    for i, value in enumerate(values):
+        if value is None:
+            micros[i] = NAT
+            continue
+        try:
+            micros[i], exact = parsed[value]
+        except KeyError:
+            try:
+                time = datetime.strptime(value, time_format)
+            except (ValueError, TypeError):
+                parsed[value] = (NAT, False)
+            else:
+                delta = time - _epoch
+                try:
+                    exact = time.strftime(time_format) == value
+                except ValueError: #years before 1900
+                    exact = False
+                parsed[value] = ((delta.days*86400 + delta.seconds)*1000000
+                                + delta.microseconds, exact)
+            micros[i], exact = parsed[value]
+        if not exact:
+            verbatim.append(i)
+    return (micros, numpy.zeros(n, dtype=numpy.int16),
+            numpy.zeros(n, dtype=numpy.int8), verbatim)
+
+def parse_timestamps(values, time_format=None):
+    """Parses the list of timestamp strings [values] using [time_format], or
+    as ISO-8601 timestamps if None (see parse_iso_timestamps)."""
+    if time_format:
+        return parse_formatted_timestamps(values, time_format)
+    return parse_iso_timestamps(values)
+
+def to_datetimes(micros):
+    """Returns the list of datetime objects of the array of times [micros],
+    with None for missing times."""
+    return numpy.asarray(micros, dtype=numpy.int64).view(
+                                            'datetime64[us]').tolist()
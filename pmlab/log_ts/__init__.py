@@ -1,3 +1,4 @@
+from collections import defaultdict
 from .. log import Log
 from .. ts import TransitionSystem, IndeterminedTsError
 
@@ -14,35 +15,43 @@ def cases_included_in_ts(log, ts, uniq_cases=False, partial_cases=False, verbose
     excluded_traces=0
     ratio=0
     s0 = ts.get_state(ts.get_initial_state())
-    cases = log.get_uniq_cases() if uniq_cases else log.get_cases()
-    saved_cases = {}
-    for (case, occ) in log.get_uniq_cases().iteritems():
-        s = s0
-        if uniq_cases:
-            occ = 1
-        i = 0
-        for i, activity in enumerate(case):
-            #compute destination state
-            edges = [e for e in s.out_edges() 
-                    if ts.ep_edge_label[e] == activity]
-            if len(edges) == 0:
-                break
-            if len(edges) > 1:
-                raise IndeterminedTsError, "Ambiguous TS!"
-            s = edges[0].target()
-            i += 1
-        if i == 0:
-            excluded_traces += occ
-        elif i == len(case):
-            totally_included += occ
-        else:
-            ratio += i/((1.0)*len(case))*occ
-            partially_included += occ
-        if i == len(case) or (partial_cases and i > 0):
-            saved_cases[tuple(case[:i])] = occ
+    tree = log.get_prefix_tree()
+    saved_cases = defaultdict(int)
+    def step(s, activity):
+        #compute destination state
+        edges = [e for e in s.out_edges() 
+                if ts.ep_edge_label[e] == activity]
+        if len(edges) == 0:
+            return None
+        if len(edges) > 1:
+            raise IndeterminedTsError, "Ambiguous TS!"
+        return edges[0].target()
+    #each prefix shared by several unique cases is replayed only once
+    for node, s in tree.walk(s0, step):
+        if s is not None:
+            if tree.ends[node]:
+                occ = 1 if uniq_cases else tree.ends[node]
+                if node == 0:
+                    excluded_traces += occ
+                else:
+                    totally_included += occ
+                saved_cases[tree.case(node)] += occ
+            continue
+        #the cases below node only fit up to its parent
+        i = tree.depth[node]-1
+        for end in tree.case_ends(node):
+            occ = 1 if uniq_cases else tree.ends[end]
+            if i == 0:
+                excluded_traces += occ
+            else:
+                ratio += i/((1.0)*tree.depth[end])*occ
+                partially_included += occ
+        if partial_cases and i > 0:
+            saved_cases[tree.case(tree.parent[node])] += (
+                tree.variants[node] if uniq_cases else tree.count[node])
 
     if verbose:
-        num_cases = len(cases)
+        num_cases = tree.variants[0] if uniq_cases else tree.count[0]
         width=len(str(num_cases))
         print "Total cases in log:  {0:{width}}".format(num_cases, width=width)
         print "Excluded:            {0:{width}} {1:7.2%}".format(excluded_traces,
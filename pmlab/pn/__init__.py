@@ -2,13 +2,15 @@ import tempfile
 import subprocess
 import os.path
 from random import randint
+from itertools import izip
 
 from pyparsing import (ParserElement, Word, Optional, Literal, oneOf, LineEnd,
                         ZeroOrMore, OneOrMore, Suppress, Group, ParseException, 
                         alphas, nums, alphanums, pythonStyleComment)
 import graph_tool.all as gt
 import xml.etree.ElementTree as xmltree
-from .. ts import ts_from_sis
+from .. ts import (ts_from_sis, SisModel, sis_id, sis_lines, sis_header, 
+                    add_edge_list, read_with_fallback)
 from . tpn import pn_from_tpn
 
 __all__ = ['pn_from_ts', 'ts_from_pn', 'pn_from_file', 'PetriNet']
@@ -123,38 +125,135 @@ def pn_from_file(filename, format=None):
         return pn_from_pnml(filename)
     raise ValueError, 'Invalid format'
 
+def _read_sis_pn(lines):
+    """Hand-written reader of the [lines] of a PN in SIS format (see the pn
+    grammar). Returns a SisModel, or None if the lines use syntax not 
+    handled by this reader (then the pyparsing grammar must be used)."""
+    model = SisModel()
+    lines = sis_lines(lines)
+    tokens = sis_header(lines, model)
+    if tokens != ['.graph']:
+        return None
+    arcs = model.arcs
+    for tokens in lines:
+        if tokens[0] in ('.capacity', '.marking', '.end'):
+            break
+        if not sis_id.match(tokens[0]):
+            return None
+        arc = [tokens[0]]
+        i = 1
+        while i < len(tokens):
+            if not sis_id.match(tokens[i]):
+                return None
+            if tokens[i+1:i+2] == ['(']:
+                if (tokens[i+3:i+4] != [')'] or 
+                    not tokens[i+2].isdigit()):
+                    return None
+                arc.append((tokens[i], int(tokens[i+2])))
+                i += 4
+            else:
+                arc.append((tokens[i], 1))
+                i += 1
+        arcs.append(arc)
+    else:
+        return None
+    if not arcs or tokens[0] == '.end':
+        #'.end' just after the arcs is read as an arc by the grammar
+        return None
+    if tokens[0] == '.capacity':
+        if len(tokens) == 1:
+            #a lonely '.capacity' is read as an arc by the grammar
+            return None
+        capacities = _read_sis_assignments(tokens[1:], 'capacity')
+        if capacities is None:
+            return None
+        model.capacities = capacities
+        tokens = next(lines, None)
+    if tokens and tokens[0] == '.marking':
+        if (len(tokens) < 3 or tokens[1] != '{' or tokens[-1] != '}'):
+            return None
+        marking = _read_sis_assignments(tokens[2:-1], 'marking')
+        if marking is None:
+            return None
+        model.marking = marking
+        tokens = next(lines, None)
+    if tokens != ['.end']:
+        return None
+    return model
+
+def _read_sis_assignments(tokens, kind):
+    """Reads the list of 'id=number' of a .capacity or .marking line. The
+    number is optional (1) in markings. Returns the list of pairs, or None if
+    the syntax is not handled."""
+    pairs = []
+    i = 0
+    while i < len(tokens):
+        if not sis_id.match(tokens[i]):
+            return None
+        if tokens[i+1:i+2] == ['=']:
+            if not tokens[i+2:i+3] or not tokens[i+2].isdigit():
+                return None
+            pairs.append((tokens[i], int(tokens[i+2])))
+            i += 3
+        elif kind == 'marking':
+            pairs.append((tokens[i], 1))
+            i += 1
+        else:
+            return None
+    return pairs
+
 def pn_from_sis(filename):
     """Loads a PN in SIS format.
 
-    [file]: Can either be a filename or a file object."""
+    [file]: Can either be a filename or a file object.
+    
+    The file is streamed through a hand-written line reader, and the 
+    pyparsing grammar is only used for inputs that this reader does not 
+    handle (so that errors are reported by the grammar, see 
+    pmlab.ts.read_with_fallback)."""
     net = PetriNet(filename=filename, format='sis')
-    ast = pn.parseFile(filename)
-    for t in ast.signals:
-        net.add_transition(t)
-    for t in ast.dummies:
-        net.add_transition(t, dummy=True)
+    if isinstance(filename, basestring):
+        with open(filename) as f:
+            ast = read_with_fallback(f, _read_sis_pn, pn.parseString)
+    else:
+        ast = read_with_fallback(filename, _read_sis_pn, pn.parseString)
+    net.add_transitions(list(ast.signals))
+    net.add_transitions(list(ast.dummies), dummy=True)
         
     net.set_name(ast.modelName)
 
     transitions = set(net.get_transitions())
+    places = []
+    place_set = set()
+    edges = []
+    weights = []
+    def add_place(name):
+        if name not in place_set:
+            place_set.add(name)
+            places.append(name)
     for a in ast.arcs:
         #print a[0]
         if a[0] not in transitions:
             # it's a place
-            p = net.add_place(a[0])
+            add_place(a[0])
             for t in a[1:]:
                 if t[0] not in transitions:
                     raise ValueError, "place -> place arc"
-                net.add_edge(p,t[0],t[1])
+                edges.append((a[0],t[0]))
+                weights.append(t[1])
         else: # a[0] is a transition
             for t in a[1:]:
                 if t[0] in transitions: # implicit place
-                    p = net.add_place("ip%d" % net.g.num_vertices())
-                    net.add_edge(a[0],p,t[1])
-                    net.add_edge(p,t[0],t[1])
+                    p = "ip%d" % (len(transitions) + len(places))
+                    add_place(p)
+                    edges += [(a[0],p), (p,t[0])]
+                    weights += [t[1], t[1]]
                 else: # transition -> place arc
-                    p = net.add_place(t[0])
-                    net.add_edge(a[0],p,t[1])
+                    add_place(t[0])
+                    edges.append((a[0],t[0]))
+                    weights.append(t[1])
+    net.add_places(places)
+    net.add_edges(edges, weights)
     for m in ast.marking:
         net.set_initial_marking(m[0],m[1])
     for m in ast.capacities:
@@ -199,28 +298,33 @@ def pn_from_pnml(filename):
     # Recursively enumerate all nodes with tag = transition
     # They might be distributed in several <page> child tags
 
+    xml_ids = []
+    names = []
+    dummies = []
     for c in net.iterfind('.//%stransition' % ns):
-        xml_id = c.attrib['id']
-        name = remove_suffix(get_name_or_id(c), '+complete')
+        xml_ids.append(c.attrib['id'])
+        names.append(remove_suffix(get_name_or_id(c), '+complete'))
 
         # If it has no name, it's probably a dummy transition
-        dummy = not has_name(c)
+        dummies.append(not has_name(c))
 
-        id_map[xml_id] = pn.add_transition(name, dummy=dummy)
+    id_map.update(izip(xml_ids, pn.add_transitions(names, dummy=dummies)))
 
+    xml_ids = []
+    names = []
+    markings = []
     for c in net.iterfind('.//%splace' % ns):
-        xml_id = c.attrib['id']
-        name = get_name_or_id(c)
-
-        p = pn.add_place(name)
-        id_map[xml_id] = p
+        xml_ids.append(c.attrib['id'])
+        names.append(get_name_or_id(c))
 
         marking = c.find('%sinitialMarking/%stext' % (ns, ns))
-        if marking is not None:
-            pn.set_initial_marking(p,int(marking.text))
+        markings.append(int(marking.text) if marking is not None else 0)
+
+    id_map.update(izip(xml_ids, pn.add_places(names, 
+                                            initial_marking=markings)))
 
-    for c in net.iterfind('.//%sarc' % ns):
-        pn.add_edge(id_map[c.attrib['source']], id_map[c.attrib['target']])
+    pn.add_edges([(id_map[c.attrib['source']], id_map[c.attrib['target']])
+                for c in net.iterfind('.//%sarc' % ns)])
 
     pn.to_initial_marking()
     return pn
@@ -316,6 +420,78 @@ class PetriNet:
         self.mark_as_modified()
         return p
 
+    def _add_elems(self, names, elem_type):
+        """Adds the elements in the list [names] that were not previously 
+        added, with a single insertion of vertices of type [elem_type]. 
+        Returns the list of the vertex indexes of the elements and the list
+        of positions in [names] of the new ones."""
+        name_to_elem = self.name_to_elem
+        first = self.g.num_vertices()
+        new_positions = []
+        indexes = []
+        for pos, name in enumerate(names):
+            index = name_to_elem.get(name)
+            if index is None:
+                index = first + len(new_positions)
+                name_to_elem[name] = index
+                new_positions.append(pos)
+            indexes.append(index)
+        if new_positions:
+            self.g.add_vertex(len(new_positions))
+            for index, pos in enumerate(new_positions, first):
+                v = self.g.vertex(index)
+                self.vp_elem_name[v] = names[pos]
+                self.vp_elem_type[v] = elem_type
+            self.mark_as_modified()
+        return indexes, new_positions
+
+    def add_transitions(self, transition_names, dummy=False):
+        """Adds the transitions in the list [transition_names] that were not
+        previously added, with a single insertion of vertices. [dummy] is 
+        either a boolean for all the transitions or the list of booleans of 
+        each one. Returns the list of the vertex indexes of the transitions
+        (either existent or new)."""
+        indexes, new_positions = self._add_elems(transition_names, 
+                                                'transition')
+        if new_positions:
+            new_indexes = [indexes[pos] for pos in new_positions]
+            if isinstance(dummy, bool):
+                self.vp_transition_dummy.a[new_indexes] = dummy
+            else:
+                self.vp_transition_dummy.a[new_indexes] = [dummy[pos] 
+                                                for pos in new_positions]
+        return indexes
+
+    def add_places(self, place_names, initial_marking=None, capacities=None):
+        """Adds the places in the list [place_names] that were not previously
+        added, with a single insertion of vertices. If given, 
+        [initial_marking] and [capacities] are the lists of the tokens and 
+        capacity of each place. Returns the list of the vertex indexes of the
+        places (either existent or new)."""
+        indexes, new_positions = self._add_elems(place_names, 'place')
+        if initial_marking is not None and indexes:
+            self.vp_place_initial_marking.a[indexes] = initial_marking
+        if capacities is not None and indexes:
+            self.vp_place_capacity.a[indexes] = capacities
+        return indexes
+
+    def add_edges(self, edges, weights=None):
+        """Adds the list of (source, target) [edges] with a single vectorized
+        insertion. Sources and targets are either element names or vertices
+        (or their indexes). If given, [weights] is the list of the weights of
+        the edges (1 by default). Returns the list of new edges."""
+        name_to_elem = self.name_to_elem
+        def index(elem):
+            if isinstance(elem, str):
+                return name_to_elem[elem]
+            return int(elem)
+        new_edges, indexes = add_edge_list(self.g, [(index(s), index(t)) 
+                                                    for s, t in edges])
+        if len(indexes):
+            self.ep_edge_weight.a[indexes] = 1 if weights is None else weights
+        self.mark_as_modified()
+        return new_edges
+
     def add_edge(self, source, target, weight=1):
         """Adds a weighted edge between source and target elements. 
         The edge is returned.
@@ -0,0 +1 @@
+from test_readers import Test_SIS_PN, Test_TPN
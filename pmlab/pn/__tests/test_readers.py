@@ -0,0 +1,118 @@
+from .. import _read_sis_pn, _read_sis_assignments, pn
+from .. tpn import _read_tpn, _read_statement, _tpn_tokens, _get_grammar
+from ... ts import read_with_fallback
+from pyparsing import ParseException
+from StringIO import StringIO
+import unittest
+
+def pn_fields(ast):
+    return (ast.modelName, list(ast.signals), list(ast.dummies),
+            [[a[0]]+[tuple(t) for t in a[1:]] for a in ast.arcs],
+            [tuple(m) for m in ast.capacities], [tuple(m) for m in ast.marking])
+
+def tpn_fields(ast):
+    return [(s[0], s.name, int(s.init[0])) if s[0] == 'place' else
+            (s[0], s.name, s.event, list(s.inputs), list(s.outputs)) 
+            for s in ast]
+
+def parse_tpn(text):
+    return _get_grammar().parseString(text, parseAll=True)
+
+class Test_SIS_PN(unittest.TestCase):
+    def setUp(self):
+        self.text = ('# a comment\n'
+                    '.model net\n'
+                    '.inputs a\n'
+                    '.outputs b\n'
+                    '.dummy d\n'
+                    '.graph\n'
+                    'p0 a # a comment\n'
+                    'a p1(2) b\n'
+                    '\n'
+                    'b d\n'
+                    'd p0 p1\n'
+                    'p1 d(3)\n'
+                    '.capacity p0=3 p1=2\n'
+                    '.marking { p0 p1=2 }\n'
+                    '.end\n')
+
+    def assertSameModel(self, text):
+        model = _read_sis_pn(text.splitlines(True))
+        self.assertNotEqual(model, None)
+        self.assertEqual(pn_fields(model), pn_fields(pn.parseString(text)))
+
+    def test_same_as_grammar(self):
+        """Test that the reader returns the same model as the grammar"""
+        self.assertSameModel(self.text)
+        self.assertEqual(_read_sis_pn(self.text.splitlines(True)).marking,
+                        [('p0', 1), ('p1', 2)])
+        self.assertSameModel(self.text.replace('.capacity p0=3 p1=2\n', ''))
+        self.assertSameModel(self.text.replace('{ p0 p1=2 }', '{}'))
+        self.assertSameModel(self.text.replace('.marking { p0 p1=2 }\n', ''))
+
+    def test_assignments(self):
+        tokens = ['p0', '=', '3', 'p1']
+        self.assertEqual(_read_sis_assignments(tokens, 'marking'), 
+                        [('p0', 3), ('p1', 1)])
+        self.assertEqual(_read_sis_assignments(tokens, 'capacity'), None)
+        self.assertEqual(_read_sis_assignments(['p0', '=', 'x'], 'marking'),
+                        None)
+
+    def test_fallback(self):
+        """Test that the grammar reports the errors of the syntax not handled
+        by the reader"""
+        for old, new in [('p0 a #', 'p0 a(x) #'), ('.graph', ''),
+                        ('.marking { p0 p1=2 }', '.marking { p0=x }')]:
+            text = self.text.replace(old, new)
+            self.assertEqual(_read_sis_pn(text.splitlines(True)), None)
+            self.assertRaises(ParseException, read_with_fallback, 
+                            StringIO(text), _read_sis_pn, pn.parseString)
+
+    def test_grammar_arcs(self):
+        """Test that a .capacity line without numbers is read as an arc by 
+        the grammar"""
+        for capacity, arc in [('.capacity p0', ['.capacity', ('p0', 1)]), 
+                            ('.capacity', ['.capacity'])]:
+            text = self.text.replace('.capacity p0=3 p1=2', capacity)
+            self.assertEqual(_read_sis_pn(text.splitlines(True)), None)
+            ast = read_with_fallback(StringIO(text), _read_sis_pn, 
+                                    pn.parseString)
+            self.assertEqual(pn_fields(ast)[3][-1], arc)
+
+class Test_TPN(unittest.TestCase):
+    def setUp(self):
+        self.text = ('# a comment\n'
+                    'place "p0" init 1;\n'
+                    'place "p1"; # a comment\n'
+                    'trans "t0"~"a" in "p0" out "p1";\n'
+                    'trans "t1" ~ "$invisible$"\n'
+                    '    in "p1" "p#2"\n'
+                    '    out "p0";\n'
+                    'place "p#2" init 0;\n')
+
+    def test_same_as_grammar(self):
+        """Test that the reader returns the same statements as the grammar"""
+        statements = _read_tpn(self.text.splitlines(True))
+        self.assertEqual(tpn_fields(statements), 
+                        tpn_fields(parse_tpn(self.text)))
+        self.assertEqual(statements[3].inputs, ['p1', 'p#2'])
+        self.assertEqual(statements[1].init, ['0'])
+
+    def test_statement(self):
+        tokens = list(_tpn_tokens(['trans "t" ~ "a" out "p";']))
+        self.assertEqual(tokens, [('trans', None), ('"', 't'), ('~', None),
+                                ('"', 'a'), ('out', None), ('"', 'p'),
+                                (';', None)])
+        statement = _read_statement(tokens)
+        self.assertEqual((statement.name, statement.event, statement.inputs,
+                        statement.outputs), ('t', 'a', [], ['p']))
+        self.assertEqual(_read_statement(tokens[:2]+tokens[4:]), None)
+
+    def test_fallback(self):
+        """Test that the grammar reports the errors of the syntax not handled
+        by the reader"""
+        for text in ['place "a\\"b";', 'trans "t" ~ "a" in out "p";', 
+                    'place "p" init 1 init 2;', 'place "p"', '# comment\n']:
+            self.assertEqual(_read_tpn(text.splitlines(True)), None)
+            self.assertRaises(ParseException, read_with_fallback, 
+                            StringIO(text), _read_tpn, parse_tpn)
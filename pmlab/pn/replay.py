@@ -32,34 +32,67 @@ def replay(pn, case):
 
     return trace
 
+def marking_replayer(pn):
+    """Returns the pair (initial marking, step function) to replay [pn] 
+    without modifying it (e.g., with pmlab.log.prefix_tree.PrefixTree.walk).
+    Markings are tuples with the tokens of each place (in the order of 
+    'get_places'), and step(marking, act) returns the marking reached firing
+    transition [act], or None if it is not enabled."""
+    places = pn.get_places(names = False)
+    place_index = dict((int(p), i) for i, p in enumerate(places))
+    arcs = {}
+    for t in pn.get_transitions(names = False):
+        pre = [(place_index[int(e.source())], pn.ep_edge_weight[e]) 
+                for e in t.in_edges()]
+        post = [(place_index[int(e.target())], pn.ep_edge_weight[e]) 
+                for e in t.out_edges()]
+        arcs[pn.vp_elem_name[t]] = (pre, post)
+    def step(marking, act):
+        try:
+            pre, post = arcs[act]
+        except KeyError:
+            return None
+        for i, w in pre:
+            if marking[i] < w:
+                return None
+        marking = list(marking)
+        for i, w in pre:
+            marking[i] -= w
+        for i, w in post:
+            marking[i] += w
+        return tuple(marking)
+    initial = tuple([pn.vp_place_initial_marking[p] for p in places])
+    return initial, step
+
 def fitness(pn, log):
-    """Returns the fitness of the given log with respect to net [pn]."""
-    num_cases = 0
+    """Returns the fitness of the given log with respect to net [pn].
+    The prefixes shared by several unique cases are replayed only once (see
+    pmlab.log.prefix_tree)."""
+    tree = log.get_prefix_tree()
+    initial, step = marking_replayer(pn)
     num_fitting_cases = 0
-    for (case, reps) in log.get_uniq_cases().iteritems():
-        if replay(pn, case) is not None:
-            num_fitting_cases += reps
-        num_cases += reps
-
-    return num_fitting_cases / float(num_cases)
+    for node, marking in tree.walk(initial, step):
+        if marking is not None:
+            num_fitting_cases += tree.ends[node]
+    return num_fitting_cases / float(tree.count[0])
 
 def compute_capacity(pn, log):
     """Compute the capacity of the places in [pn] that would be required to
     replay all the traces from [log].
-    Modifies the capacities of [pn], but never decreases an existing capacity."""
+    Modifies the capacities of [pn], but never decreases an existing capacity.
+    The prefixes shared by several unique cases are replayed only once."""
     places = pn.get_places(names = False)
 
     curmax = np.empty([len(places)], dtype=np.int)
     for i, p in enumerate(places):
         curmax[i] = pn.vp_place_capacity[p]
 
-    for case in log.get_uniq_cases():
-        trace = replay(pn, case)
-        if trace is None:
-            raise UnfitLogError, case
-        tracemax = np.amax(trace, axis=0)
-        curmax = np.maximum(curmax, tracemax)
+    tree = log.get_prefix_tree()
+    initial, step = marking_replayer(pn)
+    for node, marking in tree.walk(initial, step):
+        if marking is None:
+            raise UnfitLogError, tree.case(tree.case_ends(node).next())
+        curmax = np.maximum(curmax, marking)
 
     for i, p in enumerate(places):
         pn.set_capacity(p, curmax[i])
-
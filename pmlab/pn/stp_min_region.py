@@ -170,18 +170,23 @@ def pn_from_ts(ts, k=1):
     #build pn from places
     pn = PetriNet()
     activities = reduce(set.union,[set(p.pos_gradient)|set(p.neg_gradient) for p in places])
-    for act in activities:
-        pn.add_transition(act)
-    for i,place in enumerate(places):
-        p = pn.add_place('p{0}'.format(i))
+    pn.add_transitions(list(activities))
+    names = ['p{0}'.format(i) for i in xrange(len(places))]
+    #print 'TS initial state:', ts.initial_state
+    pn.add_places(names, initial_marking=[place.multiplicity[ts.get_initial_state()] 
+                                        for place in places])
+    edges = []
+    weights = []
+    for p,place in zip(names, places):
         for ev,grad in place.neg_gradient.iteritems():
             if grad > 0:
-                pn.add_edge(p, ev, grad)
+                edges.append((p, ev))
+                weights.append(grad)
         for ev,grad in place.pos_gradient.iteritems():
             if grad > 0:
-                pn.add_edge(ev, p, grad)
-        #print 'TS initial state:', ts.initial_state
-        pn.set_initial_marking(p,place.multiplicity[ts.get_initial_state()])
+                edges.append((ev, p))
+                weights.append(grad)
+    pn.add_edges(edges, weights)
     return pn
 
 if __name__ == '__main__':
@@ -0,0 +1,8 @@
+from __tests import *
+import unittest
+
+# To run the tests, execute:
+#   python -m pmlab.pn.test
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 
+import re
 import pyparsing as pp
+from .. ts import read_with_fallback
 
 _grammar = None
 
@@ -27,7 +29,115 @@ def _get_grammar():
 def _clean_name(name):
     return str.decode(name, 'string_escape').strip()
 
+class _Statement:
+    """A place or trans statement, with the same fields as the results of the
+    pyparsing grammar."""
+    def __init__(self, kind, name, init=None, event=None, inputs=None, 
+                outputs=None):
+        self.kind = kind
+        self.name = name
+        self.init = init
+        self.event = event
+        self.inputs = inputs or []
+        self.outputs = outputs or []
+
+    def __getitem__(self, i):
+        return self.kind
+
+_tpn_token = re.compile(r'\s*(?:#[^\n]*|"([^"\n]*)"|([;~])|([^\s";~#]+))')
+
+def _tpn_tokens(lines):
+    """Yields the tokens of the iterable of [lines] of a TPN file, as pairs
+    ('"', name) for quoted names and (token, None) otherwise. Comments are 
+    skipped. Yields None at the first character that cannot be tokenized."""
+    for line in lines:
+        pos = 0
+        end = len(line.rstrip())
+        while pos < end:
+            m = _tpn_token.match(line, pos)
+            if not m or m.end() == pos:
+                yield None
+                return
+            pos = m.end()
+            quoted, symbol, word = m.groups()
+            if quoted is not None:
+                yield ('"', quoted)
+            elif symbol or word:
+                yield (symbol or word, None)
+
+def _read_tpn(lines):
+    """Hand-written reader of the TPN statements in the iterable of [lines] 
+    (see _build_grammar). The statements are read one at a time as the lines
+    are tokenized. Returns the list of statements, or None if the lines use
+    syntax not handled by this reader (then the pyparsing grammar must be
+    used)."""
+    statements = []
+    tokens = []
+    for token in _tpn_tokens(lines):
+        if token is None:
+            return None
+        tokens.append(token)
+        if token == (';', None):
+            statement = _read_statement(tokens)
+            if statement is None:
+                return None
+            statements.append(statement)
+            tokens = []
+    if tokens or not statements:
+        return None
+    return statements
+
+def _read_statement(tokens):
+    """Returns the _Statement of the list of [tokens] of a statement (ending
+    with ';'), or None if the syntax is not handled."""
+    def quoted_list(i):
+        names = []
+        while i < len(tokens) and tokens[i][0] == '"':
+            names.append(tokens[i][1])
+            i += 1
+        return names, i
+    kind = tokens[0][0]
+    if kind not in ('place', 'trans') or len(tokens) < 2 or \
+        tokens[1][0] != '"':
+        return None
+    name = tokens[1][1]
+    i = 2
+    if kind == 'place':
+        init = '0'
+        if tokens[i:i+1] and tokens[i][0] == 'init':
+            if not (tokens[i+1:i+2] and tokens[i+1][0].isdigit()):
+                return None
+            init = tokens[i+1][0]
+            i += 2
+        statement = _Statement(kind, name, init=[init])
+    else:
+        if tokens[i:i+1] != [('~', None)] or i+1 >= len(tokens) or \
+            tokens[i+1][0] != '"':
+            return None
+        event = tokens[i+1][1]
+        i += 2
+        inputs = outputs = []
+        if tokens[i:i+1] == [('in', None)]:
+            inputs, i = quoted_list(i+1)
+            if not inputs:
+                return None
+        if tokens[i:i+1] == [('out', None)]:
+            outputs, i = quoted_list(i+1)
+            if not outputs:
+                return None
+        statement = _Statement(kind, name, event=event, inputs=inputs, 
+                                outputs=outputs)
+    if i != len(tokens)-1:
+        return None
+    return statement
+
 def pn_from_tpn(file):
+    """Loads a PN in TPN format. 
+    
+    [file] can be a file or a filename. The file is streamed through a 
+    hand-written tokenizer, and the pyparsing grammar is only used for 
+    inputs that it does not handle (so that errors are reported by the 
+    grammar, see pmlab.ts.read_with_fallback)."""
     from . import PetriNet
 
     if hasattr(file, 'name'):
@@ -36,14 +146,22 @@ def pn_from_tpn(file):
         filename = str(file)
 
     pn = PetriNet(filename=filename, format='tpn')
-    ast = _get_grammar().parseFile(file, parseAll=True)
+    parse = lambda text: _get_grammar().parseString(text, parseAll=True)
+    if hasattr(file, 'read'):
+        ast = read_with_fallback(file, _read_tpn, parse)
+    else:
+        with open(file) as f:
+            ast = read_with_fallback(f, _read_tpn, parse)
 
+    places = []
+    markings = []
+    transitions = []
+    dummies = []
+    edges = []
     for l in ast:
         if l[0] == 'place':
-            name = _clean_name(l.name)
-            init = int(l.init[0])
-            p = pn.add_place(name)
-            pn.set_initial_marking(p, init)
+            places.append(_clean_name(l.name))
+            markings.append(int(l.init[0]))
         elif l[0] == 'trans':
             name = _clean_name(l.event)
             if "$invisible$" in name:
@@ -51,17 +169,19 @@ def pn_from_tpn(file):
                 dummy = True
             else:
                 dummy = False
-            pn.add_transition(name, dummy=dummy)
+            transitions.append(name)
+            dummies.append(dummy)
 
             for a in l.inputs:
-                place = _clean_name(a)
-                pn.add_edge(place, name)
+                edges.append((_clean_name(a), name))
 
             for a in l.outputs:
-                place = _clean_name(a)
-                pn.add_edge(name, place)
+                edges.append((name, _clean_name(a)))
         else:
             raise ValueError, l[0]
+    pn.add_places(places, initial_marking=markings)
+    pn.add_transitions(transitions, dummy=dummies)
+    pn.add_edges(edges)
 
     pn.to_initial_marking()
     return pn
@@ -4,6 +4,7 @@ from collections import defaultdict
 import pmlab.cnet
 import pmlab.bpmn
 import pmlab.log.filters
+import pmlab.log.sampling
 import re
 import os
 import csv
@@ -109,12 +110,26 @@ def draw_bpmn(bp):
 #	os.system('pdfcrop '+bp.name +'.pdf')
 #	os.system('evince '+ bp.name+'.pdf')
 
-def bpmn_discovery(log,log_percentage=None,minimal_case_length=None,add_frequency=None):
+def bpmn_discovery(log,log_percentage=None,minimal_case_length=None,add_frequency=None,smt=True,sampler=None):
+	"""Discovers a BPMN from [log] (see pmlab.bpmn.bpmn_from_log). Use
+	[smt]=False to skip the SMT search on large logs, and a [sampler] (see
+	pmlab.log.sampling) to discover it from a sample of the cases. With a 
+	[sampler], [log] can be the name of a log file that is never loaded 
+	whole."""
+	if (sampler):
+		if isinstance(log,basestring):
+			log = pmlab.log.sampling.sample_file(log,sampler)
+		else:
+			log = pmlab.log.sampling.sample_log(log,sampler)
 	if (minimal_case_length):
 		log = pmlab.log.filters.filter_log(log,pmlab.log.filters.CaseLengthFilter(above=minimal_case_length))
 	if (log_percentage):
 		log = pmlab.log.filters.filter_log(log,pmlab.log.filters.FrequencyFilter(log,log_min_freq=log_percentage))
 	clog = pmlab.cnet.condition_log_for_cnet(log)
+	if not smt:
+		if (add_frequency):
+			print 'Frequency information is only available with SMT discovery'
+		return pmlab.bpmn.bpmn_from_cnet(pmlab.cnet.flexible_heuristic_cnet(clog))
 	skeleton = pmlab.cnet.flexible_heuristic_miner(clog)
 	cn,bf = pmlab.cnet.cnet_from_log(clog,skeleton=skeleton)
 	bp = pmlab.bpmn.bpmn_from_cnet(cn)
@@ -1,7 +1,10 @@
-from collections import deque
+from collections import deque, defaultdict
 import tempfile
 import subprocess
+import re
+from itertools import izip
 
+import numpy
 from pyparsing import (ParserElement, Word, Optional, Literal, oneOf, LineEnd,
                         ZeroOrMore, OneOrMore, Suppress, Group, ParseException, 
                         alphas, nums, alphanums, pythonStyleComment)
@@ -16,8 +19,8 @@ class UnfitTsError(Exception):
     """Raised whether the logs are not reproduced by the TS."""
     pass
 
-def ts_from_log(log, conversion, tail=0, folding=0):
-    """Uses the log2ts application to generate a TS out of the log.
+def ts_from_log(log, conversion, tail=0, folding=0, method=None):
+    """Generates a TS out of the log.
     [conversion] describes which conversion method must be used.
         'seq': sequential conversion
         'mset': multiset conversion
@@ -25,7 +28,103 @@ def ts_from_log(log, conversion, tail=0, folding=0):
         'cfm': common final marking conversion
         This parameter is ignored if [folding] > 0.
     [tail] consider the last [tail] elements only (0 is unbounded)
+    [folding] if greater than 0, the states are the multisets of activities
+        with each multiplicity taken modulo [folding].
+    [method] 'native' builds the TS in memory (see log_ts_states), while
+        'log2ts' uses the external log2ts application. If None, 'native' is
+        used for the 'seq', 'mset' and 'set' conversions, and 'log2ts' for
+        the 'cfm' conversion and for [folding] > 0, whose native versions 
+        have not been checked against log2ts yet.
+    
+    The frequency of each state (number of times the cases of the log visit
+    it) is also stored.
     """
+    if method is None:
+        method = 'log2ts' if folding > 0 or conversion == 'cfm' else 'native'
+    if method == 'log2ts':
+        return _ts_from_log2ts(log, conversion, tail, folding)
+    if method != 'native':
+        raise TypeError, "Invalid method for the ts_from_log function"
+    tree = log.get_prefix_tree()
+    states = log_ts_states(tree, conversion, tail, folding)
+    ts = TransitionSystem()
+    ts.set_signals(sorted(log.get_alphabet()))
+    ts.add_state_frequencies()
+    #states are named in order of appearance, the initial one is s0
+    indexes = {}
+    names = []
+    frequencies = []
+    edges = []
+    seen_edges = set()
+    for node, key in enumerate(states):
+        if key not in indexes:
+            indexes[key] = len(names)
+            names.append('s{0}'.format(len(names)))
+            frequencies.append(0)
+        index = indexes[key]
+        frequencies[index] += tree.count[node]
+        if node > 0:
+            edge = (names[indexes[states[tree.parent[node]]]], 
+                    tree.activity[node], names[index])
+            if edge not in seen_edges:
+                seen_edges.add(edge)
+                edges.append(edge)
+    ts.add_states(names, frequencies)
+    ts.add_edges(edges)
+    ts.set_initial_state('s0')
+    return ts
+
+def log_ts_states(tree, conversion, tail=0, folding=0):
+    """Computes the abstract state reached by each prefix of the PrefixTree
+    [tree] (see pmlab.log.prefix_tree) for the given conversion (see 
+    ts_from_log). 
+    
+    Returns the list with the hashable key of the state of each node of the
+    tree. Nodes of the tree are numbered in order of creation, so parents 
+    come before their children. For the 'cfm' conversion, the multiset 
+    conversion is used, and all the states in which some case ends are 
+    merged in a common final state."""
+    if folding > 0:
+        conversion = 'fold'
+    elif conversion not in ('seq','mset','set','cfm'):
+        raise TypeError, "Invalid conversion for the log.convert_to_ts function"
+    #the walk state is the pair (window, multiset): the last [tail] 
+    #activities and the multiset of activities of the window (or of the 
+    #whole prefix if tail is 0) as a dictionary activity -> multiplicity
+    def step(state, activity):
+        window, counts = state
+        if tail:
+            window = (window + (activity,))[-tail:]
+            if conversion != 'seq':
+                counts = defaultdict(int)
+                for act in window:
+                    counts[act] += 1
+        elif conversion != 'seq':
+            counts = counts.copy()
+            counts[activity] += 1
+        return window, counts
+    states = [None]*len(tree)
+    for node, (window, counts) in tree.walk(((), defaultdict(int)), step):
+        if conversion == 'seq':
+            key = window if tail else node
+        elif conversion == 'set':
+            key = frozenset(counts)
+        elif conversion == 'fold':
+            key = frozenset((act, occ % folding) 
+                            for act, occ in counts.iteritems() 
+                            if occ % folding)
+        else:
+            key = frozenset(counts.iteritems())
+        states[node] = key
+    if conversion == 'cfm':
+        final_states = set(states[node] for node in tree.case_ends())
+        states = [('final',) if key in final_states else key 
+                for key in states]
+    return states
+
+def _ts_from_log2ts(log, conversion, tail=0, folding=0):
+    """Uses the log2ts application to generate a TS out of the log (see
+    ts_from_log)."""
     if (log.modified_since_last_write or 
         log.last_write_format not in ('raw','raw_uniq')):
         tmpfile = tempfile.NamedTemporaryFile(mode='w', delete=False)
@@ -74,38 +173,184 @@ marking = ".marking" + Suppress("{") + marking_list("marking") + Suppress("}") +
 ts_grammar = Optional(newlines) + Optional(modelName) + signalNames + dummyNames + graph + marking + Optional(frequency) + ".end"
 ts_grammar.ignore(pythonStyleComment)
 
+class SisModel:
+    """Contents of a file in SIS format, with the same fields as the results
+    of the pyparsing grammars (modelName, signals, dummies, arcs, marking,
+    capacities, frequencies)."""
+    def __init__(self):
+        self.modelName = ''
+        self.signals = []
+        self.dummies = []
+        self.arcs = []
+        self.marking = []
+        self.capacities = []
+        self.frequencies = []
+
+sis_id = re.compile(r'[A-Za-z0-9_"\'.:-]+$')
+_sis_separators = re.compile(r'([{}()=])')
+
+def read_with_fallback(file, reader, parse):
+    """Reads the file object [file] with the hand-written [reader], which
+    receives an iterator over the lines of the file and returns None if they
+    use syntax that it does not handle. Then returns [parse] (e.g. the 
+    parseString of a pyparsing grammar, so that errors are reported by it) 
+    of the whole text of the file.
+    
+    The lines are streamed to [reader]. If [file] can be rewound, the text 
+    is read again only for [parse], otherwise (e.g. a pipe) the lines read
+    are kept until [reader] finishes."""
+    try:
+        start = file.tell()
+    except (IOError, AttributeError):
+        start = None
+    if start is not None:
+        result = reader(iter(file.readline, ''))
+        if result is None:
+            file.seek(start)
+            result = parse(file.read())
+        return result
+    raw = []
+    def lines():
+        for line in iter(file.readline, ''):
+            raw.append(line)
+            yield line
+    result = reader(lines())
+    if result is None:
+        result = parse(''.join(raw) + file.read())
+    return result
+
+def sis_lines(lines):
+    """Yields the list of tokens of each non-empty line of the iterable of 
+    [lines] in SIS format. Comments are removed, and braces, parentheses and
+    equal signs are returned as separate tokens."""
+    for line in lines:
+        line = line.split('#', 1)[0]
+        if '{' in line or '(' in line or '=' in line or '}' in line:
+            line = _sis_separators.sub(r' \1 ', line)
+        tokens = line.split()
+        if tokens:
+            yield tokens
+
+def sis_header(lines, model):
+    """Reads the .model, .inputs, .outputs and .dummy lines at the beginning
+    of the SIS file with iterator of token lists [lines] into [model]. 
+    Returns the first token list after the header, or None if the file does
+    not follow the syntax."""
+    tokens = next(lines, None)
+    if tokens and tokens[0] == '.model':
+        if len(tokens) != 2 or not sis_id.match(tokens[1]):
+            return None
+        model.modelName = tokens[1]
+        tokens = next(lines, None)
+    while tokens and tokens[0] in ('.inputs', '.outputs'):
+        if len(tokens) < 2 or not all(sis_id.match(t) for t in tokens[1:]):
+            return None
+        model.signals += tokens[1:]
+        tokens = next(lines, None)
+    if tokens and tokens[0] == '.dummy':
+        if len(tokens) < 2 or not all(sis_id.match(t) for t in tokens[1:]):
+            return None
+        model.dummies = tokens[1:]
+        tokens = next(lines, None)
+    return tokens
+
+def _read_sis_ts(lines):
+    """Hand-written reader of the [lines] of a TS in SIS format (see 
+    ts_grammar). Returns a SisModel, or None if the lines use syntax not 
+    handled by this reader (then the pyparsing grammar must be used)."""
+    model = SisModel()
+    lines = sis_lines(lines)
+    tokens = sis_header(lines, model)
+    if tokens != ['.state', 'graph']:
+        return None
+    arcs = model.arcs
+    for tokens in lines:
+        if len(tokens) != 3 or tokens[0][0] == '.':
+            break
+        if not (sis_id.match(tokens[0]) and sis_id.match(tokens[1]) and 
+                sis_id.match(tokens[2])):
+            return None
+        arcs.append(tokens)
+    else:
+        return None
+    if (not arcs or len(tokens) < 3 or tokens[:2] != ['.marking', '{'] or 
+        tokens[-1] != '}' or not all(sis_id.match(t) for t in tokens[2:-1])):
+        return None
+    model.marking = tokens[2:-1]
+    tokens = next(lines, None)
+    if tokens == ['.frequencies']:
+        for tokens in lines:
+            if len(tokens) != 2 or not tokens[1].isdigit():
+                break
+            if not sis_id.match(tokens[0]):
+                return None
+            model.frequencies.append((tokens[0], int(tokens[1])))
+        else:
+            return None
+    if tokens != ['.end']:
+        return None
+    return model
+
 def ts_from_sis(file_or_filename):
-    """Loads a TS (possibly extended with state frequencies) in SIS format."""
+    """Loads a TS (possibly extended with state frequencies) in SIS format.
+    
+    The file is streamed through a hand-written line reader, and the 
+    pyparsing grammar is only used for inputs that this reader does not 
+    handle (so that errors are reported by the grammar, see 
+    read_with_fallback)."""
     if isinstance(file_or_filename, basestring): #a filename
         filename = file_or_filename
+        with open(filename) as f:
+            ast = read_with_fallback(f, _read_sis_ts, ts_grammar.parseString)
     else: # a file object
         try:
             filename = file_or_filename.filename
         except AttributeError:
             filename = ''
-
-    ast = ts_grammar.parseFile(file_or_filename)
+        ast = read_with_fallback(file_or_filename, _read_sis_ts, 
+                                ts_grammar.parseString)
     ts = TransitionSystem(filename=filename, format='sis')
     ts.set_name( ast.modelName )
     ts.set_signals( ast.signals )
     ts.set_dummies( ast.dummies )
 
-    for a in ast.arcs:
-        s1 = ts.add_state(a[0])
-        s2 = ts.add_state(a[2])
-        ts.add_edge(s1,a[1],s2)
+    ts.add_edges([(a[0], a[1], a[2]) for a in ast.arcs])
 
     ts.set_initial_state( ast.marking[0] )
 
     if ast.frequencies:
         ts.add_state_frequencies()
-        for f in ast.frequencies:
-            ts.set_state_frequency(f[0], f[1])
+        ts.add_states([f[0] for f in ast.frequencies], 
+                    [f[1] for f in ast.frequencies])
 
     if len(filename) > 0:
 		ts.mark_as_modified( False )
     return ts
 
+def add_edge_list(g, pairs):
+    """Adds the edges of the list of (source, target) vertex index [pairs] to
+    the graph-tool graph [g] with a single vectorized insertion. Returns the
+    list of the new edges and the array of their edge indexes (both in the
+    order of [pairs])."""
+    if not pairs:
+        return [], numpy.zeros(0, dtype=numpy.int64)
+    first = g.edge_index_range
+    if g.num_edges() != first:
+        #the indexes of removed edges can be reused by the new edges, so 
+        #they must be added one at a time
+        edges = [g.add_edge(s, t) for s, t in pairs]
+        return edges, numpy.array([g.edge_index[e] for e in edges], 
+                                dtype=numpy.int64)
+    g.add_edge_list(numpy.array(pairs, dtype=numpy.int64))
+    edges = [None]*len(pairs)
+    edge_index = g.edge_index
+    for s in set(s for s, t in pairs):
+        for e in g.vertex(s).out_edges():
+            i = edge_index[e] - first
+            if i >= 0:
+                edges[i] = e
+    return edges, numpy.arange(first, first+len(pairs), dtype=numpy.int64)
+
 def ts_from_file(filename):
 	return ts_from_sis(filename)
 
@@ -143,6 +388,15 @@ class TransitionSystem:
 
         self.name_to_state = {} # reverse map: name->state
         self.initial_state = []
+        self.label_index = None
+        #list (by vertex index) of dictionaries that map each label to the 
+        #list of output edges with that label (see get_label_index)
+        self.transition_table = None
+        #dense transition table (see get_transition_table)
+        self.state_cases = None
+        #pair (indptr, cases) of arrays: the indexes of the unique cases 
+        #going through the state with vertex index s are 
+        #cases[indptr[s]:indptr[s+1]] (see map_log_frequencies)
 
     def add_state_frequencies(self):
         """Prepares the TS to store frequency information on vertices. This way
@@ -168,6 +422,9 @@ class TransitionSystem:
         instead they will create a new suitable file.
         """
         self.modified_since_last_write = modified
+        if modified:
+            self.label_index = None
+            self.transition_table = None
         
     def set_name(self, name):
         self.gp_name[self.g] = name
@@ -237,7 +494,15 @@ class TransitionSystem:
     def get_state_cases(self, state):
         """Returns the list of cases going through [state]."""
         s = self.get_state(state)
-        return self.vp_state_cases[s]
+        if self.state_cases is None:
+            if 'cases' in self.g.vertex_properties:
+                return list(self.vp_state_cases[s])
+            return []
+        indptr, cases = self.state_cases
+        i = int(s)
+        if i+1 >= len(indptr): #state added after mapping the cases
+            return cases[:0]
+        return cases[indptr[i]:indptr[i+1]]
     
     def set_edge_frequency(self, source, label, target, freq):
         e = self.get_edge(source, label, target)
@@ -260,26 +525,85 @@ class TransitionSystem:
         self.mark_as_modified()
         return state
 
+    def add_states(self, state_names, frequencies=None):
+        """Adds the states in the list [state_names] that were not previously
+        added, with a single insertion of vertices. If given, [frequencies] is
+        the list of the frequencies of the states (see 
+        add_state_frequencies). Returns the list of the vertex indexes of the
+        states (either existent or new)."""
+        name_to_state = self.name_to_state
+        first = self.g.num_vertices()
+        new_states = []
+        indexes = []
+        for name in state_names:
+            index = name_to_state.get(name)
+            if index is None:
+                index = first + len(new_states)
+                name_to_state[name] = index
+                new_states.append(name)
+            indexes.append(index)
+        if new_states:
+            self.g.add_vertex(len(new_states))
+            for index, name in enumerate(new_states, first):
+                self.vp_state_name[self.g.vertex(index)] = name
+            self.mark_as_modified()
+        if frequencies is not None and indexes:
+            self.vp_state_frequency.a[indexes] = frequencies
+        return indexes
+
     def remove_state(self, state):
         """Removes state [state] and all incident edges.
         Note that this is a O(n) operation, where n is the number of states.
         Use filtering if you need to delete more than one state.
         """
         s = self.get_state(state)
+        self._remove_state_cases([int(s)])
         self.g.remove_vertex(s)
         # Fully rebuild the name_to_state dict since this invalidates vertex indices
         self.name_to_state = {self.vp_state_name[s] : self.g.vertex_index[s] for s in self.g.vertices()}
         self.mark_as_modified()
 
-	def remove_states(self, states):
-		"""Removes an iterable of states [states], and all their transitions.
+    def remove_states(self, states):
+        """Removes an iterable of states [states], and all their transitions.
         [states] must not contain duplicates.
         """
-        for v in sorted((self.get_state(s) for s in states), reverse = True):
+        removed = sorted((self.get_state(s) for s in states), reverse = True)
+        self._remove_state_cases([int(v) for v in removed])
+        for v in removed:
             self.g.remove_vertex(v)
         self.name_to_state = {self.vp_state_name[s] : self.g.vertex_index[s] for s in self.g.vertices()}
         self.mark_as_modified()
 
+    def _remove_state_cases(self, removed):
+        """Drops the rows of the vertex indexes [removed] from the state -> 
+        cases structure (see get_state_cases). The rows of the remaining 
+        states are shifted like their vertex indexes when graph_tool removes
+        the vertices."""
+        if self.state_cases is None:
+            return
+        indptr, cases = self.state_cases
+        lengths = numpy.diff(indptr)
+        keep = numpy.ones(len(lengths), dtype=bool)
+        #states added after mapping the cases have no row
+        keep[[i for i in removed if i < len(lengths)]] = False
+        new_indptr = numpy.zeros(keep.sum()+1, dtype=numpy.int64)
+        numpy.cumsum(lengths[keep], out=new_indptr[1:])
+        self.state_cases = (new_indptr, cases[numpy.repeat(keep, lengths)])
+
+    def _store_state_cases(self):
+        """Writes the state -> cases structure (see get_state_cases) to the
+        'cases' vertex property, so that it is saved with the graph."""
+        if self.state_cases is None:
+            return
+        if 'cases' not in self.g.vertex_properties:
+            self.add_state_cases()
+        indptr, cases = self.state_cases
+        rows = len(indptr)-1
+        for v in self.g.vertices():
+            i = int(v)
+            self.vp_state_cases[v] = (cases[indptr[i]:indptr[i+1]].tolist() 
+                                    if i < rows else [])
+
     def rename_state(self, state, name):
         s = self.get_state(state)
         del self.name_to_state[self.vp_state_name[s]]
@@ -297,6 +621,23 @@ class TransitionSystem:
         self.mark_as_modified()
         return e
 
+    def add_edges(self, edges, frequencies=None):
+        """Adds the list of labeled [edges], given as (source, label, target)
+        tuples of state names, with a single vectorized insertion. The states
+        not previously added are also added. If given, [frequencies] is the
+        list of the frequencies of the edges (see add_edge_frequencies).
+        Returns the list of new edges."""
+        states = self.add_states([name for source, label, target in edges 
+                                for name in (source, target)])
+        new_edges, indexes = add_edge_list(self.g, zip(states[0::2], 
+                                                        states[1::2]))
+        for e, (source, label, target) in izip(new_edges, edges):
+            self.ep_edge_label[e] = label
+        if frequencies is not None and len(indexes):
+            self.ep_edge_frequency.a[indexes] = frequencies
+        self.mark_as_modified()
+        return new_edges
+
     def remove_edge(self, edge):
         """Removes edge [edge]."""
         self.g.remove_edge(edge)
@@ -312,26 +653,64 @@ class TransitionSystem:
         """Returns the number of states in the TS."""
         return self.g.num_vertices()
     
+    def get_label_index(self):
+        """Returns a list with a dictionary for each state (by vertex index)
+        that maps each label to the list of output edges of the state with 
+        that label. The index is computed only once, and it is discarded 
+        whenever the TS is modified."""
+        if self.label_index is None:
+            index = [{} for i in xrange(self.g.num_vertices())]
+            for e in self.g.edges():
+                index[int(e.source())].setdefault(self.ep_edge_label[e], 
+                                                []).append(e)
+            self.label_index = index
+        return self.label_index
+
+    def get_transition_table(self):
+        """Returns the dense transition table of the TS, a tuple (label_ids,
+        targets, edges). [label_ids] maps each label to a column, and 
+        targets[s,l] and edges[s,l] are the vertex index of the target and 
+        the edge index of the output edge of state s (vertex index) with 
+        label l. Both are -1 if s has no such edge, and -2 if it has several
+        (the TS is not deterministic). Like the label index, the table is 
+        computed only once."""
+        if self.transition_table is None:
+            index = self.get_label_index()
+            label_ids = {}
+            for out in index:
+                for label in out:
+                    label_ids.setdefault(label, len(label_ids))
+            targets = numpy.empty((len(index), len(label_ids)), 
+                                dtype=numpy.int32)
+            targets.fill(-1)
+            edges = targets.copy()
+            edge_index = self.g.edge_index
+            for s, out in enumerate(index):
+                for label, out_edges in out.iteritems():
+                    l = label_ids[label]
+                    if len(out_edges) > 1:
+                        targets[s, l] = edges[s, l] = -2
+                    else:
+                        targets[s, l] = int(out_edges[0].target())
+                        edges[s, l] = edge_index[out_edges[0]]
+            self.transition_table = (label_ids, targets, edges)
+        return self.transition_table
+
     def find_output_edges(self, state, label):
         """Returns an iterable over all output arcs from [state] with label [label]."""
         s = self.get_state(state)
-        return (e for e in s.out_edges() if self.ep_edge_label[e] == label)
+        return iter(self.get_label_index()[int(s)].get(label, ()))
 
     def find_output_edge(self, state, label):
         """Returns the first output arc from [state] with label [label], or None."""
         s = self.get_state(state)
-        for e in s.out_edges():
-            if self.ep_edge_label[e] == label:
-                return e
-        return None
+        edges = self.get_label_index()[int(s)].get(label)
+        return edges[0] if edges else None
 
     def has_output_edge(self, state, label):
         """Returns True if there is at least one output arc from [state] with label [label]."""
         s = self.get_state(state)
-        for e in s.out_edges():
-            if self.ep_edge_label[e] == label:
-                return True
-        return False
+        return label in self.get_label_index()[int(s)]
 
     def find_input_edges(self, state, label):
         """Returns an iterable over all input arcs to [state] with label [label]."""
@@ -349,44 +728,124 @@ class TransitionSystem:
         return set(self.ep_edge_label[e] for e in selfloops)
     
     def map_log_frequencies(self, log, state_freq=True, edge_freq=True, 
-                            state_cases=False):
+                            state_cases=False, dense_table=False):
         """Given a log, maps the frequency for which each case visits each state
         (if [state_freq] is True) and each edge (if [edge_freq] is True).
         
-        If [state_cases] is true, then a list of case indexes going through each
-        state is also kept."""
+        If [state_cases] is true, then the indexes of the unique cases going 
+        through each state are also kept (see get_state_cases).
+        The labels are followed through the label index (see 
+        get_label_index), or through the dense transition table if 
+        [dense_table] is True (see get_transition_table), which is faster 
+        on deterministic TSs but uses memory proportional to the number of 
+        states times the number of labels.
+        
+        Each prefix shared by several unique cases is replayed only once (see
+        pmlab.log.prefix_tree), into arrays with the state and edge reached 
+        by each prefix. The visits are then added to the property arrays in
+        a single step."""
         if state_freq and 'frequency' not in self.g.vertex_properties:
             self.add_state_frequencies()
-        if state_cases and 'cases' not in self.g.vertex_properties:
-            self.add_state_cases()
         if edge_freq and 'frequency' not in self.g.edge_properties:
             self.add_edge_frequencies()
-        s0 = self.get_state(self.get_initial_state())
-        for i, (case, occ) in enumerate(log.get_uniq_cases().iteritems()):
-            s = s0
-            self.set_state_frequency(s, self.get_state_frequency(s)+occ)
-            if state_cases:
-                self.vp_state_cases[s].append(i)
-            for activity in case:
-                #compute destination state
-                edges = list(self.find_output_edges(s, activity))
-                if len(edges) > 1:
-                    raise IndeterminedTsError, "Ambiguous TS! Cannot map frequencies."
-                elif len(edges) == 0:
-                    raise UnfitTsError, "Unfit TS"
-                if edge_freq:
-                    self.ep_edge_frequency[edges[0]] += occ
-                s = edges[0].target()
-                if state_freq:
-                    self.vp_state_frequency[s] += occ
-                if state_cases:
-                    self.vp_state_cases[s].append(i)
+        s0 = int(self.get_state(self.get_initial_state()))
+        step = self._table_step() if dense_table else self._index_step()
+        tree = log.get_prefix_tree()
+        node_state = numpy.empty(len(tree), dtype=numpy.int64)
+        node_edge = numpy.empty(len(tree), dtype=numpy.int64)
+        #states of the walk are pairs (state, edge used to reach it)
+        for node, (s, e) in tree.walk((s0, -1), step):
+            node_state[node] = s
+            node_edge[node] = e
+        count = numpy.array(tree.count, dtype=numpy.float64)
+        if state_freq:
+            visits = numpy.bincount(node_state, weights=count, 
+                                    minlength=self.g.num_vertices())
+            frequency = self.vp_state_frequency.a
+            frequency += visits.astype(frequency.dtype)
+        if edge_freq and len(tree) > 1:
+            visits = numpy.bincount(node_edge[1:], weights=count[1:],
+                                    minlength=self.g.edge_index_range)
+            frequency = self.ep_edge_frequency.a
+            frequency += visits.astype(frequency.dtype)
+        if state_cases:
+            #climb from the end of every unique case to the root, all the 
+            #cases at once
+            parent = numpy.array(tree.parent, dtype=numpy.int64)
+            current = numpy.array([tree.node(case) for case in 
+                                log.get_uniq_cases()], dtype=numpy.int64)
+            cases = numpy.arange(len(current), dtype=numpy.int32)
+            state_list, case_list = [], []
+            while len(current):
+                state_list.append(node_state[current])
+                case_list.append(cases)
+                alive = current > 0
+                current = parent[current[alive]]
+                cases = cases[alive]
+            self._add_state_cases(numpy.concatenate(state_list), 
+                                numpy.concatenate(case_list))
+
+    def _add_state_cases(self, states, cases):
+        """Adds the pairs of arrays ([states], [cases]) to the compressed 
+        state -> cases structure (see get_state_cases), after the cases 
+        already stored for each state."""
+        order = numpy.lexsort((cases, states))
+        states, cases = states[order], cases[order]
+        n = self.g.num_vertices()
+        if self.state_cases is not None:
+            indptr, old_cases = self.state_cases
+            old_states = numpy.repeat(numpy.arange(len(indptr)-1), 
+                                    numpy.diff(indptr))
+            states = numpy.concatenate((old_states, states))
+            cases = numpy.concatenate((old_cases, cases))
+            #stable sort, so the old cases of each state go first
+            order = numpy.argsort(states, kind='mergesort')
+            states, cases = states[order], cases[order]
+        indptr = numpy.zeros(n+1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(states, minlength=n), out=indptr[1:])
+        self.state_cases = (indptr, cases)
+
+    def _index_step(self):
+        """Returns the function that follows a label in the label index (see
+        get_label_index). The function receives a pair (vertex index, edge 
+        index) and a label, and returns the pair reached following the 
+        label."""
+        index = self.get_label_index()
+        edge_index = self.g.edge_index
+        def step(state, label):
+            out_edges = index[state[0]].get(label)
+            if not out_edges:
+                raise UnfitTsError, "Unfit TS"
+            elif len(out_edges) > 1:
+                raise IndeterminedTsError, "Ambiguous TS! Cannot map frequencies."
+            e = out_edges[0]
+            return int(e.target()), edge_index[e]
+        return step
+
+    def _table_step(self):
+        """Returns the function that follows a label in the transition table
+        (see get_transition_table). The function receives a pair (vertex 
+        index, edge index) and a label, and returns the pair reached 
+        following the label."""
+        label_ids, targets, edges = self.get_transition_table()
+        def step(state, label):
+            l = label_ids.get(label)
+            t = targets[state[0], l] if l is not None else -1
+            if t == -2:
+                raise IndeterminedTsError, "Ambiguous TS! Cannot map frequencies."
+            elif t == -1:
+                raise UnfitTsError, "Unfit TS"
+            return t, edges[state[0], l]
+        return step
 
     def save(self, filename, format='sis'):
         """Saves the TS. 
         [filename] file or filename where the TS will be saved.
         [format] string representing the output format. Valid formats:
-                    sis, xml, gml, dot"""
+                    sis, xml, gml, dot
+        The cases going through each state (see map_log_frequencies) are 
+        saved in the 'cases' vertex property of the graph formats, but not 
+        in the sis format."""
         if format=='sis':
             own_fid = False
             if isinstance(filename, basestring):
@@ -409,6 +868,7 @@ class TransitionSystem:
             if own_fid:
                 file.close()
         else:
+            self._store_state_cases()
             self.g.save( filename, format )
         self.last_write_format = format
         self.mark_as_modified(False)
@@ -0,0 +1,4 @@
+from test_sis import Test_SIS
+from test_frequencies import Test_Frequencies
+from test_transitions import Test_Transitions
+from test_from_log import Test_From_Log
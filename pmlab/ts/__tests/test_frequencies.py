@@ -0,0 +1,112 @@
+from .. import TransitionSystem, UnfitTsError
+from ... log import Log
+import graph_tool.all as gt
+import os
+import shutil
+import tempfile
+import unittest
+
+def replay(ts, log):
+    """Maps the cases of [log] one at a time, returning the dictionaries of
+    state frequencies, edge frequencies and state cases by name."""
+    targets = dict(((s, l), t) for s, l, t in ts.get_edges())
+    state_freq, edge_freq, state_cases = {}, {}, {}
+    for i, (case, occ) in enumerate(log.get_uniq_cases().iteritems()):
+        s = ts.get_initial_state()
+        states = [s]
+        for activity in case:
+            t = targets[s, activity]
+            edge_freq[s, activity, t] = edge_freq.get((s, activity, t), 0) + occ
+            s = t
+            states.append(s)
+        for s in states:
+            state_freq[s] = state_freq.get(s, 0) + occ
+            state_cases.setdefault(s, []).append(i)
+    return state_freq, edge_freq, state_cases
+
+class Test_Frequencies(unittest.TestCase):
+    def setUp(self):
+        self.ts = TransitionSystem()
+        self.ts.add_edges([('s0', 'a', 's1'), ('s1', 'b', 's0'), 
+                        ('s1', 'c', 's2'), ('s2', 'd', 's3'), 
+                        ('s2', 'e', 's2')])
+        self.ts.set_initial_state('s0')
+        #the loops visit s0, s1 and s2 several times in some cases
+        self.log = Log(uniq_cases={('a','c','d'):3, ('a','b','a','c'):2, 
+                                ('a','b','a','b','a','c','e','e','d'):1,
+                                ('a',):4})
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def assertReplayed(self, ts, log, times=1):
+        state_freq, edge_freq, state_cases = replay(ts, log)
+        for s in ts.get_state_names():
+            self.assertEqual(ts.get_state_frequency(s), 
+                            times*state_freq.get(s, 0))
+            self.assertEqual(list(ts.get_state_cases(s)), 
+                            times*sorted(state_cases.get(s, [])))
+        for s, l, t in ts.get_edges():
+            self.assertEqual(ts.get_edge_frequency(s, l, t), 
+                            times*edge_freq.get((s, l, t), 0))
+
+    def test_same_as_replay(self):
+        """Test that the frequencies and cases of the states are those of 
+        replaying the cases one at a time"""
+        for dense_table in (False, True):
+            ts = TransitionSystem()
+            ts.add_edges(self.ts.get_edges())
+            ts.set_initial_state('s0')
+            ts.map_log_frequencies(self.log, state_cases=True, 
+                                dense_table=dense_table)
+            self.assertReplayed(ts, self.log)
+            self.assertEqual(ts.vp_state_frequency.a.sum(), 
+                            sum(occ*(len(case)+1) for case, occ in 
+                                self.log.get_uniq_cases().iteritems()))
+
+    def test_accumulate(self):
+        """Test that the frequencies and cases of a second mapping are added 
+        after the first ones"""
+        self.ts.map_log_frequencies(self.log, state_cases=True)
+        self.ts.map_log_frequencies(self.log, state_cases=True)
+        self.assertReplayed(self.ts, self.log, 2)
+        indptr, cases = self.ts.state_cases
+        self.assertEqual(indptr[-1], len(cases))
+
+    def test_unfit(self):
+        log = Log(uniq_cases={('a','d'):1})
+        self.assertRaises(UnfitTsError, self.ts.map_log_frequencies, log)
+
+    def test_remove_states(self):
+        """Test that the cases of the remaining states are kept when states
+        are removed"""
+        self.ts.map_log_frequencies(self.log, state_cases=True)
+        self.ts.add_state('s4')
+        state_cases = dict((s, list(self.ts.get_state_cases(s))) 
+                            for s in self.ts.get_state_names())
+        self.assertEqual(state_cases['s4'], [])
+        self.ts.remove_state('s1')
+        del state_cases['s1']
+        self.ts.remove_states(['s4', 's0'])
+        del state_cases['s4'], state_cases['s0']
+        self.assertEqual(sorted(self.ts.get_state_names()), ['s2', 's3'])
+        for s, cases in state_cases.iteritems():
+            self.assertEqual(list(self.ts.get_state_cases(s)), cases)
+        self.assertEqual(len(self.ts.state_cases[0]), 3)
+
+    def test_save_cases(self):
+        """Test that the cases of the states are saved in the 'cases' vertex
+        property"""
+        self.ts.map_log_frequencies(self.log, state_cases=True)
+        state_cases = replay(self.ts, self.log)[2]
+        filename = os.path.join(self.dir, 'ts.xml')
+        self.ts.save(filename, 'xml')
+        g = gt.load_graph(filename)
+        for v in g.vertices():
+            name = g.vertex_properties['name'][v]
+            self.assertEqual(list(g.vertex_properties['cases'][v]), 
+                            sorted(state_cases.get(name, [])))
+        self.ts.state_cases = None
+        self.assertEqual(self.ts.get_state_cases('s2'), 
+                        sorted(state_cases['s2']))
@@ -0,0 +1,65 @@
+from .. import ts_from_log
+from ... log import Log
+import unittest
+
+class Test_From_Log(unittest.TestCase):
+    def setUp(self):
+        self.log = Log(uniq_cases={('a','b','c'):3, ('a','c','b'):2, 
+                                ('a','b','b'):1})
+
+    def assertTs(self, ts, edges, frequencies):
+        """Checks that [ts] is the TS with the [edges] and state 
+        [frequencies] given with other state names ('' is the initial 
+        state)."""
+        targets = dict(((s, l), t) for s, l, t in ts.get_edges())
+        names = {'':ts.get_initial_state()}
+        for s, l, t in edges: #edges go after the edge reaching their source
+            names[t] = targets[names[s], l]
+        self.assertEqual(ts.get_initial_state(), 's0')
+        self.assertEqual(sorted(names.values()), 
+                        sorted('s{0}'.format(i) for i in range(len(names))))
+        self.assertEqual(sorted(ts.get_state_names()), sorted(names.values()))
+        self.assertEqual(sorted(ts.get_edges()), 
+                        sorted((names[s], l, names[t]) for s, l, t in edges))
+        for s, freq in frequencies.iteritems():
+            self.assertEqual(ts.get_state_frequency(names[s]), freq)
+        self.assertEqual(list(ts.get_signals()), ['a', 'b', 'c'])
+
+    def test_seq(self):
+        ts = ts_from_log(self.log, 'seq')
+        self.assertTs(ts, [('', 'a', 'a'), ('a', 'b', 'ab'), 
+                        ('ab', 'c', 'abc'), ('ab', 'b', 'abb'), 
+                        ('a', 'c', 'ac'), ('ac', 'b', 'acb')],
+                    {'':6, 'a':6, 'ab':4, 'abc':3, 'abb':1, 'ac':2, 'acb':2})
+
+    def test_mset(self):
+        ts = ts_from_log(self.log, 'mset')
+        self.assertTs(ts, [('', 'a', 'a'), ('a', 'b', 'ab'), 
+                        ('ab', 'c', 'abc'), ('ab', 'b', 'abb'), 
+                        ('a', 'c', 'ac'), ('ac', 'b', 'abc')],
+                    {'':6, 'a':6, 'ab':4, 'abc':5, 'abb':1, 'ac':2})
+
+    def test_set(self):
+        ts = ts_from_log(self.log, 'set')
+        self.assertTs(ts, [('', 'a', 'a'), ('a', 'b', 'ab'), 
+                        ('ab', 'c', 'abc'), ('ab', 'b', 'ab'), 
+                        ('a', 'c', 'ac'), ('ac', 'b', 'abc')],
+                    {'':6, 'a':6, 'ab':5, 'abc':5, 'ac':2})
+
+    def test_tail(self):
+        """Test that only the last [tail] activities are kept in the states"""
+        ts = ts_from_log(self.log, 'seq', tail=1)
+        self.assertTs(ts, [('', 'a', 'a'), ('a', 'b', 'b'), ('a', 'c', 'c'),
+                        ('b', 'c', 'c'), ('c', 'b', 'b'), ('b', 'b', 'b')],
+                    {'':6, 'a':6, 'b':7, 'c':5})
+        ts = ts_from_log(self.log, 'mset', tail=2)
+        self.assertTs(ts, [('', 'a', 'a'), ('a', 'b', 'ab'), 
+                        ('a', 'c', 'ac'), ('ab', 'c', 'bc'), 
+                        ('ac', 'b', 'bc'), ('ab', 'b', 'bb')],
+                    {'':6, 'a':6, 'ab':4, 'bc':5, 'ac':2, 'bb':1})
+
+    def test_invalid(self):
+        self.assertRaises(TypeError, ts_from_log, self.log, 'seq', 
+                        method='other')
+        self.assertRaises(TypeError, ts_from_log, self.log, 'other', 
+                        method='native')
@@ -0,0 +1,96 @@
+from .. import (SisModel, read_with_fallback, sis_lines, sis_header, 
+                _read_sis_ts, ts_grammar)
+from pyparsing import ParseException
+from StringIO import StringIO
+import unittest
+
+class _Pipe:
+    """A file object that cannot be rewound."""
+    def __init__(self, text):
+        self.file = StringIO(text)
+
+    def readline(self):
+        return self.file.readline()
+
+    def read(self):
+        return self.file.read()
+
+def model_fields(ast):
+    return (ast.modelName, list(ast.signals), list(ast.dummies), 
+            [list(a) for a in ast.arcs], list(ast.marking),
+            [tuple(f) for f in ast.frequencies])
+
+class Test_SIS(unittest.TestCase):
+    def setUp(self):
+        self.text = ('# a comment\n\n'
+                    '.model m1\n'
+                    '.inputs a\n'
+                    '.outputs b c\n'
+                    '.dummy d\n'
+                    '.state graph # 3 states\n'
+                    's0 a s1\n'
+                    's1 b s2 # a comment\n'
+                    '\n'
+                    's2 d s0\n'
+                    '.marking {s0}\n'
+                    '.frequencies\n'
+                    's0 5\n'
+                    's1 3 #another\n'
+                    's2 3\n'
+                    '.end\n')
+
+    def assertSameModel(self, text):
+        model = _read_sis_ts(text.splitlines(True))
+        self.assertTrue(isinstance(model, SisModel))
+        self.assertEqual(model_fields(model), 
+                        model_fields(ts_grammar.parseString(text)))
+
+    def test_sis_lines(self):
+        """Test that comments and empty lines are removed and braces are 
+        separated"""
+        lines = list(sis_lines(['# comment\n', '\n', 's0 a s1 # c\n', 
+                                '.marking {s0}\n', '.capacity p=2\n']))
+        self.assertEqual(lines, [['s0', 'a', 's1'], 
+                                ['.marking', '{', 's0', '}'],
+                                ['.capacity', 'p', '=', '2']])
+
+    def test_sis_header(self):
+        model = SisModel()
+        lines = sis_lines(self.text.splitlines(True))
+        self.assertEqual(sis_header(lines, model), ['.state', 'graph'])
+        self.assertEqual(model.modelName, 'm1')
+        self.assertEqual(model.signals, ['a', 'b', 'c'])
+        self.assertEqual(model.dummies, ['d'])
+        lines = sis_lines(['.model a b\n'])
+        self.assertEqual(sis_header(lines, SisModel()), None)
+
+    def test_same_as_grammar(self):
+        """Test that the reader returns the same model as the grammar"""
+        self.assertSameModel(self.text)
+        text = self.text.replace('.frequencies\ns0 5\ns1 3 #another\ns2 3\n',
+                                '')
+        self.assertSameModel(text)
+        self.assertEqual(_read_sis_ts(text.splitlines(True)).frequencies, [])
+        self.assertSameModel(self.text.replace('{s0}', '{ s0 s1 }'))
+        self.assertSameModel('.state graph\ns0 a s0\n.marking {s0}\n.end')
+
+    def test_fallback(self):
+        """Test that the grammar is used for the syntax not handled by the
+        reader"""
+        text = self.text.replace('s2 d s0', '.s2 d s0')
+        self.assertEqual(_read_sis_ts(text.splitlines(True)), None)
+        for f in (StringIO(text), _Pipe(text)):
+            ast = read_with_fallback(f, _read_sis_ts, ts_grammar.parseString)
+            self.assertEqual(model_fields(ast)[3][2], ['.s2', 'd', 's0'])
+        text = self.text.replace('s1 b s2', 's1 b')
+        self.assertEqual(_read_sis_ts(text.splitlines(True)), None)
+        self.assertRaises(ParseException, read_with_fallback, _Pipe(text),
+                        _read_sis_ts, ts_grammar.parseString)
+
+    def test_read_with_fallback(self):
+        """Test that the reader is used for rewindable and pipe files"""
+        for f in (StringIO(self.text), _Pipe(self.text)):
+            ast = read_with_fallback(f, _read_sis_ts, None)
+            self.assertEqual(ast.frequencies, 
+                            [('s0', 5), ('s1', 3), ('s2', 3)])
+            self.assertEqual(ast.marking, ['s0'])
@@ -0,0 +1,77 @@
+from .. import TransitionSystem, IndeterminedTsError
+from ... log import Log
+import unittest
+
+class Test_Transitions(unittest.TestCase):
+    def setUp(self):
+        self.ts = TransitionSystem()
+        self.ts.add_edges([('s0', 'a', 's1'), ('s0', 'a', 's2'), 
+                        ('s1', 'b', 's2'), ('s2', 'c', 's0')])
+        self.ts.set_initial_state('s0')
+
+    def labels(self, state):
+        index = self.ts.get_label_index()
+        s = int(self.ts.get_state(state))
+        return dict((label, sorted(self.ts.vp_state_name[e.target()] 
+                                for e in edges)) 
+                    for label, edges in index[s].iteritems())
+
+    def target(self, state, label):
+        label_ids, targets, edges = self.ts.get_transition_table()
+        return targets[int(self.ts.get_state(state)), label_ids[label]]
+
+    def test_label_index(self):
+        self.assertEqual(self.labels('s0'), {'a':['s1', 's2']})
+        self.assertEqual(self.labels('s1'), {'b':['s2']})
+        self.assertTrue(self.ts.get_label_index() is 
+                        self.ts.get_label_index())
+        self.assertTrue(self.ts.has_output_edge('s1', 'b'))
+        self.assertFalse(self.ts.has_output_edge('s1', 'c'))
+        self.assertEqual(self.ts.find_output_edge('s1', 'c'), None)
+        e = self.ts.find_output_edge('s1', 'b')
+        self.assertEqual(self.ts.vp_state_name[e.target()], 's2')
+
+    def test_transition_table(self):
+        """Test that the table marks missing edges with -1 and several edges
+        with the same label with -2"""
+        label_ids, targets, edges = self.ts.get_transition_table()
+        self.assertEqual(sorted(label_ids), ['a', 'b', 'c'])
+        self.assertEqual(targets.shape, (3, 3))
+        self.assertEqual(self.target('s0', 'a'), -2)
+        self.assertEqual(edges[int(self.ts.get_state('s0')), label_ids['a']],
+                        -2)
+        self.assertEqual(self.target('s0', 'b'), -1)
+        self.assertEqual(self.target('s1', 'b'), 
+                        int(self.ts.get_state('s2')))
+        e = self.ts.get_edge('s1', 'b', 's2')
+        self.assertEqual(edges[int(self.ts.get_state('s1')), label_ids['b']],
+                        self.ts.g.edge_index[e])
+        self.assertTrue(self.ts.get_transition_table()[1] is targets)
+
+    def test_non_deterministic(self):
+        log = Log(uniq_cases={('a','b'):1})
+        for dense_table in (False, True):
+            self.assertRaises(IndeterminedTsError, 
+                            self.ts.map_log_frequencies, log, 
+                            dense_table=dense_table)
+
+    def test_invalidation(self):
+        """Test that the index and the table are rebuilt after the TS is 
+        modified"""
+        self.ts.get_transition_table()
+        self.ts.remove_edge(self.ts.get_edge('s0', 'a', 's2'))
+        self.assertEqual(self.labels('s0'), {'a':['s1']})
+        self.assertEqual(self.target('s0', 'a'), int(self.ts.get_state('s1')))
+        self.ts.add_edge('s1', 'd', 's0')
+        self.assertEqual(self.labels('s1'), {'b':['s2'], 'd':['s0']})
+        self.assertEqual(self.target('s1', 'd'), int(self.ts.get_state('s0')))
+        self.ts.remove_state('s0')
+        self.assertEqual(len(self.ts.get_label_index()), 2)
+        self.assertEqual(self.labels('s1'), {'b':['s2']})
+        label_ids, targets, edges = self.ts.get_transition_table()
+        self.assertEqual(sorted(label_ids), ['b'])
+        self.assertEqual(self.target('s1', 'b'), int(self.ts.get_state('s2')))
+        log = Log(uniq_cases={('b',):2})
+        self.ts.set_initial_state('s1')
+        self.ts.map_log_frequencies(log, dense_table=True)
+        self.assertEqual(self.ts.get_edge_frequency('s1', 'b', 's2'), 2)